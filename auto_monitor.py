@@ -6,7 +6,7 @@ import asyncio
 import time
 from datetime import datetime
 from auto_processor import AutoProcessor
-from database import db, RawEntry
+from database import db, init_db, RawEntry
 
 class AutoMonitor:
     """Monitor que processa entradas automaticamente"""
@@ -59,6 +59,7 @@ class AutoMonitor:
 
 async def main():
     """Função principal"""
+    init_db()
     monitor = AutoMonitor(check_interval=30)  # 30 segundos
     await monitor.run_forever()
 
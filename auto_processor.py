@@ -6,10 +6,12 @@ import asyncio
 import logging
 from typing import Dict, Any
 from datetime import datetime
-from database import db
+from database import db, RawEntry, StructuredEntry
 from processor import DataProcessor
 from llm_processor import LLMProcessor
 from exporter import DataExporter
+from export_worker import get_export_worker
+import tracing
 
 logger = logging.getLogger(__name__)
 
@@ -20,6 +22,7 @@ class AutoProcessor:
         self.basic_processor = DataProcessor()
         self.llm_processor = LLMProcessor()
         self.exporter = DataExporter()
+        self.export_worker = get_export_worker()
     
     async def process_new_entries(self) -> Dict[str, Any]:
         """
@@ -61,26 +64,31 @@ class AutoProcessor:
             
             results["steps"]["llm_extraction"] = {
                 "processed": llm_results["processed"],
-                "errors": llm_results["errors"]
+                "errors": llm_results["errors"],
+                "queue_latency": llm_results.get("queue_latency", {})
             }
             
             if llm_results["processed"] > 0:
                 logger.info(f"LLM processou {llm_results['processed']} entradas")
             
             # Passo 3: Exportar sempre (substitui arquivos anteriores)
-            try:
-                xlsx_file = self.exporter.export_to_xlsx()  # Nome fixo
-                results["steps"]["export"]["xlsx"] = True
-                logger.info(f"Excel exportado: {xlsx_file}")
-            except Exception as e:
-                logger.error(f"Erro no export XLSX: {e}")
-            
-            try:
-                csv_file = self.exporter.export_to_csv()  # Nome fixo
-                results["steps"]["export"]["csv"] = True
-                logger.info(f"CSV exportado: {csv_file}")
-            except Exception as e:
-                logger.error(f"Erro no export CSV: {e}")
+            # Executado em processo separado: o event loop só aguarda o future
+            # raw_ids: relatos extraídos nesta execução (o export os publica)
+            extracted_raw_ids = [detail["raw_id"] for detail in llm_results.get("details", []) if "raw_id" in detail]
+            with tracing.span("export", raw_ids=extracted_raw_ids) as span:
+                export_results = await self.export_worker.export()  # Nomes fixos
+                span.set_attribute("rows", export_results.get("rows"))
+                if export_results["errors"]:
+                    span.set_attribute("errors", len(export_results["errors"]))
+            results["steps"]["export"]["xlsx"] = bool(export_results["xlsx"])
+            results["steps"]["export"]["csv"] = bool(export_results["csv"])
+            results["steps"]["export"]["export_time"] = export_results["export_time"]
+            
+            if export_results["errors"]:
+                logger.error(f"Erros no export: {export_results['errors']}")
+            else:
+                logger.info(f"Arquivos exportados em {export_results['export_time']}s: "
+                            f"{export_results['xlsx']}, {export_results['csv']}")
             
             # Calcular tempo total
             total_time = (datetime.now() - start_time).total_seconds()
@@ -102,6 +110,52 @@ class AutoProcessor:
             results["total_time"] = (datetime.now() - start_time).total_seconds()
             return results
     
+    async def process_report(self, raw_id: int) -> Dict[str, Any]:
+        """
+        Placeholder + extração LLM de um único relato (job agendado pelo bot)
+        Não exporta: o bot agrupa as exportações dos relatos concluídos
+        """
+        start_time = datetime.now()
+        try:
+            raw_entry = self.basic_processor.db.session.get(RawEntry, raw_id)
+            if raw_entry is None:
+                return {"success": False, "raw_id": raw_id, "message": f"Raw {raw_id} não encontrada"}
+            
+            structured_id = self.basic_processor.process_raw_entry(raw_entry)
+            if structured_id is None:
+                return {"success": True, "raw_id": raw_id, "extraction_status": "location_only",
+                        "message": "Localização registrada"}
+            
+            status = self.basic_processor.db.session.get(StructuredEntry, structured_id).extraction_status
+            if status not in (None, "pending"):
+                # Já extraído (ex: /process em paralelo): não chama o LLM de novo
+                return {"success": True, "raw_id": raw_id, "extraction_status": status,
+                        "message": f"Relato já processado ({status})"}
+            
+            def extract():
+                return self.llm_processor.process_single_entry(self.llm_processor.db.session.get(RawEntry, raw_id))
+            
+            loop = asyncio.get_running_loop()
+            # bind: spans da extração ficam sob o pipeline do relato mesmo na outra thread
+            result = await loop.run_in_executor(None, tracing.bind(extract))
+            total_time = (datetime.now() - start_time).total_seconds()
+            result["message"] = (f"Relato #{raw_id}: {result.get('extraction_status', 'erro')} "
+                                 f"em {total_time:.2f}s")
+            return result
+        
+        except Exception as e:
+            logger.error(f"Erro ao processar relato {raw_id}: {e}")
+            return {"success": False, "raw_id": raw_id, "message": f"Erro: {str(e)}"}
+    
+    async def export(self) -> Dict[str, Any]:
+        """Exporta XLSX/CSV em processo separado (span export)"""
+        with tracing.span("export") as span:
+            export_results = await self.export_worker.export()  # Nomes fixos
+            span.set_attribute("rows", export_results.get("rows"))
+            if export_results["errors"]:
+                span.set_attribute("errors", len(export_results["errors"]))
+        return export_results
+    
     def get_summary_stats(self) -> Dict[str, Any]:
         """Retorna estatísticas resumidas do sistema"""
         try:
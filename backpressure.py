@@ -0,0 +1,235 @@
+"""
+Controle de carga do bot: token bucket por agente, limite global de
+extrações em execução e fila justa (round-robin entre agentes)
+Cada job extrai só o próprio relato: um agente que envia dezenas de relatos
+por minuto só ocupa a sua vez na fila; acima do limite de espera os relatos
+ficam salvos para o próximo lote. Trabalho global (exportação, /process) passa
+pelo PipelineRunner: uma execução por vez, pedidos agrupados
+"""
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Dict
+
+from config import BOT_MAX_IN_FLIGHT, BOT_AGENT_RATE_PER_MINUTE, BOT_AGENT_BURST, BOT_AGENT_MAX_QUEUED
+from metrics import SCHEDULER_WAIT_SECONDS
+
+logger = logging.getLogger(__name__)
+
+class TokenBucket:
+    """Balde de fichas: `rate` fichas por segundo, até `capacity` acumuladas"""
+
+    def __init__(self, rate: float, capacity: float, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.tokens = capacity
+        self.updated_at = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def try_take(self) -> bool:
+        """Consome uma ficha se houver"""
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def seconds_until_token(self) -> float:
+        """Tempo até a próxima ficha ficar disponível"""
+        self._refill()
+        if self.tokens >= 1 or self.rate <= 0:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+class FairScheduler:
+    """
+    Executa os jobs (corrotinas) respeitando o limite global e o token bucket
+    de cada agente; jobs em espera saem em round-robin entre os agentes
+    """
+
+    def __init__(self, max_in_flight: int = None, rate_per_minute: float = None,
+                 burst: int = None, max_queued_per_agent: int = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_in_flight = BOT_MAX_IN_FLIGHT if max_in_flight is None else max_in_flight
+        rate_per_minute = BOT_AGENT_RATE_PER_MINUTE if rate_per_minute is None else rate_per_minute
+        self.rate = rate_per_minute / 60.0
+        self.burst = BOT_AGENT_BURST if burst is None else burst
+        self.max_queued_per_agent = BOT_AGENT_MAX_QUEUED if max_queued_per_agent is None else max_queued_per_agent
+        self.clock = clock
+
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._queues: "OrderedDict[str, deque]" = OrderedDict()
+        self._tasks = set()
+        self._wakeup = None
+        self._draining = False
+        self.in_flight = 0
+        self.stats = {"started": 0, "queued": 0, "shed": 0, "max_wait_seconds": 0.0}
+
+    def _bucket(self, agente_id: str) -> TokenBucket:
+        bucket = self._buckets.get(agente_id)
+        if bucket is None:
+            bucket = TokenBucket(self.rate, self.burst, self.clock)
+            self._buckets[agente_id] = bucket
+        return bucket
+
+    def queued(self) -> int:
+        """Jobs aguardando em todas as filas"""
+        return sum(len(queue) for queue in self._queues.values())
+
+    def _position(self, agente_id: str) -> int:
+        """Posição estimada do último job do agente na ordem round-robin"""
+        own = len(self._queues[agente_id])
+        others = sum(min(len(queue), own) for agent, queue in self._queues.items() if agent != agente_id)
+        return own + others
+
+    def submit(self, agente_id: str, job: Callable[[], Awaitable[Any]]) -> Dict[str, Any]:
+        """
+        Agenda o job do agente sem esperar sua execução
+
+        Returns:
+            {"status": "running"|"queued"|"shed", "position": posição na fila (0 se executando)}
+        """
+        queue = self._queues.get(agente_id)
+        if queue is None:
+            queue = self._queues[agente_id] = deque()
+
+        if len(queue) >= self.max_queued_per_agent:
+            self.stats["shed"] += 1
+            logger.warning(f"Agente {agente_id} com {len(queue)} relatos em espera - processamento adiado")
+            return {"status": "shed", "position": 0}
+
+        queue.append((job, self.clock()))
+        self._dispatch()
+        if not any(item[0] is job for item in queue):
+            return {"status": "running", "position": 0}
+
+        self.stats["queued"] += 1
+        return {"status": "queued", "position": self._position(agente_id)}
+
+    def _dispatch(self):
+        """Inicia jobs enquanto houver vaga global e agente com ficha"""
+        if self._wakeup is not None:
+            self._wakeup.cancel()
+            self._wakeup = None
+        while self.in_flight < self.max_in_flight:
+            agente_id = self._next_agent()
+            if agente_id is None:
+                break
+            job, enqueued_at = self._queues[agente_id].popleft()
+            if not self._queues[agente_id]:
+                del self._queues[agente_id]
+            else:
+                self._queues.move_to_end(agente_id)
+            self._start(job, self.clock() - enqueued_at)
+
+        if self._queues and self.in_flight < self.max_in_flight and self._wakeup is None:
+            # Há vaga mas nenhum agente com ficha: acorda quando a próxima ficha chegar
+            wait = min(self._bucket(agent).seconds_until_token() for agent in self._queues)
+            self._wakeup = asyncio.get_running_loop().call_later(max(wait, 0.01), self._dispatch)
+
+    def _next_agent(self):
+        for agente_id in self._queues:
+            if self._draining or self._bucket(agente_id).try_take():
+                return agente_id
+        return None
+
+    def _start(self, job: Callable[[], Awaitable[Any]], waited: float):
+        self.in_flight += 1
+        self.stats["started"] += 1
+        self.stats["max_wait_seconds"] = max(self.stats["max_wait_seconds"], round(waited, 3))
+        SCHEDULER_WAIT_SECONDS.observe(waited)
+        task = asyncio.ensure_future(self._run(job))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, job: Callable[[], Awaitable[Any]]):
+        try:
+            await job()
+        except Exception as e:
+            logger.error(f"Erro em job agendado: {e}")
+        finally:
+            self.in_flight -= 1
+            self._dispatch()
+
+    async def drain(self):
+        """Executa tudo o que está na fila, ignorando o rate limit (desligamento)"""
+        self._draining = True
+        try:
+            while self._queues or self._tasks:
+                self._dispatch()
+                if self._tasks:
+                    await asyncio.wait(set(self._tasks))
+        finally:
+            self._draining = False
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Estado atual da fila e contadores"""
+        return {"in_flight": self.in_flight, "waiting": self.queued(), **self.stats}
+
+def _consume_exception(future: asyncio.Future):
+    # Pedido sem ninguém aguardando (ex: relato adiado) não gera aviso de exceção perdida
+    if not future.cancelled():
+        future.exception()
+
+class PipelineRunner:
+    """
+    Executa um trabalho global (exportação, pipeline completo) uma vez por vez
+    Pedidos feitos durante uma execução são agrupados numa única execução
+    seguinte; cada pedido recebe o resultado da primeira execução iniciada
+    depois dele (que já enxerga o relato que o motivou)
+    """
+
+    def __init__(self, run: Callable[[], Awaitable[Any]]):
+        self.run = run
+        self._task = None
+        self._next = None
+        self.stats = {"runs": 0, "coalesced": 0}
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def request(self) -> asyncio.Future:
+        """Pede uma execução e devolve o future com o resultado dela"""
+        if self._task is None:
+            future = asyncio.get_running_loop().create_future()
+            self._start(future)
+            return future
+        if self._next is None:
+            self._next = asyncio.get_running_loop().create_future()
+        else:
+            self.stats["coalesced"] += 1
+        return self._next
+
+    def _start(self, future: asyncio.Future):
+        self.stats["runs"] += 1
+        future.add_done_callback(_consume_exception)
+        self._task = asyncio.ensure_future(self._execute(future))
+
+    async def _execute(self, future: asyncio.Future):
+        try:
+            result = await self.run()
+        except Exception as e:
+            logger.error(f"Erro no pipeline: {e}")
+            future.set_exception(e)
+        else:
+            future.set_result(result)
+        finally:
+            self._task = None
+            if self._next is not None:
+                pending, self._next = self._next, None
+                self._start(pending)
+
+    async def drain(self):
+        """Aguarda a execução atual e a seguinte já pedida (desligamento)"""
+        while self._task is not None:
+            await asyncio.shield(self._task)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"running": self.running, "pending": self._next is not None, **self.stats}
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Benchmark ponta a ponta do pipeline com relatos sintéticos e LLM simulado
+Para cada banco (SQLite e/ou PostgreSQL local) e tamanho de histórico
+(1k/100k/1M linhas), carrega o histórico em massa e mede sobre um lote novo:
+  ingest        save_raw_entry mensagem a mensagem (como o bot)
+  placeholders  DataProcessor.process_unprocessed_entries
+  extraction    LLMProcessor.process_batch_async com LLM simulado (sem rede)
+  export        DataExporter.export_all (CSV + XLSX da tabela inteira)
+  dashboard     get_processing_dashboard + get_export_stats (mediana de 3)
+Os tempos são comparados com benchmark_baselines.json; acima da tolerância é regressão.
+Uso: python benchmark_pipeline.py [--rows 1000,100000,1000000] [--batch 200]
+         [--database sqlite,postgresql://localhost/agenticlead_bench]
+         [--stages ingest,export] [--save-baseline] [--tolerance 0.25] [--fail-on-regression]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List
+
+from sqlalchemy import text
+
+from database import Base, RawEntry, StructuredEntry, db, init_db
+from llm_cascade import TierStats
+from llm_simulator import FaultProfile, InProcessClient, LLMSimulator
+from prompts import PROMPT_VERSION
+from synthetic_reports import SyntheticReportGenerator
+
+logger = logging.getLogger(__name__)
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baselines.json")
+STAGES = ["ingest", "placeholders", "extraction", "export", "dashboard"]
+BULK_CHUNK_SIZE = 5000
+
+def _timed(function: Callable[[], Any]) -> float:
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+def prepare_database(target: str, rows: int, workdir: str):
+    """Banco vazio para o cenário (SQLite novo por cenário; PostgreSQL truncado)"""
+    if target == "sqlite":
+        url = f"sqlite:///{os.path.join(workdir, f'bench_{rows}.db')}"
+        return init_db(url)
+    if "bench" not in target.rsplit("/", 1)[-1]:
+        raise ValueError(f"Use um banco dedicado (nome contendo 'bench'): {target} será truncado")
+    manager = init_db(target)
+    tables = ", ".join(table.name for table in Base.metadata.sorted_tables)
+    with manager.engine.begin() as connection:
+        connection.execute(text(f"TRUNCATE {tables} RESTART IDENTITY CASCADE"))
+    return manager
+
+def bulk_load_history(manager, generator: SyntheticReportGenerator, rows: int) -> float:
+    """Histórico já extraído (raw + structured completed), inserido em blocos; retorna linhas/s"""
+    raw_table, structured_table = RawEntry.__table__, StructuredEntry.__table__
+    start = time.perf_counter()
+    next_id = 1
+    with manager.engine.begin() as connection:
+        while next_id <= rows:
+            raw_rows, structured_rows = [], []
+            for entry_id in range(next_id, min(next_id + BULK_CHUNK_SIZE, rows + 1)):
+                report = generator.report()
+                expected = report["expected"]
+                raw_rows.append({
+                    "id": entry_id, "timestamp_captura": report["timestamp_captura"],
+                    "agente_id": report["agente_id"], "texto_original": report["texto"],
+                    "processado": True, "telegram_message_id": entry_id,
+                })
+                structured_rows.append({
+                    "id": entry_id, "raw_text_id": entry_id,
+                    "nome": expected.get("nome"), "telefone": expected.get("telefone"),
+                    "bairro": expected.get("bairro"), "referencia_local": expected.get("referencia_local"),
+                    "tipo_demanda": expected.get("tipo_demanda"),
+                    "prioridade_percebida": expected.get("prioridade_percebida"),
+                    "hora_contato": expected.get("hora_contato"),
+                    "consentimento_comunicacao": expected.get("consentimento_comunicacao"),
+                    "fonte": "texto_digitado", "confianca_global": 0.9, "confianca_campos": {},
+                    "timestamp_processamento": report["timestamp_captura"], "revisado": False,
+                    "extraction_status": "location_only" if report["location_only"] else "completed",
+                    "prompt_version": PROMPT_VERSION, "processing_attempts": 1,
+                })
+            connection.execute(raw_table.insert(), raw_rows)
+            connection.execute(structured_table.insert(), structured_rows)
+            next_id += len(raw_rows)
+        if manager.engine.dialect.name == "postgresql":
+            from bulk_migration import reset_id_sequences
+            reset_id_sequences(connection, [raw_table, structured_table])
+    elapsed = time.perf_counter() - start
+    return rows / elapsed if elapsed else 0.0
+
+def run_scenario(target: str, rows: int, batch: int, workdir: str, stages: List[str] = None,
+                 seed: int = 42) -> Dict[str, Dict[str, float]]:
+    """Mede cada etapa para um banco e tamanho de histórico"""
+    from exporter import DataExporter
+    from llm_extractor import LLMExtractor
+    from llm_processor import LLMProcessor
+    from processor import DataProcessor
+
+    stages = stages or STAGES
+    generator = SyntheticReportGenerator(seed=seed)
+    manager = prepare_database(target, rows, workdir)
+    results: Dict[str, Dict[str, float]] = {
+        "bulk_load": {"rows_per_second": round(bulk_load_history(manager, generator, rows), 1)}
+    }
+
+    reports = list(generator.reports(batch))
+    simulator = LLMSimulator(FaultProfile(latency_median=0, latency_sigma=0, seed=seed), sleep=lambda _: None)
+    extractor = LLMExtractor(api_key="sk-benchmark", stats=TierStats())
+    extractor.client = InProcessClient(simulator)
+    llm_processor = LLMProcessor(extractor=extractor)
+    exporter = DataExporter()
+
+    if "ingest" in stages:
+        def ingest():
+            for index, report in enumerate(reports):
+                db.save_raw_entry(report["agente_id"], report["texto"], message_id=rows + index + 1)
+        seconds = _timed(ingest)
+        results["ingest"] = {"seconds": seconds, "per_second": batch / seconds}
+
+    if "placeholders" in stages:
+        processor = DataProcessor()
+        seconds = _timed(processor.process_unprocessed_entries)
+        results["placeholders"] = {"seconds": seconds, "per_second": batch / seconds}
+
+    if "extraction" in stages:
+        outcome = {}
+        seconds = _timed(lambda: outcome.update(
+            asyncio.run(llm_processor.process_batch_async(batch_size=batch, max_concurrent=4))
+        ))
+        results["extraction"] = {"seconds": seconds, "per_second": outcome.get("processed", 0) / seconds}
+
+    if "export" in stages:
+        xlsx = os.path.join(workdir, "bench.xlsx")
+        csv = os.path.join(workdir, "bench.csv")
+        seconds = _timed(lambda: exporter.export_all(xlsx_filename=xlsx, csv_filename=csv))
+        results["export"] = {"seconds": seconds, "per_second": (rows + batch) / seconds}
+
+    if "dashboard" in stages:
+        timings = [
+            _timed(lambda: (llm_processor.get_processing_dashboard(), exporter.get_export_stats()))
+            for _ in range(3)
+        ]
+        results["dashboard"] = {"seconds": statistics.median(timings)}
+
+    manager.engine.dispose()
+    return {
+        stage: {key: round(value, 4) for key, value in metrics.items()}
+        for stage, metrics in results.items()
+    }
+
+def scenario_key(target: str, rows: int) -> str:
+    dialect = "sqlite" if target == "sqlite" else "postgresql"
+    return f"{dialect}/{rows}"
+
+def load_baselines(path: str = BASELINE_FILE) -> Dict[str, Any]:
+    if not os.path.exists(path):
+        return {"scenarios": {}}
+    with open(path, encoding="utf-8") as source:
+        return json.load(source)
+
+def save_baselines(results: Dict[str, Dict[str, Any]], path: str = BASELINE_FILE):
+    """Mescla os cenários medidos no arquivo de baselines"""
+    baselines = load_baselines(path)
+    baselines["machine"] = {
+        "platform": platform.platform(), "python": platform.python_version(),
+        "cpus": os.cpu_count(), "saved_at": datetime.utcnow().isoformat(timespec="seconds"),
+    }
+    baselines.setdefault("scenarios", {}).update(results)
+    with open(path, "w", encoding="utf-8") as target:
+        json.dump(baselines, target, indent=2, sort_keys=True)
+        target.write("\n")
+
+def compare_with_baselines(results: Dict[str, Dict[str, Any]], baselines: Dict[str, Any],
+                           tolerance: float = 0.25) -> List[Dict[str, Any]]:
+    """Etapas cujo tempo passou de baseline * (1 + tolerance)"""
+    regressions = []
+    for scenario, stages in results.items():
+        for stage, metrics in stages.items():
+            baseline = baselines.get("scenarios", {}).get(scenario, {}).get(stage, {}).get("seconds")
+            current = metrics.get("seconds")
+            if baseline and current and current > baseline * (1 + tolerance):
+                regressions.append({"scenario": scenario, "stage": stage, "baseline": baseline,
+                                    "current": current, "ratio": round(current / baseline, 2)})
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ponta a ponta do pipeline (LLM simulado)")
+    parser.add_argument("--rows", default="1000", help="Tamanhos de histórico, ex: 1000,100000,1000000")
+    parser.add_argument("--batch", type=int, default=200, help="Relatos novos medidos em cada cenário")
+    parser.add_argument("--database", default="sqlite",
+                        help="Bancos: 'sqlite' e/ou URLs PostgreSQL de um banco *bench* (separados por vírgula)")
+    parser.add_argument("--stages", default=",".join(STAGES), help="Etapas medidas")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--baseline-file", default=BASELINE_FILE)
+    parser.add_argument("--save-baseline", action="store_true", help="Grava os resultados como baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Piora aceitável antes de acusar regressão")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Sai com código 1 se houver regressão")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    stages = [stage.strip() for stage in args.stages.split(",") if stage.strip()]
+    workdir = tempfile.mkdtemp(prefix="agenticlead_bench_")
+
+    print("AgenticLead - Benchmark do pipeline")
+    print("=" * 40)
+    print(f"Lote medido: {args.batch} relatos | etapas: {', '.join(stages)}\n")
+
+    results = {}
+    for target in [value.strip() for value in args.database.split(",") if value.strip()]:
+        for rows in [int(value) for value in args.rows.split(",")]:
+            key = scenario_key(target, rows)
+            print(f"▶ {key}: carregando histórico...")
+            results[key] = run_scenario(target, rows, args.batch, workdir, stages, args.seed)
+            print(f"  carga em massa: {results[key]['bulk_load']['rows_per_second']:.0f} linhas/s")
+            for stage in stages:
+                metrics = results[key].get(stage)
+                if metrics:
+                    rate = f" ({metrics['per_second']:.1f}/s)" if "per_second" in metrics else ""
+                    print(f"  {stage:<13} {metrics['seconds'] * 1000:>10.1f} ms{rate}")
+
+    baselines = load_baselines(args.baseline_file)
+    regressions = compare_with_baselines(results, baselines, args.tolerance)
+    if regressions:
+        print(f"\n⚠️ Regressões (> {args.tolerance:.0%} acima do baseline):")
+        for item in regressions:
+            print(f"  {item['scenario']} {item['stage']}: {item['baseline'] * 1000:.1f} → "
+                  f"{item['current'] * 1000:.1f} ms ({item['ratio']}x)")
+    elif baselines.get("scenarios"):
+        print("\n✅ Sem regressões em relação ao baseline")
+
+    if args.save_baseline:
+        save_baselines(results, args.baseline_file)
+        print(f"\n📄 Baseline salvo em {args.baseline_file}")
+
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
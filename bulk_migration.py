@@ -0,0 +1,285 @@
+"""
+Migração em massa SQLite → PostgreSQL
+Lê em blocos (cursor server-side), grava com COPY FROM STDIN, registra
+checkpoints por tabela (retoma de onde parou), reajusta as sequências e
+confere contagem/checksum ao final. Busca, geohash/mapa de calor, assinaturas
+MinHash e chaves de mensagens são recriadas depois da cópia
+"""
+import csv
+import hashlib
+import io
+import json
+import logging
+from datetime import date, datetime
+from typing import Any, Dict, List, Set
+
+from sqlalchemy import JSON, inspect, select, text
+
+from config import BULK_MIGRATION_CHUNK_SIZE
+from database import RawEntry, StructuredEntry
+from schema_migrations import apply_migrations
+
+logger = logging.getLogger(__name__)
+
+# Ordem respeita a chave estrangeira structured_entries → raw_entries
+MIGRATION_TABLES = [RawEntry.__table__, StructuredEntry.__table__]
+
+CHECKPOINT_TABLE = "migration_checkpoints"
+
+COPY_NULL = "\\N"
+
+def _copy_value(value: Any, is_json: bool = False) -> Any:
+    """Converte um valor para o CSV do COPY (is_json: coluna JSON recebe sempre JSON válido)"""
+    if value is None:
+        return COPY_NULL
+    if is_json:
+        # Inclui texto solto (ex: str(dict) antigo em llm_metadata), gravado como string JSON
+        return json.dumps(value, ensure_ascii=False)
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+def json_columns(table) -> Set[str]:
+    """Colunas do tipo JSON da tabela"""
+    return {column.name for column in table.columns if isinstance(column.type, JSON)}
+
+def build_copy_buffer(rows: List[Dict[str, Any]], columns: List[str],
+                      json_column_names: Set[str] = frozenset()) -> io.StringIO:
+    """Monta o buffer CSV de um bloco de linhas para COPY FROM STDIN"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    for row in rows:
+        writer.writerow([_copy_value(row[column], column in json_column_names) for column in columns])
+    buffer.seek(0)
+    return buffer
+
+def _checksum_value(value: Any) -> str:
+    """Representação estável de um valor para o checksum (igual nos dois bancos)"""
+    if value is None:
+        return ""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, sort_keys=True, ensure_ascii=False)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, float):
+        return repr(round(value, 9))
+    return str(value)
+
+def clear_derived_indexes(connection):
+    """
+    Esvazia as tabelas derivadas de raw/structured_entries
+    Deve vir antes de apagar as linhas de origem (chaves estrangeiras)
+    """
+    from database import GeoHeatmapCell, LshBucket, TelegramMessage, TextSignature
+    from search import SEARCH_TABLE
+
+    inspector = inspect(connection)
+    if inspector.has_table(SEARCH_TABLE):
+        connection.execute(text(f"DELETE FROM {SEARCH_TABLE}"))
+    for table in (LshBucket.__table__, TextSignature.__table__, TelegramMessage.__table__,
+                  GeoHeatmapCell.__table__):
+        if inspector.has_table(table.name):
+            connection.execute(table.delete())
+
+def rebuild_derived_indexes(connection) -> Dict[str, int]:
+    """Recria os índices derivados a partir das linhas carregadas em massa"""
+    from database import rebuild_message_keys
+    from geo import rebuild_heatmap
+    from near_duplicates import rebuild_signatures
+    from search import rebuild_search_index
+
+    return {
+        "search_documents": rebuild_search_index(connection),
+        "geohash": rebuild_heatmap(connection),
+        "text_signatures": rebuild_signatures(connection),
+        "telegram_messages": rebuild_message_keys(connection),
+    }
+
+def reset_id_sequences(connection, tables):
+    """Ajusta as sequências SERIAL ao maior id de cada tabela (PostgreSQL)"""
+    for table in tables:
+        connection.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), "
+            f"COALESCE(MAX(id), 1), MAX(id) IS NOT NULL) FROM {table.name}"
+        ))
+
+class BulkMigrator:
+    """Copia raw_entries e structured_entries entre bancos em blocos retomáveis"""
+
+    def __init__(self, source_engine, target_engine, chunk_size: int = None):
+        self.source_engine = source_engine
+        self.target_engine = target_engine
+        self.chunk_size = chunk_size or BULK_MIGRATION_CHUNK_SIZE
+        self.use_copy = target_engine.dialect.name == "postgresql"
+
+    def prepare(self, reset: bool = False):
+        """Garante schema e tabela de checkpoints no destino (reset limpa tudo)"""
+        apply_migrations(self.target_engine)
+        with self.target_engine.begin() as connection:
+            connection.execute(text(f"""
+                CREATE TABLE IF NOT EXISTS {CHECKPOINT_TABLE} (
+                    table_name VARCHAR(100) PRIMARY KEY,
+                    last_id INTEGER NOT NULL,
+                    rows_copied INTEGER NOT NULL,
+                    completed BOOLEAN NOT NULL,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """))
+            if reset:
+                connection.execute(text(f"DELETE FROM {CHECKPOINT_TABLE}"))
+                clear_derived_indexes(connection)
+                for table in reversed(MIGRATION_TABLES):
+                    connection.execute(table.delete())
+
+    def get_checkpoint(self, table_name: str) -> Dict[str, Any]:
+        with self.target_engine.connect() as connection:
+            row = connection.execute(
+                text(f"SELECT last_id, rows_copied, completed FROM {CHECKPOINT_TABLE} WHERE table_name = :name"),
+                {"name": table_name}
+            ).first()
+        if row is None:
+            return None
+        return {"last_id": row[0], "rows_copied": row[1], "completed": bool(row[2])}
+
+    def _save_checkpoint(self, connection, table_name: str, last_id: int, rows_copied: int, completed: bool):
+        params = {"name": table_name, "last_id": last_id, "rows": rows_copied, "completed": completed}
+        updated = connection.execute(text(f"""
+            UPDATE {CHECKPOINT_TABLE}
+            SET last_id = :last_id, rows_copied = :rows, completed = :completed, updated_at = CURRENT_TIMESTAMP
+            WHERE table_name = :name
+        """), params)
+        if updated.rowcount == 0:
+            connection.execute(text(f"""
+                INSERT INTO {CHECKPOINT_TABLE} (table_name, last_id, rows_copied, completed)
+                VALUES (:name, :last_id, :rows, :completed)
+            """), params)
+
+    def _common_columns(self, table) -> List[str]:
+        """Colunas presentes no modelo e no banco de origem (SQLite antigo pode não ter todas)"""
+        source_columns = {c["name"] for c in inspect(self.source_engine).get_columns(table.name)}
+        return [column.name for column in table.columns if column.name in source_columns]
+
+    def _defaults_for_missing(self, table, columns: List[str]) -> Dict[str, Any]:
+        """Valores default (Python) para colunas que não existem na origem"""
+        defaults = {}
+        for column in table.columns:
+            if column.name in columns:
+                continue
+            if column.default is not None and column.default.is_scalar:
+                defaults[column.name] = column.default.arg
+            elif column.default is not None and column.default.is_callable:
+                defaults[column.name] = column.default.arg(None)
+        return defaults
+
+    def _write_chunk(self, connection, table, rows: List[Dict[str, Any]], columns: List[str]):
+        if not self.use_copy:
+            connection.execute(table.insert(), rows)
+            return
+
+        buffer = build_copy_buffer(rows, columns, json_columns(table))
+        cursor = connection.connection.cursor()
+        try:
+            cursor.copy_expert(
+                f"COPY {table.name} ({', '.join(columns)}) FROM STDIN "
+                f"WITH (FORMAT csv, NULL '{COPY_NULL}')",
+                buffer
+            )
+        finally:
+            cursor.close()
+
+    def copy_table(self, table) -> int:
+        """Copia uma tabela em blocos a partir do último checkpoint"""
+        checkpoint = self.get_checkpoint(table.name)
+        if checkpoint and checkpoint["completed"]:
+            logger.info(f"{table.name}: já migrada ({checkpoint['rows_copied']} linhas)")
+            return 0
+
+        last_id = checkpoint["last_id"] if checkpoint else 0
+        rows_copied = checkpoint["rows_copied"] if checkpoint else 0
+        if checkpoint is None:
+            with self.target_engine.connect() as connection:
+                existing = connection.execute(select(table.c.id).limit(1)).first()
+            if existing is not None:
+                raise RuntimeError(f"{table.name} já tem dados no destino - use reset para recomeçar")
+
+        columns = self._common_columns(table)
+        defaults = self._defaults_for_missing(table, columns)
+        target_columns = columns + list(defaults)
+        source_columns = [table.c[name] for name in columns]
+        copied_now = 0
+
+        query = select(*source_columns).where(table.c.id > last_id).order_by(table.c.id)
+        with self.source_engine.connect() as source:
+            result = source.execution_options(stream_results=True, yield_per=self.chunk_size).execute(query)
+            while True:
+                chunk = result.fetchmany(self.chunk_size)
+                if not chunk:
+                    break
+                rows = [{**dict(row._mapping), **defaults} for row in chunk]
+                last_id = rows[-1]["id"]
+                rows_copied += len(rows)
+                copied_now += len(rows)
+
+                # Bloco e checkpoint na mesma transação: retomada nunca duplica linhas
+                with self.target_engine.begin() as target:
+                    self._write_chunk(target, table, rows, target_columns)
+                    self._save_checkpoint(target, table.name, last_id, rows_copied, False)
+                logger.info(f"{table.name}: {rows_copied} linhas copiadas (id <= {last_id})")
+
+        with self.target_engine.begin() as target:
+            self._save_checkpoint(target, table.name, last_id, rows_copied, True)
+        return copied_now
+
+    def reset_sequences(self):
+        """Ajusta as sequências SERIAL ao maior id copiado (PostgreSQL)"""
+        if not self.use_copy:
+            return
+        with self.target_engine.begin() as connection:
+            reset_id_sequences(connection, MIGRATION_TABLES)
+
+    def rebuild_indexes(self) -> Dict[str, int]:
+        """Índices derivados no destino (as migrações rodaram antes da cópia, com tabelas vazias)"""
+        with self.target_engine.begin() as connection:
+            return rebuild_derived_indexes(connection)
+
+    def table_checksum(self, engine, table, columns: List[str]) -> Dict[str, Any]:
+        """Contagem e MD5 das linhas ordenadas por id (colunas comuns)"""
+        digest = hashlib.md5()
+        count = 0
+        query = select(*[table.c[name] for name in columns]).order_by(table.c.id)
+        with engine.connect() as connection:
+            result = connection.execution_options(stream_results=True, yield_per=self.chunk_size).execute(query)
+            for row in result:
+                digest.update("\x1f".join(_checksum_value(value) for value in row).encode("utf-8"))
+                digest.update(b"\x1e")
+                count += 1
+        return {"count": count, "checksum": digest.hexdigest()}
+
+    def verify(self) -> Dict[str, Dict[str, Any]]:
+        """Compara contagem e checksum de cada tabela entre origem e destino"""
+        report = {}
+        for table in MIGRATION_TABLES:
+            columns = self._common_columns(table)
+            source = self.table_checksum(self.source_engine, table, columns)
+            target = self.table_checksum(self.target_engine, table, columns)
+            report[table.name] = {
+                "source": source,
+                "target": target,
+                "ok": source == target
+            }
+        return report
+
+    def run(self, reset: bool = False) -> Dict[str, Any]:
+        """Executa a migração completa (retomável) e devolve o relatório de verificação"""
+        self.prepare(reset=reset)
+        copied = {table.name: self.copy_table(table) for table in MIGRATION_TABLES}
+        self.reset_sequences()
+        # Verifica a cópia antes de recriar os índices: o backfill de geohash
+        # preenche raw_entries.geohash no destino quando a origem não tinha
+        verification = self.verify()
+        indexed = self.rebuild_indexes()
+        return {"copied": copied, "indexed": indexed, "verification": verification}
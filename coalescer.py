@@ -0,0 +1,101 @@
+"""
+Agrupamento de mensagens: junta fragmentos enviados em sequência pelo mesmo
+agente em um único relato (uma gravação e uma extração LLM)
+"""
+import asyncio
+import logging
+from typing import Dict, Any, List, Callable, Awaitable
+from config import COALESCE_QUIET_SECONDS, COALESCE_MAX_WAIT_SECONDS, COALESCE_MAX_FRAGMENTS
+
+logger = logging.getLogger(__name__)
+
+def join_fragments(fragments: List[Dict[str, Any]]) -> str:
+    """Concatena os textos dos fragmentos na ordem de chegada"""
+    return "\n".join(fragment["text"].strip() for fragment in fragments if fragment["text"].strip())
+
+class ReportCoalescer:
+    """
+    Buffer por agente com debounce: o relato só é liberado após
+    `quiet_seconds` sem novas mensagens (ou ao atingir os limites)
+    """
+    
+    def __init__(self, on_flush: Callable[[str, List[Dict[str, Any]]], Awaitable[Any]],
+                 quiet_seconds: float = None, max_wait_seconds: float = None,
+                 max_fragments: int = None):
+        """
+        Args:
+            on_flush: corrotina chamada com (agente_id, fragmentos)
+            quiet_seconds: silêncio necessário para liberar o relato (0 = sem agrupamento)
+            max_wait_seconds: tempo máximo desde o primeiro fragmento
+            max_fragments: número máximo de fragmentos por relato
+        """
+        self.on_flush = on_flush
+        self.quiet_seconds = COALESCE_QUIET_SECONDS if quiet_seconds is None else quiet_seconds
+        self.max_wait_seconds = COALESCE_MAX_WAIT_SECONDS if max_wait_seconds is None else max_wait_seconds
+        self.max_fragments = COALESCE_MAX_FRAGMENTS if max_fragments is None else max_fragments
+        self._buffers: Dict[str, Dict[str, Any]] = {}
+    
+    async def add(self, agente_id: str, text: str, message_id: int = None, context: Any = None) -> int:
+        """
+        Adiciona um fragmento ao buffer do agente
+        Retorna quantos fragmentos aguardam no buffer (0 se já liberado)
+        """
+        fragment = {"text": text, "message_id": message_id, "context": context}
+        
+        # Agrupamento desligado: comportamento original (um relato por mensagem)
+        if self.quiet_seconds <= 0:
+            await self.on_flush(agente_id, [fragment])
+            return 0
+        
+        loop = asyncio.get_running_loop()
+        buffer = self._buffers.get(agente_id)
+        if buffer is None:
+            buffer = {"fragments": [], "first_at": loop.time(), "task": None}
+            self._buffers[agente_id] = buffer
+        
+        if any(f["message_id"] == message_id for f in buffer["fragments"] if message_id is not None):
+            return len(buffer["fragments"])
+        
+        buffer["fragments"].append(fragment)
+        if buffer["task"]:
+            buffer["task"].cancel()
+        
+        elapsed = loop.time() - buffer["first_at"]
+        delay = min(self.quiet_seconds, max(self.max_wait_seconds - elapsed, 0))
+        if len(buffer["fragments"]) >= self.max_fragments:
+            delay = 0
+        
+        buffer["task"] = asyncio.create_task(self._flush_later(agente_id, delay))
+        logger.info(f"Fragmento {len(buffer['fragments'])} do agente {agente_id} aguardando {delay:.1f}s")
+        return len(buffer["fragments"])
+    
+    async def _flush_later(self, agente_id: str, delay: float):
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            return
+        await self.flush(agente_id)
+    
+    async def flush(self, agente_id: str):
+        """Libera imediatamente o relato acumulado do agente"""
+        buffer = self._buffers.pop(agente_id, None)
+        if not buffer or not buffer["fragments"]:
+            return
+        
+        logger.info(f"Liberando relato do agente {agente_id} com {len(buffer['fragments'])} fragmento(s)")
+        try:
+            await self.on_flush(agente_id, buffer["fragments"])
+        except Exception as e:
+            logger.error(f"Erro ao processar relato agrupado do agente {agente_id}: {e}")
+    
+    async def flush_all(self):
+        """Libera todos os buffers (ex: no desligamento do bot)"""
+        for agente_id in list(self._buffers):
+            buffer = self._buffers.get(agente_id)
+            if buffer and buffer["task"]:
+                buffer["task"].cancel()
+            await self.flush(agente_id)
+    
+    def pending_agents(self) -> int:
+        """Quantidade de agentes com fragmentos aguardando"""
+        return len(self._buffers)
@@ -10,6 +10,14 @@ load_dotenv()
 # Token do Bot Telegram
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN", "")
 
+# Modo webhook: updates chegam pelo web app (URL pública vazia = polling)
+TELEGRAM_WEBHOOK_URL = os.getenv("TELEGRAM_WEBHOOK_URL", "").rstrip("/")
+TELEGRAM_WEBHOOK_PATH = os.getenv("TELEGRAM_WEBHOOK_PATH", "/telegram/webhook")
+TELEGRAM_WEBHOOK_SECRET = os.getenv("TELEGRAM_WEBHOOK_SECRET", "")
+# Updates processados em paralelo por processo web e conexões simultâneas do Telegram
+TELEGRAM_WEBHOOK_WORKERS = int(os.getenv("TELEGRAM_WEBHOOK_WORKERS", "8"))
+TELEGRAM_WEBHOOK_MAX_CONNECTIONS = int(os.getenv("TELEGRAM_WEBHOOK_MAX_CONNECTIONS", "40"))
+
 # Configurações do banco de dados
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///agenticlead.db")
 
@@ -19,10 +27,91 @@ if DATABASE_URL.startswith("postgres://"):
 
 # Configurações da API OpenAI
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
+LLM_MODEL = os.getenv("LLM_MODEL", "gpt-3.5-turbo")
+# Endpoint compatível com OpenAI (ex: llm_simulator.py nos testes de carga)
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "")
+
+# Cascata: modelos do mais barato ao maior; escala quando a validação falha
+# ou a confiança fica abaixo de CONFIDENCE_THRESHOLD
+LLM_CASCADE_ENABLED = os.getenv("LLM_CASCADE_ENABLED", "false").lower() == "true"
+LLM_CASCADE_MODELS = os.getenv("LLM_CASCADE_MODELS", "gpt-4o-mini,gpt-4o")
+
+# Cassete de chamadas LLM: off | record (grava) | replay (reproduz sem rede)
+LLM_CASSETTE_MODE = os.getenv("LLM_CASSETTE_MODE", "off").lower()
+LLM_CASSETTE_PATH = os.getenv("LLM_CASSETTE_PATH", "cassettes/llm.jsonl.gz")
+# Fator sobre a latência gravada no replay (0 = sem espera)
+LLM_CASSETTE_LATENCY_SCALE = float(os.getenv("LLM_CASSETTE_LATENCY_SCALE", "1.0"))
+
+# Métricas Prometheus (/metrics no web app; METRICS_PORT > 0 expõe também no bot em polling)
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+# Vários workers do gunicorn: cada processo grava seus valores neste diretório
+# (a cada METRICS_FLUSH_SECONDS) e /metrics soma todos (vazio = só o processo atual)
+METRICS_MULTIPROC_DIR = os.getenv("METRICS_MULTIPROC_DIR", "")
+METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", "5"))
+
+# Rastreamento por relato (spans em JSONL e/ou coletor OTLP/HTTP, ex: http://localhost:4318)
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "false").lower() == "true"
+TRACING_FILE = os.getenv("TRACING_FILE", "traces/spans.jsonl")
+TRACING_OTLP_ENDPOINT = os.getenv("TRACING_OTLP_ENDPOINT", "")
+TRACING_SERVICE_NAME = os.getenv("TRACING_SERVICE_NAME", "agenticlead")
 
 # Configurações de confiança
 CONFIDENCE_THRESHOLD = float(os.getenv("CONFIDENCE_THRESHOLD", "0.75"))
 
+# Pré-extração determinística (regex/keywords) antes do LLM
+PRE_EXTRACTION_ENABLED = os.getenv("PRE_EXTRACTION_ENABLED", "true").lower() == "true"
+PRE_EXTRACTION_MIN_CONFIDENCE = float(os.getenv("PRE_EXTRACTION_MIN_CONFIDENCE", "0.85"))
+# Campos que precisam ser extraídos com confiança para dispensar a chamada LLM
+PRE_EXTRACTION_REQUIRED_FIELDS = [
+    field.strip()
+    for field in os.getenv("PRE_EXTRACTION_REQUIRED_FIELDS", "nome,telefone,bairro,tipo_demanda").split(",")
+    if field.strip()
+]
+
+# Janela (segundos) para anexar uma localização ao relato seguinte do agente
+LOCATION_MERGE_WINDOW_SECONDS = int(os.getenv("LOCATION_MERGE_WINDOW_SECONDS", "900"))
+
+# Agrupamento de mensagens consecutivas do mesmo agente (0 desliga)
+COALESCE_QUIET_SECONDS = float(os.getenv("COALESCE_QUIET_SECONDS", "4"))
+COALESCE_MAX_WAIT_SECONDS = float(os.getenv("COALESCE_MAX_WAIT_SECONDS", "20"))
+COALESCE_MAX_FRAGMENTS = int(os.getenv("COALESCE_MAX_FRAGMENTS", "6"))
+
+# Controle de carga do bot: extrações simultâneas (uma por relato), relatos por
+# minuto por agente, rajada permitida e relatos em espera por agente (acima disso, próximo lote)
+BOT_MAX_IN_FLIGHT = int(os.getenv("BOT_MAX_IN_FLIGHT", "4"))
+BOT_AGENT_RATE_PER_MINUTE = float(os.getenv("BOT_AGENT_RATE_PER_MINUTE", "6"))
+BOT_AGENT_BURST = int(os.getenv("BOT_AGENT_BURST", "3"))
+BOT_AGENT_MAX_QUEUED = int(os.getenv("BOT_AGENT_MAX_QUEUED", "20"))
+
+# Export XLSX/CSV em processo separado (não bloqueia o event loop do bot)
+EXPORT_IN_PROCESS_POOL = os.getenv("EXPORT_IN_PROCESS_POOL", "true").lower() == "true"
+EXPORT_WORKERS = int(os.getenv("EXPORT_WORKERS", "1"))
+
+# Travamentos do event loop acima deste valor (segundos) são logados
+LOOP_STALL_WARN_SECONDS = float(os.getenv("LOOP_STALL_WARN_SECONDS", "0.5"))
+
+# Fila de extração por urgência: pontos ganhos por hora de espera (anti-starvation)
+# e quantas pendentes são avaliadas para escolher cada lote
+PRIORITY_AGING_POINTS_PER_HOUR = float(os.getenv("PRIORITY_AGING_POINTS_PER_HOUR", "10"))
+PRIORITY_SCAN_LIMIT = int(os.getenv("PRIORITY_SCAN_LIMIT", "1000"))
+
+# Backfill após mudança de PROMPT_VERSION: re-extrações por minuto e pausa enquanto
+# houver mais que N relatos novos aguardando extração (-1 = nunca pausa)
+BACKFILL_RATE_PER_MINUTE = float(os.getenv("BACKFILL_RATE_PER_MINUTE", "20"))
+BACKFILL_MAX_LIVE_PENDING = int(os.getenv("BACKFILL_MAX_LIVE_PENDING", "5"))
+
+# Relatos quase duplicados (MinHash/LSH sobre texto_original)
+NEAR_DUP_ENABLED = os.getenv("NEAR_DUP_ENABLED", "true").lower() == "true"
+NEAR_DUP_THRESHOLD = float(os.getenv("NEAR_DUP_THRESHOLD", "0.5"))  # Jaccard estimado
+NEAR_DUP_WINDOW_HOURS = float(os.getenv("NEAR_DUP_WINDOW_HOURS", "72"))
+NEAR_DUP_REUSE_EXTRACTION = os.getenv("NEAR_DUP_REUSE_EXTRACTION", "true").lower() == "true"
+# Reuso da extração exige mais que o agrupamento (e o mesmo bairro conhecido)
+NEAR_DUP_REUSE_THRESHOLD = float(os.getenv("NEAR_DUP_REUSE_THRESHOLD", "0.75"))
+
+# Tamanho do bloco da migração em massa SQLite → PostgreSQL (COPY)
+BULK_MIGRATION_CHUNK_SIZE = int(os.getenv("BULK_MIGRATION_CHUNK_SIZE", "5000"))
+
 # Tipos de demanda válidos
 TIPOS_DEMANDA = [
     "ARVORE",
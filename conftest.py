@@ -0,0 +1,62 @@
+"""
+Fixtures compartilhadas: cliente OpenAI falso e LLMProcessor sem __init__
+"""
+from types import SimpleNamespace
+
+import pytest
+
+from llm_processor import LLMProcessor
+from search import SearchIndex
+
+class FakeCompletions:
+    """
+    chat.completions falso
+    answers: dict (resposta por modelo), list (respostas em ordem) ou str (sempre a mesma)
+    """
+
+    def __init__(self, answers, usage=(1000, 100)):
+        self.answers = list(answers) if isinstance(answers, list) else answers
+        self.usage = usage
+        self.models = []
+        self.prompts = []
+
+    @property
+    def calls(self) -> int:
+        return len(self.models)
+
+    def create(self, model, messages, **kwargs):
+        self.models.append(model)
+        self.prompts.append(messages[-1]["content"])
+        if isinstance(self.answers, dict):
+            content = self.answers[model]
+        elif isinstance(self.answers, list):
+            content = self.answers.pop(0)
+        else:
+            content = self.answers
+        prompt_tokens, completion_tokens = self.usage
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+            usage=SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens),
+        )
+
+@pytest.fixture
+def fake_openai():
+    """Instala o cliente falso no extrator e retorna o FakeCompletions para inspeção"""
+    def install(extractor, answers, usage=(1000, 100)) -> FakeCompletions:
+        completions = FakeCompletions(answers, usage)
+        extractor.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+        return completions
+    return install
+
+@pytest.fixture
+def bare_processor():
+    """LLMProcessor ligado ao banco do teste, sem criar LLMExtractor (nem exigir API key)"""
+    def build(manager, extractor=None, duplicate_index=None) -> LLMProcessor:
+        processor = LLMProcessor.__new__(LLMProcessor)
+        processor.db = manager
+        processor.extractor = extractor
+        processor.duplicate_index = duplicate_index
+        processor.search_index = SearchIndex()
+        processor.search_index.db = manager
+        return processor
+    return build
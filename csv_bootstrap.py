@@ -0,0 +1,176 @@
+"""
+Carga inicial do CSV (agenticlead_dados.csv) no banco do deploy
+Calcula o checksum do arquivo e pula na hora se ele já foi aplicado
+(tabela bootstrap_state); caso contrário carrega via pandas vetorizado + COPY
+"""
+import hashlib
+import io
+import logging
+import os
+from typing import Any, Dict
+
+import pandas as pd
+from sqlalchemy import text
+
+from bulk_migration import COPY_NULL, clear_derived_indexes, rebuild_derived_indexes, reset_id_sequences
+from database import RawEntry, StructuredEntry
+
+logger = logging.getLogger(__name__)
+
+STATE_TABLE = "bootstrap_state"
+
+# Colunas do CSV exportado que vão para structured_entries
+STRUCTURED_CSV_COLUMNS = [
+    "raw_text_id", "data_contato", "hora_contato", "nome", "telefone", "bairro",
+    "referencia_local", "tipo_demanda", "descricao_curta", "prioridade_percebida",
+    "consentimento_comunicacao", "fonte", "confianca_global", "revisado",
+    "timestamp_processamento",
+]
+
+# Colunas lidas como texto (telefone "+55...", ids do Telegram, horas)
+TEXT_CSV_COLUMNS = [
+    "data_contato", "hora_contato", "nome", "telefone", "bairro", "referencia_local",
+    "tipo_demanda", "descricao_curta", "prioridade_percebida", "fonte", "agente_id",
+    "texto_original",
+]
+
+def read_source_csv(path: str) -> pd.DataFrame:
+    """Lê o CSV exportado preservando as colunas de texto"""
+    return pd.read_csv(path, dtype={column: str for column in TEXT_CSV_COLUMNS})
+
+def file_checksum(path: str) -> str:
+    """SHA-256 do conteúdo do arquivo (lido em blocos)"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as source:
+        for block in iter(lambda: source.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _to_bool(series: pd.Series, default: bool = None) -> pd.Series:
+    """Converte True/False/1/0 (texto ou bool) em booleano, mantendo nulos"""
+    mapped = series.map(
+        lambda value: str(value).strip().lower() in ("true", "1", "t", "sim")
+        if pd.notna(value) else default
+    )
+    return mapped.astype(object)
+
+def build_raw_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Linhas de raw_entries a partir do CSV (operações vetorizadas, sem iterrows)"""
+    raw = pd.DataFrame({
+        "id": df["raw_text_id"].astype("int64"),
+        "timestamp_captura": pd.to_datetime(df.get("timestamp_captura"), errors="coerce"),
+        "agente_id": df.get("agente_id", pd.Series("unknown", index=df.index)).fillna("unknown").astype(str),
+        "texto_original": df.get("texto_original", pd.Series("", index=df.index)).fillna("").astype(str),
+        "latitude": df.get("latitude"),
+        "longitude": df.get("longitude"),
+        "processado": True,
+        "telegram_message_id": None,
+    })
+    raw["timestamp_captura"] = raw["timestamp_captura"].fillna(pd.Timestamp.utcnow().tz_localize(None))
+    return raw.drop_duplicates(subset=["id"])
+
+def build_structured_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Linhas de structured_entries a partir do CSV (operações vetorizadas)"""
+    structured = df.reindex(columns=STRUCTURED_CSV_COLUMNS).copy()
+    structured.insert(0, "id", df["id_registro"].astype("int64"))
+    structured["raw_text_id"] = structured["raw_text_id"].astype("int64")
+    structured["consentimento_comunicacao"] = _to_bool(structured["consentimento_comunicacao"])
+    structured["revisado"] = _to_bool(structured["revisado"], default=False)
+    structured["fonte"] = structured["fonte"].fillna("csv_import")
+    structured["confianca_global"] = structured["confianca_global"].fillna(0.8)
+    structured["timestamp_processamento"] = pd.to_datetime(
+        structured["timestamp_processamento"], errors="coerce"
+    ).fillna(pd.Timestamp.utcnow().tz_localize(None))
+    structured["extraction_status"] = "completed"
+    structured["processing_attempts"] = 0
+    return structured.drop_duplicates(subset=["id"])
+
+class CsvBootstrapLoader:
+    """Carrega o CSV de dados uma única vez por conteúdo (checksum)"""
+
+    def __init__(self, engine, csv_path: str):
+        self.engine = engine
+        self.csv_path = csv_path
+        self.source_name = os.path.basename(csv_path)
+        self.use_copy = engine.dialect.name == "postgresql"
+
+    def _ensure_state_table(self, connection):
+        connection.execute(text(f"""
+            CREATE TABLE IF NOT EXISTS {STATE_TABLE} (
+                source VARCHAR(200) PRIMARY KEY,
+                checksum VARCHAR(64) NOT NULL,
+                rows_loaded INTEGER NOT NULL,
+                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """))
+
+    def applied_checksum(self) -> str:
+        """Checksum do último arquivo aplicado (None se nunca aplicado)"""
+        with self.engine.begin() as connection:
+            self._ensure_state_table(connection)
+            return connection.execute(
+                text(f"SELECT checksum FROM {STATE_TABLE} WHERE source = :source"),
+                {"source": self.source_name}
+            ).scalar()
+
+    def _write_frame(self, connection, table, frame: pd.DataFrame):
+        if frame.empty:
+            return
+        if not self.use_copy:
+            frame.to_sql(table.name, connection, if_exists="append", index=False,
+                         method="multi", chunksize=500)
+            return
+
+        buffer = io.StringIO()
+        frame.to_csv(buffer, index=False, header=False, na_rep=COPY_NULL)
+        buffer.seek(0)
+        cursor = connection.connection.cursor()
+        try:
+            cursor.copy_expert(
+                f"COPY {table.name} ({', '.join(frame.columns)}) FROM STDIN "
+                f"WITH (FORMAT csv, NULL '{COPY_NULL}')",
+                buffer
+            )
+        finally:
+            cursor.close()
+
+    def load(self, force: bool = False) -> Dict[str, Any]:
+        """
+        Aplica o CSV se o conteúdo mudou (ou force)
+
+        Returns:
+            {"status": "skipped"|"loaded", "checksum": ..., "rows": ..., "indexed": {...}}
+        """
+        checksum = file_checksum(self.csv_path)
+        if not force and self.applied_checksum() == checksum:
+            logger.info(f"{self.source_name} já aplicado (checksum {checksum[:12]}) - pulando")
+            return {"status": "skipped", "checksum": checksum, "rows": 0}
+
+        df = read_source_csv(self.csv_path)
+        raw = build_raw_frame(df)
+        structured = build_structured_frame(df)
+
+        # Substituição atômica: quem consulta nunca vê as tabelas vazias
+        with self.engine.begin() as connection:
+            self._ensure_state_table(connection)
+            # Busca, assinaturas e chaves do Telegram referenciam as linhas substituídas
+            clear_derived_indexes(connection)
+            connection.execute(StructuredEntry.__table__.delete())
+            connection.execute(RawEntry.__table__.delete())
+            self._write_frame(connection, RawEntry.__table__, raw)
+            self._write_frame(connection, StructuredEntry.__table__, structured)
+            if self.use_copy:
+                reset_id_sequences(connection, [RawEntry.__table__, StructuredEntry.__table__])
+            indexed = rebuild_derived_indexes(connection)
+
+            connection.execute(text(f"DELETE FROM {STATE_TABLE} WHERE source = :source"),
+                               {"source": self.source_name})
+            connection.execute(
+                text(f"INSERT INTO {STATE_TABLE} (source, checksum, rows_loaded) "
+                     f"VALUES (:source, :checksum, :rows)"),
+                {"source": self.source_name, "checksum": checksum, "rows": len(structured)}
+            )
+
+        logger.info(f"{self.source_name}: {len(raw)} raw / {len(structured)} structured carregadas "
+                    f"({indexed['search_documents']} indexadas para busca)")
+        return {"status": "loaded", "checksum": checksum, "rows": len(structured), "indexed": indexed}
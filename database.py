@@ -2,19 +2,34 @@
 Módulo de banco de dados PostgreSQL para AgenticLead
 Schema otimizado para PostgreSQL com compatibilidade total
 """
+import json
+import logging
 import os
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Boolean, Float, Text, JSON, ForeignKey
+import threading
+import time
+from collections import OrderedDict
+from sqlalchemy import create_engine, inspect, Column, Integer, String, DateTime, Boolean, Float, Text, JSON, ForeignKey, Index, text
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.orm import sessionmaker, scoped_session, relationship
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.dialects.postgresql import UUID
 from datetime import datetime
 import uuid
+from metrics import INGEST_SECONDS, InstrumentedQueuePool, instrument_engine
+import tracing
+
+logger = logging.getLogger(__name__)
 
 Base = declarative_base()
 
 class RawEntry(Base):
     """Tabela para armazenar entradas brutas do Telegram"""
     __tablename__ = 'raw_entries'
+    __table_args__ = (
+        # Ingestão idempotente: a mesma mensagem do Telegram só entra uma vez
+        Index('uq_raw_entries_agente_message', 'agente_id', 'telegram_message_id', unique=True),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     timestamp_captura = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -24,6 +39,9 @@ class RawEntry(Base):
     longitude = Column(Float, nullable=True)
     processado = Column(Boolean, default=False, nullable=False)
     telegram_message_id = Column(Integer, nullable=True)
+    telegram_message_ids = Column(JSON, nullable=True)  # Todas as mensagens de um relato agrupado
+    cluster_id = Column(Integer, nullable=True, index=True)  # Grupo de relatos quase duplicados
+    geohash = Column(String(12), nullable=True, index=True)  # Célula geoespacial (busca por raio)
     
     # Relationship
     structured_entries = relationship("StructuredEntry", back_populates="raw_entry")
@@ -53,6 +71,7 @@ class StructuredEntry(Base):
     tipo_demanda = Column(String(20), nullable=True)
     descricao_curta = Column(String(500), nullable=True)  # Aumentado para PostgreSQL
     prioridade_percebida = Column(String(10), nullable=True)
+    consentimento_comunicacao = Column(Boolean, nullable=True)
     
     # Metadados de controle
     fonte = Column(String(20), default="texto_digitado", nullable=False)
@@ -68,6 +87,7 @@ class StructuredEntry(Base):
     extraction_status = Column(String(20), default="pending", nullable=False)
     error_msg = Column(Text, nullable=True)
     llm_metadata = Column(JSON, nullable=True)  # Metadados do LLM em JSON
+    prompt_version = Column(String(20), nullable=True, index=True)  # prompts.PROMPT_VERSION da extração
     processing_attempts = Column(Integer, default=0, nullable=False)
     last_processed_at = Column(DateTime, nullable=True)
     
@@ -77,10 +97,97 @@ class StructuredEntry(Base):
     def __repr__(self):
         return f"<StructuredEntry(id={self.id}, nome='{self.nome}', status='{self.extraction_status}')>"
 
+class TextSignature(Base):
+    """Assinatura MinHash do texto_original (detecção de relatos quase duplicados)"""
+    __tablename__ = 'text_signatures'
+    
+    raw_id = Column(Integer, ForeignKey('raw_entries.id'), primary_key=True)
+    signature = Column(JSON, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+class LshBucket(Base):
+    """Bucket LSH (banda da assinatura MinHash) → raw_entry"""
+    __tablename__ = 'lsh_buckets'
+    __table_args__ = (
+        Index('ix_lsh_buckets_bucket', 'bucket'),
+    )
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    bucket = Column(String(40), nullable=False)
+    raw_id = Column(Integer, ForeignKey('raw_entries.id'), nullable=False)
+
+class TelegramMessage(Base):
+    """Mensagem do Telegram já ingerida → raw_entry (todas as mensagens de um relato agrupado)"""
+    __tablename__ = 'telegram_messages'
+    
+    agente_id = Column(String(50), primary_key=True)
+    message_id = Column(Integer, primary_key=True)
+    raw_id = Column(Integer, ForeignKey('raw_entries.id', ondelete='CASCADE'), nullable=False, index=True)
+
+def rebuild_message_keys(connection) -> int:
+    """Recria telegram_messages a partir de raw_entries (a primeira ingestão de cada mensagem vence)"""
+    connection.execute(TelegramMessage.__table__.delete())
+    rows = connection.execute(text(
+        "SELECT id, agente_id, telegram_message_id, telegram_message_ids FROM raw_entries "
+        "WHERE telegram_message_id IS NOT NULL ORDER BY id"
+    )).all()
+    keys = {}
+    for raw_id, agente_id, message_id, message_ids in rows:
+        if isinstance(message_ids, str):
+            message_ids = json.loads(message_ids)
+        for known_id in (message_ids or [message_id]):
+            keys.setdefault((agente_id, known_id), raw_id)
+    if keys:
+        connection.execute(TelegramMessage.__table__.insert(), [
+            {"agente_id": agente_id, "message_id": message_id, "raw_id": raw_id}
+            for (agente_id, message_id), raw_id in keys.items()
+        ])
+    return len(keys)
+
+class GeoHeatmapCell(Base):
+    """Agregado do mapa de calor: demandas por célula de geohash"""
+    __tablename__ = 'geo_heatmap'
+    
+    cell = Column(String(12), primary_key=True)
+    total = Column(Integer, default=0, nullable=False)
+    latitude = Column(Float, nullable=False)   # Centro da célula
+    longitude = Column(Float, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+class RecentMessageFilter:
+    """Filtro LRU em memória das mensagens já ingeridas (rejeita redeliveries sem ir ao banco)"""
+    
+    def __init__(self, max_size: int = 10000):
+        self.max_size = max_size
+        self._seen = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def seen(self, agente_id: str, message_id: int) -> bool:
+        """True se a mensagem já foi ingerida recentemente"""
+        key = (str(agente_id), message_id)
+        with self._lock:
+            if key in self._seen:
+                self._seen.move_to_end(key)
+                return True
+            return False
+    
+    def add(self, agente_id: str, message_id: int):
+        """Registra a mensagem como ingerida"""
+        key = (str(agente_id), message_id)
+        with self._lock:
+            self._seen[key] = True
+            self._seen.move_to_end(key)
+            while len(self._seen) > self.max_size:
+                self._seen.popitem(last=False)
+
+# Versão do schema lida uma única vez por URL neste processo
+_schema_versions = {}
+_schema_lock = threading.Lock()
+
 class DatabaseManager:
     """Classe para gerenciar conexões PostgreSQL de forma robusta"""
     
-    def __init__(self, database_url=None):
+    def __init__(self, database_url=None, init_schema=True):
         # Usar URL fornecida ou da variável de ambiente
         self.database_url = database_url or os.getenv("DATABASE_URL")
         
@@ -98,38 +205,66 @@ class DatabaseManager:
             max_overflow=10,
             pool_timeout=30,
             pool_recycle=3600,
+            poolclass=InstrumentedQueuePool,  # Mede a espera por conexão (metrics)
             echo=False  # Mudar para True para debug SQL
         )
+        instrument_engine(self.engine)
         
-        # Criar sessão
-        Session = sessionmaker(bind=self.engine)
-        self.session = Session()
+        # Sessão por thread (requisições do gunicorn, workers do executor);
+        # o web app descarta a sessão ao fim de cada requisição
+        self.session = scoped_session(sessionmaker(bind=self.engine))
         
-        # Inicializar tabelas
-        self.init_database()
+        # Ingestão idempotente
+        self.recent_messages = RecentMessageFilter()
+        self._ingest_index_ready = None
+        
+        # Verificar tabelas (uma vez por processo)
+        if init_schema:
+            self.ensure_schema()
     
-    def init_database(self):
-        """Inicializa as tabelas no banco de dados"""
-        try:
-            Base.metadata.create_all(self.engine)
-            print("✅ Tabelas criadas/verificadas com sucesso")
-        except Exception as e:
-            print(f"❌ Erro ao criar tabelas: {e}")
-            raise
+    def ensure_schema(self):
+        """
+        Lê (uma vez, cacheado) a versão do schema registrada em schema_version
+        Banco vazio recebe todas as migrações; banco desatualizado só gera aviso
+        (as migrações rodam no deploy: python schema_migrations.py)
+        """
+        with _schema_lock:
+            if self.database_url in _schema_versions:
+                return _schema_versions[self.database_url]
+            
+            from schema_migrations import LATEST_VERSION, apply_migrations, current_version
+            with self.engine.connect() as connection:
+                version = current_version(connection)
+                fresh = version == 0 and not inspect(connection).has_table('raw_entries')
+            
+            if fresh:
+                apply_migrations(self.engine)
+                version = LATEST_VERSION
+                logger.info(f"Tabelas criadas (schema versão {version})")
+            elif version < LATEST_VERSION:
+                logger.warning(f"Schema na versão {version} (última {LATEST_VERSION}) - execute python schema_migrations.py")
+            
+            _schema_versions[self.database_url] = version
+            return version
+    
+    @property
+    def schema_version(self) -> int:
+        """Versão do schema (cacheada)"""
+        return self.ensure_schema()
     
     def ensure_clean_transaction(self):
         """Garante que não há transações em estado de erro"""
         try:
-            if self.session.in_transaction():
-                self.session.rollback()
+            # in_transaction não é delegado pelo scoped_session: pegar a sessão da thread
+            session = self.session()
+            if session.in_transaction():
+                session.rollback()
         except Exception:
-            # Se houver erro, fechar e recriar sessão
+            # Se houver erro, descartar a sessão desta thread (a próxima é nova)
             try:
-                self.session.close()
+                self.session.remove()
             except:
                 pass
-            Session = sessionmaker(bind=self.engine)
-            self.session = Session()
     
     def safe_query(self, query_func):
         """Executa query com tratamento seguro de transações"""
@@ -140,21 +275,137 @@ class DatabaseManager:
             self.ensure_clean_transaction()
             raise e
     
-    def save_raw_entry(self, agente_id: str, texto: str, message_id: int = None, lat: float = None, lon: float = None):
-        """Salva uma entrada bruta no banco"""
-        def _save():
-            entry = RawEntry(
-                agente_id=agente_id,
-                texto_original=texto,
-                telegram_message_id=message_id,
-                latitude=lat,
-                longitude=lon
+    def ingest_index_ready(self) -> bool:
+        """Verifica (uma vez) se o índice único e a tabela de mensagens ingeridas existem no banco"""
+        if self._ingest_index_ready is None:
+            inspector = inspect(self.engine)
+            self._ingest_index_ready = inspector.has_table('telegram_messages') and any(
+                index.get('unique') and index['column_names'] == ['agente_id', 'telegram_message_id']
+                for index in inspector.get_indexes('raw_entries')
             )
+            if not self._ingest_index_ready:
+                logger.warning("Estruturas de ingestão idempotente ausentes - execute python schema_migrations.py")
+        return self._ingest_index_ready
+    
+    def _dialect_insert(self):
+        """insert() com ON CONFLICT do dialeto (PostgreSQL, SQLite >= 3.35); None se indisponível"""
+        dialect = self.engine.dialect
+        if dialect.name == 'postgresql':
+            return postgresql.insert
+        if dialect.name == 'sqlite' and dialect.server_version_info >= (3, 35):
+            return sqlite.insert
+        return None
+    
+    def _insert_ignoring_duplicate(self, values: dict):
+        """
+        Grava a raw_entry e a chave de cada mensagem do relato na mesma transação
+        None se qualquer uma das mensagens já foi ingerida (inclusive fragmentos não iniciais)
+        """
+        agente_id = values['agente_id']
+        message_ids = values['telegram_message_ids'] or [values['telegram_message_id']]
+        
+        if not self.ingest_index_ready():
+            # Banco sem as estruturas de ingestão: verificação prévia (não atômica)
+            existing = self.session.query(RawEntry.id).filter(
+                RawEntry.agente_id == agente_id,
+                RawEntry.telegram_message_id == values['telegram_message_id']
+            ).first()
+            if existing:
+                return None
+            entry = RawEntry(**values)
             self.session.add(entry)
             self.session.commit()
             return entry.id
         
-        return self.safe_query(_save)
+        dialect_insert = self._dialect_insert()
+        if dialect_insert is None:
+            return self._insert_with_savepoint(values, message_ids)
+        
+        # Savepoint: desfaz só esta ingestão, nunca o resto pendente na sessão
+        savepoint = self.session.begin_nested()
+        raw_id = self.session.execute(
+            dialect_insert(RawEntry).values(**values)
+            .on_conflict_do_nothing(index_elements=['agente_id', 'telegram_message_id'])
+            .returning(RawEntry.id)
+        ).scalar()
+        if raw_id is not None:
+            keys = self.session.execute(
+                dialect_insert(TelegramMessage).values([
+                    {'agente_id': agente_id, 'message_id': message_id, 'raw_id': raw_id}
+                    for message_id in message_ids
+                ])
+                .on_conflict_do_nothing(index_elements=['agente_id', 'message_id'])
+                .returning(TelegramMessage.message_id)
+            ).scalars().all()
+            if len(keys) < len(message_ids):
+                # Algum fragmento do relato já pertence a outra raw_entry
+                raw_id = None
+        if raw_id is None:
+            savepoint.rollback()
+            return None
+        savepoint.commit()
+        self.session.commit()
+        return raw_id
+    
+    def _insert_with_savepoint(self, values: dict, message_ids: list):
+        """Sem ON CONFLICT no dialeto: insere e trata a violação de unicidade dentro de um savepoint"""
+        savepoint = self.session.begin_nested()
+        try:
+            entry = RawEntry(**values)
+            self.session.add(entry)
+            self.session.flush()
+            self.session.add_all([
+                TelegramMessage(agente_id=values['agente_id'], message_id=message_id, raw_id=entry.id)
+                for message_id in message_ids
+            ])
+            self.session.flush()
+        except IntegrityError:
+            # Corrida com outra ingestão da mesma mensagem: a primeira venceu
+            savepoint.rollback()
+            return None
+        savepoint.commit()
+        self.session.commit()
+        return entry.id
+    
+    def save_raw_entry(self, agente_id: str, texto: str, message_id: int = None, lat: float = None, lon: float = None,
+                       message_ids: list = None):
+        """
+        Salva uma entrada bruta no banco (message_ids: mensagens de um relato agrupado)
+        Idempotente por (agente_id, message_id) de cada mensagem: retorna None se alguma já foi ingerida
+        """
+        if message_id is not None and self.recent_messages.seen(agente_id, message_id):
+            return None
+        
+        ingest_start = time.perf_counter()
+        values = {
+            'agente_id': agente_id,
+            'texto_original': texto,
+            'telegram_message_id': message_id,
+            'telegram_message_ids': message_ids,
+            'latitude': lat,
+            'longitude': lon
+        }
+        
+        def _save():
+            if message_id is None:
+                entry = RawEntry(**values)
+                self.session.add(entry)
+                self.session.commit()
+                return entry.id
+            return self._insert_ignoring_duplicate(values)
+        
+        with tracing.span("save_raw_entry", agente_id=agente_id, message_id=message_id,
+                          message_ids=message_ids) as span:
+            raw_id = self.safe_query(_save)
+            span.set_attribute("raw_id", raw_id)
+            span.set_attribute("duplicate", raw_id is None)
+        INGEST_SECONDS.observe(time.perf_counter() - ingest_start)
+        
+        if message_id is not None:
+            for known_id in (message_ids or [message_id]):
+                self.recent_messages.add(agente_id, known_id)
+        
+        return raw_id
     
     def get_unprocessed_entries(self):
         """Retorna entradas que ainda não foram processadas"""
@@ -214,36 +465,62 @@ class DatabaseManager:
     def close(self):
         """Fecha a conexão com o banco"""
         try:
-            self.session.close()
+            self.session.remove()
         except:
             pass
+    
+    def dispose_after_fork(self):
+        """
+        Processo filho (gunicorn com --preload): descarta o pool herdado do
+        master sem fechar as conexões dele, e começa com sessões novas
+        """
+        self.session.remove()
+        self.engine.dispose(close=False)
 
-# Instância global - será inicializada pela aplicação
+# Instância global - criada no primeiro uso (nada acontece no import)
 db_manager = None
+_db_manager_lock = threading.Lock()
 
 def init_db(database_url=None):
-    """Inicializa o gerenciador de banco de dados"""
+    """Inicialização explícita (entry points): conecta e verifica o schema"""
     global db_manager
-    db_manager = DatabaseManager(database_url)
+    with _db_manager_lock:
+        db_manager = DatabaseManager(database_url)
     return db_manager
 
 def get_db():
-    """Retorna a instância do gerenciador de banco"""
+    """Retorna a instância do gerenciador de banco (criada no primeiro uso)"""
     global db_manager
     if db_manager is None:
-        db_manager = DatabaseManager()
+        with _db_manager_lock:
+            if db_manager is None:
+                db_manager = DatabaseManager()
     return db_manager
 
+def remove_session():
+    """Fim de requisição: devolve a conexão da sessão desta thread ao pool"""
+    if db_manager is not None:
+        db_manager.session.remove()
+
 # Para compatibilidade com código existente
 class LegacyDatabase:
-    """Wrapper para manter compatibilidade com código existente"""
+    """Wrapper para manter compatibilidade com código existente (lazy)"""
     
-    def __init__(self):
-        self.manager = get_db()
-        self.session = self.manager.session
+    @property
+    def manager(self):
+        return get_db()
+    
+    @property
+    def session(self):
+        # Sessão da thread atual (scoped_session)
+        return self.manager.session
     
     def ensure_transaction_rollback(self):
         return self.manager.ensure_clean_transaction()
+    
+    def __getattr__(self, name):
+        # Delegar métodos do DatabaseManager (save_raw_entry, mark_as_processed...)
+        return getattr(self.manager, name)
 
-# Instância para compatibilidade
+# Instância para compatibilidade (não conecta no import)
 db = LegacyDatabase()
\ No newline at end of file
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Avaliação offline de variantes de prompt/modelo
+Conjunto de referência: structured_entries revisadas (revisado = True).
+Cada variante do LLMExtractor roda o conjunto em paralelo e o relatório traz
+acerto por campo, taxa de JSON inválido, tokens, latência p50/p95 e custo
+por 1.000 relatos.
+Uso: python eval_harness.py [--limit 200] [--workers 4]
+         [--variants "base:model=gpt-3.5-turbo;mini:model=gpt-4o-mini,few_shot=false"]
+         [--export golden.jsonl | --dataset golden.jsonl] [--output relatorio.json]
+"""
+import argparse
+import json
+import logging
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+from config import LLM_MODEL, LLM_CASCADE_MODELS, OPENAI_API_KEY
+from llm_cascade import TierStats, parse_models
+from pre_extractor import normalize_text
+
+logger = logging.getLogger(__name__)
+
+# Campos comparados com a revisão humana (texto livre como descricao_curta fica de fora)
+EVAL_FIELDS = [
+    "data_contato", "hora_contato", "nome", "telefone", "bairro",
+    "tipo_demanda", "prioridade_percebida", "consentimento_comunicacao",
+]
+
+_NON_DIGIT = re.compile(r'\D')
+_SPACES = re.compile(r'\s+')
+
+def load_golden_dataset(session, limit: int = None) -> List[Dict[str, Any]]:
+    """Relatos revisados com os valores corrigidos pelo revisor"""
+    from database import RawEntry, StructuredEntry
+
+    query = session.query(StructuredEntry, RawEntry).join(
+        RawEntry, StructuredEntry.raw_text_id == RawEntry.id
+    ).filter(StructuredEntry.revisado == True).order_by(StructuredEntry.id)
+    if limit:
+        query = query.limit(limit)
+    return [
+        {
+            "structured_id": structured.id,
+            "raw_text": raw.texto_original,
+            "capture_timestamp": raw.timestamp_captura.isoformat(),
+            "expected": {field: getattr(structured, field) for field in EVAL_FIELDS},
+        }
+        for structured, raw in query.all()
+    ]
+
+def normalize_value(field: str, value: Any) -> Any:
+    """Forma canônica para comparação (acentos, caixa, máscara de telefone)"""
+    if value is None or value == "":
+        return None
+    if field == "consentimento_comunicacao":
+        return str(value).strip().lower() in ("true", "1", "sim")
+    if field == "telefone":
+        digits = _NON_DIGIT.sub("", str(value))
+        return digits[-11:] if digits else None
+    return _SPACES.sub(" ", normalize_text(str(value))).strip()
+
+def parse_variants(spec: str) -> List[Dict[str, Any]]:
+    """
+    "nome:model=x,few_shot=false,pre=true,cascade=a|b;nome2:..." → variantes
+    """
+    variants = []
+    for chunk in filter(None, (part.strip() for part in (spec or "").split(";"))):
+        name, _, options = chunk.partition(":")
+        variant = {"name": name.strip(), "model": LLM_MODEL, "few_shot": True,
+                   "pre_extraction": True, "cascade": None}
+        for option in filter(None, (item.strip() for item in options.split(","))):
+            key, _, value = option.partition("=")
+            key, value = key.strip(), value.strip()
+            if key == "model":
+                variant["model"] = value
+            elif key == "few_shot":
+                variant["few_shot"] = value.lower() == "true"
+            elif key == "pre":
+                variant["pre_extraction"] = value.lower() == "true"
+            elif key == "cascade":
+                variant["cascade"] = [model for model in value.split("|") if model]
+            else:
+                raise ValueError(f"Opção desconhecida na variante {name}: {key}")
+        variants.append(variant)
+    return variants
+
+def default_variants() -> List[Dict[str, Any]]:
+    """Configuração atual, sem few-shots e a cascata configurada"""
+    return parse_variants(
+        f"atual:model={LLM_MODEL};"
+        f"sem_few_shot:model={LLM_MODEL},few_shot=false;"
+        f"cascata:cascade={'|'.join(parse_models(LLM_CASCADE_MODELS))}"
+    )
+
+def _percentile(values: List[float], percentile: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(int(round(percentile / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+class EvalHarness:
+    """Roda o conjunto de referência em cada variante e agrega as métricas"""
+
+    def __init__(self, dataset: List[Dict[str, Any]], workers: int = 4, extractor_factory=None):
+        self.dataset = dataset
+        self.workers = workers
+        self.extractor_factory = extractor_factory or self._build_extractor
+
+    def _build_extractor(self, variant: Dict[str, Any], stats: TierStats):
+        from llm_extractor import LLMExtractor
+        return LLMExtractor(model=variant["model"], cascade_models=variant["cascade"], stats=stats)
+
+    def _run_item(self, extractor, variant: Dict[str, Any], item: Dict[str, Any]) -> Dict[str, Any]:
+        start = time.perf_counter()
+        data, metadata = extractor.extract_from_text(
+            item["raw_text"],
+            use_few_shot=variant["few_shot"],
+            capture_timestamp=item["capture_timestamp"],
+            use_pre_extraction=variant["pre_extraction"]
+        )
+        latency = time.perf_counter() - start
+        failed = metadata.get("extraction_status") == "error" or metadata.get("json_repaired", False)
+        matches = {
+            field: normalize_value(field, data.get(field)) == normalize_value(field, item["expected"].get(field))
+            for field in EVAL_FIELDS
+        }
+        return {"latency": latency, "json_failure": failed, "matches": matches,
+                "llm_skipped": metadata.get("llm_skipped", False)}
+
+    def evaluate(self, variant: Dict[str, Any]) -> Dict[str, Any]:
+        """Métricas de uma variante sobre todo o conjunto"""
+        stats = TierStats()
+        extractor = self.extractor_factory(variant, stats)
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            items = list(pool.map(lambda item: self._run_item(extractor, variant, item), self.dataset))
+
+        total = len(items) or 1
+        latencies = [item["latency"] for item in items]
+        tiers = stats.snapshot()
+        cost = sum(tier["cost_usd"] for tier in tiers.values())
+        return {
+            "variant": variant["name"],
+            "config": {key: value for key, value in variant.items() if key != "name"},
+            "reports": len(items),
+            "field_accuracy": {
+                field: round(sum(item["matches"][field] for item in items) / total, 3)
+                for field in EVAL_FIELDS
+            },
+            "accuracy": round(
+                sum(sum(item["matches"].values()) for item in items) / (total * len(EVAL_FIELDS)), 3
+            ),
+            "json_failure_rate": round(sum(item["json_failure"] for item in items) / total, 3),
+            "llm_skipped_rate": round(sum(item["llm_skipped"] for item in items) / total, 3),
+            "prompt_tokens": sum(tier["prompt_tokens"] for tier in tiers.values()),
+            "completion_tokens": sum(tier["completion_tokens"] for tier in tiers.values()),
+            "p50_latency_ms": round(_percentile(latencies, 50) * 1000, 1),
+            "p95_latency_ms": round(_percentile(latencies, 95) * 1000, 1),
+            "cost_per_1k_reports_usd": round(cost / total * 1000, 4),
+            "tiers": tiers,
+        }
+
+    def run(self, variants: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return [self.evaluate(variant) for variant in variants]
+
+def print_report(results: List[Dict[str, Any]]):
+    print(f"{'variante':<16} {'acerto':>7} {'json%':>6} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'tokens':>9} {'US$/1k':>8}")
+    for result in results:
+        tokens = result["prompt_tokens"] + result["completion_tokens"]
+        print(f"{result['variant']:<16} {result['accuracy']:>7.3f} {result['json_failure_rate'] * 100:>6.1f} "
+              f"{result['p50_latency_ms']:>8} {result['p95_latency_ms']:>8} {tokens:>9} "
+              f"{result['cost_per_1k_reports_usd']:>8}")
+    print("\nAcerto por campo:")
+    print(f"{'campo':<28}" + "".join(f"{result['variant']:>16}" for result in results))
+    for field in EVAL_FIELDS:
+        print(f"{field:<28}" + "".join(f"{result['field_accuracy'][field]:>16.3f}" for result in results))
+
+def main():
+    parser = argparse.ArgumentParser(description="Avaliação offline de variantes de prompt/modelo")
+    parser.add_argument("--limit", type=int, help="Máximo de relatos revisados")
+    parser.add_argument("--workers", type=int, default=4, help="Chamadas simultâneas por variante")
+    parser.add_argument("--variants", help="Variantes 'nome:model=x,few_shot=false;...' (default: atual)")
+    parser.add_argument("--dataset", help="Usa um conjunto exportado (JSONL) em vez do banco")
+    parser.add_argument("--export", help="Exporta o conjunto de referência (JSONL) e sai")
+    parser.add_argument("--output", help="Salva o relatório em JSON")
+    args = parser.parse_args()
+
+    if args.dataset:
+        with open(args.dataset, encoding="utf-8") as source:
+            dataset = [json.loads(line) for line in source if line.strip()]
+        dataset = dataset[:args.limit] if args.limit else dataset
+    else:
+        from database import db, init_db
+        init_db()
+        dataset = load_golden_dataset(db.session, args.limit)
+
+    print("AgenticLead - Avaliação offline")
+    print("=" * 35)
+    print(f"Conjunto de referência: {len(dataset)} relatos revisados")
+
+    if args.export:
+        with open(args.export, "w", encoding="utf-8") as target:
+            for item in dataset:
+                target.write(json.dumps(item, ensure_ascii=False) + "\n")
+        print(f"✅ Exportado para {args.export}")
+        return
+
+    if not dataset:
+        print("❌ Nenhum relato revisado (revisado = True) para avaliar")
+        sys.exit(1)
+    if not OPENAI_API_KEY:
+        print("❌ OPENAI_API_KEY não configurada!")
+        sys.exit(1)
+
+    variants = parse_variants(args.variants) if args.variants else default_variants()
+    results = EvalHarness(dataset, workers=args.workers).run(variants)
+    print()
+    print_report(results)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as target:
+            json.dump(results, target, ensure_ascii=False, indent=2)
+        print(f"\n📄 Relatório salvo em {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Worker de exportação: serialização pandas/openpyxl fora do event loop
+O bot apenas aguarda um future enquanto o processo filho gera XLSX/CSV
+"""
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from typing import Dict, Any, Optional
+from config import EXPORT_IN_PROCESS_POOL, EXPORT_WORKERS
+from exporter import run_export_job
+from metrics import EXPORT_SECONDS
+
+logger = logging.getLogger(__name__)
+
+class ExportWorker:
+    """Executa exports em um ProcessPoolExecutor dedicado"""
+    
+    def __init__(self, use_process_pool: bool = None, max_workers: int = None):
+        self.use_process_pool = EXPORT_IN_PROCESS_POOL if use_process_pool is None else use_process_pool
+        self.max_workers = max_workers or EXPORT_WORKERS
+        self._pool: Optional[ProcessPoolExecutor] = None
+    
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: o filho abre sua própria conexão (engine não é herdada via fork)
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+            logger.info(f"Pool de exportação iniciado ({self.max_workers} processo(s))")
+        return self._pool
+    
+    async def export(self, xlsx_filename: str = None, csv_filename: str = None) -> Dict[str, Any]:
+        """
+        Gera XLSX e CSV sem bloquear o event loop
+        Retorna {"xlsx", "csv", "rows", "errors", "export_time"}
+        """
+        start_time = datetime.now()
+        loop = asyncio.get_running_loop()
+        
+        # Sem pool de processos: ao menos tira o trabalho do event loop (thread)
+        executor = self._get_pool() if self.use_process_pool else None
+        
+        try:
+            results = await loop.run_in_executor(executor, run_export_job, xlsx_filename, csv_filename)
+        except BrokenProcessPool as e:
+            logger.error(f"Processo de exportação morreu: {e}")
+            self._pool = None
+            results = {"xlsx": None, "csv": None, "rows": 0, "errors": [str(e)]}
+        except Exception as e:
+            # Falha fora de export_all (consulta, pickle do resultado...): não derruba o chamador
+            logger.error(f"Erro na exportação: {e}")
+            results = {"xlsx": None, "csv": None, "rows": 0, "errors": [str(e)]}
+        
+        elapsed = (datetime.now() - start_time).total_seconds()
+        EXPORT_SECONDS.observe(elapsed, status="error" if results.get("errors") else "ok")
+        results["export_time"] = round(elapsed, 2)
+        return results
+    
+    def shutdown(self):
+        """Encerra os processos de exportação"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+# Instância compartilhada (o AutoProcessor é criado a cada mensagem)
+_export_worker = None
+
+def get_export_worker() -> ExportWorker:
+    """Retorna o worker de exportação do processo"""
+    global _export_worker
+    if _export_worker is None:
+        _export_worker = ExportWorker()
+    return _export_worker
@@ -36,6 +36,7 @@ class DataExporter:
                     # Identificadores
                     'id_registro': structured.id,
                     'raw_text_id': structured.raw_text_id,
+                    'cluster_id': raw.cluster_id,
                     
                     # Dados do contato
                     'data_contato': structured.data_contato,
@@ -140,6 +141,40 @@ class DataExporter:
             logger.error(f"Erro ao exportar para CSV: {e}")
             raise
     
+    def export_all(self, xlsx_filename: Optional[str] = None, csv_filename: Optional[str] = None) -> Dict:
+        """
+        Exporta XLSX e CSV a partir de uma única consulta
+        Falha em um formato não impede o outro
+        """
+        results = {"xlsx": None, "csv": None, "rows": 0, "errors": []}
+        
+        data = self.get_structured_data()
+        if not data:
+            results["errors"].append("Nenhum dado encontrado para exportação")
+            return results
+        
+        df = pd.DataFrame(data)
+        results["rows"] = len(df)
+        
+        try:
+            filename = xlsx_filename or "agenticlead_dados.xlsx"
+            df.to_excel(filename, index=False, engine='openpyxl')
+            results["xlsx"] = filename
+        except Exception as e:
+            logger.error(f"Erro ao exportar para XLSX: {e}")
+            results["errors"].append(f"xlsx: {e}")
+        
+        try:
+            filename = csv_filename or "agenticlead_dados.csv"
+            df.to_csv(filename, index=False, encoding='utf-8')
+            results["csv"] = filename
+        except Exception as e:
+            logger.error(f"Erro ao exportar para CSV: {e}")
+            results["errors"].append(f"csv: {e}")
+        
+        logger.info(f"Export concluído ({len(df)} registros)")
+        return results
+    
     def get_export_stats(self) -> Dict:
         """Retorna estatísticas dos dados disponíveis para export"""
         try:
@@ -166,6 +201,10 @@ class DataExporter:
             logger.error(f"Erro ao calcular estatísticas de export: {e}")
             return {}
 
+def run_export_job(xlsx_filename: Optional[str] = None, csv_filename: Optional[str] = None) -> Dict:
+    """Ponto de entrada do processo de exportação (ver export_worker.py)"""
+    return DataExporter().export_all(xlsx_filename, csv_filename)
+
 def main():
     """Função principal para teste do exportador"""
     print("AgenticLead - Exportador de Dados")
@@ -0,0 +1,217 @@
+"""
+Índice geoespacial dos relatos (geohash) e consultas por proximidade
+A coluna raw_entries.geohash (btree) funciona igual no PostgreSQL e no SQLite:
+a busca por raio vira consultas de intervalo por prefixo de célula, e a
+distância exata (haversine) é conferida só nos candidatos
+"""
+import logging
+import math
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import or_
+
+from database import db, GeoHeatmapCell, RawEntry, StructuredEntry
+from session_merge import LOCATION_TEXT_PREFIX
+
+logger = logging.getLogger(__name__)
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+# Precisão gravada no relato (~4,8 m) e das células do mapa de calor (~1,2 km x 0,6 km)
+GEOHASH_PRECISION = 9
+HEATMAP_PRECISION = 6
+
+DEFAULT_RADIUS_METERS = 300
+MAX_RADIUS_METERS = 5000
+
+# Limite de células por consulta: acima disso usa uma precisão mais grossa
+MAX_QUERY_CELLS = 64
+
+EARTH_RADIUS_METERS = 6371000
+
+def encode_geohash(latitude: float, longitude: float, precision: int = GEOHASH_PRECISION) -> str:
+    """Codifica latitude/longitude em geohash"""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(chars) < precision:
+        value_range, value = (lon_range, longitude) if even else (lat_range, latitude)
+        middle = (value_range[0] + value_range[1]) / 2
+        if value >= middle:
+            bits = (bits << 1) | 1
+            value_range[0] = middle
+        else:
+            bits <<= 1
+            value_range[1] = middle
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits = 0
+            bit_count = 0
+    return "".join(chars)
+
+def decode_geohash(geohash: str) -> Tuple[float, float]:
+    """Centro da célula (latitude, longitude)"""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    even = True
+    for char in geohash:
+        value = _BASE32.index(char)
+        for shift in range(4, -1, -1):
+            value_range = lon_range if even else lat_range
+            middle = (value_range[0] + value_range[1]) / 2
+            if (value >> shift) & 1:
+                value_range[0] = middle
+            else:
+                value_range[1] = middle
+            even = not even
+    return (lat_range[0] + lat_range[1]) / 2, (lon_range[0] + lon_range[1]) / 2
+
+def cell_size_degrees(precision: int) -> Tuple[float, float]:
+    """Altura e largura (graus) de uma célula de geohash"""
+    lon_bits = math.ceil(precision * 5 / 2)
+    lat_bits = math.floor(precision * 5 / 2)
+    return 180.0 / (2 ** lat_bits), 360.0 / (2 ** lon_bits)
+
+def haversine_meters(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Distância em metros entre dois pontos"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = math.radians(lat2 - lat1)
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_METERS * math.asin(math.sqrt(a))
+
+def covering_cells(latitude: float, longitude: float, radius_meters: float) -> List[str]:
+    """Células de geohash que cobrem o círculo (precisão mais fina com até MAX_QUERY_CELLS)"""
+    d_lat = radius_meters / 111320.0
+    d_lon = radius_meters / (111320.0 * max(math.cos(math.radians(latitude)), 0.01))
+
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        cell_lat, cell_lon = cell_size_degrees(precision)
+        rows = math.ceil(2 * d_lat / cell_lat) + 1
+        cols = math.ceil(2 * d_lon / cell_lon) + 1
+        if rows * cols > MAX_QUERY_CELLS and precision > 1:
+            continue
+
+        cells = set()
+        for row in range(rows + 1):
+            lat = min(latitude - d_lat + row * cell_lat, latitude + d_lat)
+            for col in range(cols + 1):
+                lon = min(longitude - d_lon + col * cell_lon, longitude + d_lon)
+                cells.add(encode_geohash(lat, lon, precision))
+        return sorted(cells)
+    return []
+
+class GeoIndex:
+    """Mantém o geohash dos relatos e o agregado do mapa de calor"""
+
+    def __init__(self):
+        self.db = db
+
+    def index_entry(self, raw_entry: RawEntry) -> Optional[str]:
+        """
+        Grava o geohash do relato (se tiver coordenadas) e soma 1 na célula do
+        mapa de calor. Localizações puras não contam como demanda.
+        """
+        if raw_entry.latitude is None or raw_entry.longitude is None:
+            return None
+        if (raw_entry.texto_original or "").startswith(LOCATION_TEXT_PREFIX):
+            return None
+        if raw_entry.geohash:
+            return raw_entry.geohash  # Já indexado (e contado no mapa de calor)
+
+        raw_entry.geohash = encode_geohash(raw_entry.latitude, raw_entry.longitude)
+        self._bump_cell(raw_entry.geohash[:HEATMAP_PRECISION])
+        self.db.session.commit()
+        return raw_entry.geohash
+
+    def _bump_cell(self, cell: str):
+        heatmap_cell = self.db.session.get(GeoHeatmapCell, cell)
+        if heatmap_cell is None:
+            latitude, longitude = decode_geohash(cell)
+            heatmap_cell = GeoHeatmapCell(cell=cell, total=0, latitude=latitude, longitude=longitude)
+            self.db.session.add(heatmap_cell)
+        heatmap_cell.total = (heatmap_cell.total or 0) + 1
+        heatmap_cell.updated_at = datetime.utcnow()
+
+    def nearby(self, latitude: float, longitude: float,
+               radius_meters: float = DEFAULT_RADIUS_METERS, limit: int = 100) -> List[Dict[str, Any]]:
+        """Relatos dentro do raio, do mais próximo ao mais distante"""
+        radius_meters = min(radius_meters, MAX_RADIUS_METERS)
+        ranges = [
+            (RawEntry.geohash >= cell) & (RawEntry.geohash < cell + "~")
+            for cell in covering_cells(latitude, longitude, radius_meters)
+        ]
+        if not ranges:
+            return []
+
+        candidates = self.db.session.query(RawEntry, StructuredEntry).outerjoin(
+            StructuredEntry, StructuredEntry.raw_text_id == RawEntry.id
+        ).filter(or_(*ranges)).all()
+
+        results = []
+        for raw, structured in candidates:
+            distance = haversine_meters(latitude, longitude, raw.latitude, raw.longitude)
+            if distance > radius_meters:
+                continue
+            results.append({
+                "raw_id": raw.id,
+                "structured_id": structured.id if structured else None,
+                "latitude": raw.latitude,
+                "longitude": raw.longitude,
+                "distance_m": round(distance, 1),
+                "tipo_demanda": structured.tipo_demanda if structured else None,
+                "descricao_curta": structured.descricao_curta if structured else None,
+                "bairro": structured.bairro if structured else None,
+                "timestamp_captura": raw.timestamp_captura.isoformat(),
+            })
+        results.sort(key=lambda item: item["distance_m"])
+        return results[:limit]
+
+    def heatmap(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """Células com mais demandas (agregado pré-calculado)"""
+        cells = self.db.session.query(GeoHeatmapCell).order_by(
+            GeoHeatmapCell.total.desc()
+        ).limit(limit).all()
+        return [
+            {"cell": cell.cell, "total": cell.total,
+             "latitude": round(cell.latitude, 5), "longitude": round(cell.longitude, 5)}
+            for cell in cells
+        ]
+
+def rebuild_heatmap(connection):
+    """Recalcula geohash e mapa de calor a partir de raw_entries (migração/backfill)"""
+    rows = connection.execute(
+        RawEntry.__table__.select().with_only_columns(
+            RawEntry.id, RawEntry.latitude, RawEntry.longitude, RawEntry.texto_original
+        ).where(RawEntry.latitude.isnot(None), RawEntry.longitude.isnot(None))
+    ).all()
+
+    totals: Dict[str, int] = {}
+    indexed = 0
+    for raw_id, latitude, longitude, texto in rows:
+        # Mesma regra do index_entry: localização pura não é demanda
+        if (texto or "").startswith(LOCATION_TEXT_PREFIX):
+            continue
+        geohash = encode_geohash(latitude, longitude)
+        connection.execute(
+            RawEntry.__table__.update().where(RawEntry.id == raw_id).values(geohash=geohash)
+        )
+        cell = geohash[:HEATMAP_PRECISION]
+        totals[cell] = totals.get(cell, 0) + 1
+        indexed += 1
+
+    connection.execute(GeoHeatmapCell.__table__.delete())
+    if totals:
+        now = datetime.utcnow()
+        connection.execute(GeoHeatmapCell.__table__.insert(), [
+            {"cell": cell, "total": total, "latitude": decode_geohash(cell)[0],
+             "longitude": decode_geohash(cell)[1], "updated_at": now}
+            for cell, total in totals.items()
+        ])
+    return indexed
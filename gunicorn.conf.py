@@ -0,0 +1,55 @@
+"""
+Configuração do gunicorn para servir o web_app em produção
+Uso: gunicorn -c gunicorn.conf.py web_app:app
+"""
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+
+# Processos x threads (gthread): cada thread atende uma requisição com sua própria sessão
+workers = int(os.getenv("WEB_CONCURRENCY", min(multiprocessing.cpu_count() * 2 + 1, 8)))
+threads = int(os.getenv("WEB_THREADS", "4"))
+worker_class = "gthread"
+timeout = int(os.getenv("WEB_TIMEOUT", "30"))
+keepalive = 5
+
+# Carrega o app (imports, templates) uma vez no master e compartilha via fork
+preload_app = True
+
+accesslog = "-"
+errorlog = "-"
+loglevel = os.getenv("LOG_LEVEL", "info").lower()
+
+def on_starting(server):
+    """Master: descarta snapshots de métricas de execuções anteriores"""
+    import metrics
+    metrics.clear_multiproc_dir()
+
+def when_ready(server):
+    """Master: verifica o schema uma única vez antes de criar os workers"""
+    from database import init_db
+    init_db()
+    server.log.info("Banco inicializado no master")
+
+def post_fork(server, worker):
+    """Worker: não reaproveita conexões abertas pelo master"""
+    import database
+    import metrics
+    if database.db_manager is not None:
+        database.db_manager.dispose_after_fork()
+    # Threads não sobrevivem ao fork: cada worker grava o próprio snapshot
+    metrics.start_snapshot_writer()
+
+def worker_exit(server, worker):
+    """Worker: processa relatos pendentes do webhook antes de sair"""
+    import metrics
+    from telegram_webhook import shutdown_dispatcher
+    shutdown_dispatcher()
+    if metrics.METRICS_ENABLED and metrics.METRICS_MULTIPROC_DIR:
+        metrics.REGISTRY.write_snapshot(metrics.METRICS_MULTIPROC_DIR)
+
+def child_exit(server, worker):
+    """Master: gauges do worker encerrado saem da soma (contadores permanecem)"""
+    import metrics
+    metrics.mark_process_dead(worker.pid)
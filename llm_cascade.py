@@ -0,0 +1,85 @@
+"""
+Cascata de modelos: modelo barato/rápido primeiro, escalando para um maior
+só quando a validação aponta problemas ou a confiança fica abaixo do limiar
+Contadores por modelo (chamadas, latência, tokens, custo estimado) valem
+para o processo inteiro
+"""
+import threading
+from typing import Any, Dict, List, Optional
+
+from config import CONFIDENCE_THRESHOLD
+
+# Preço aproximado (USD por 1K tokens: entrada, saída) para estimar custo
+MODEL_PRICES_PER_1K = {
+    "gpt-3.5-turbo": (0.0005, 0.0015),
+    "gpt-4o-mini": (0.00015, 0.0006),
+    "gpt-4o": (0.0025, 0.01),
+    "gpt-4-turbo": (0.01, 0.03),
+}
+
+def parse_models(value: str) -> List[str]:
+    """'modelo1,modelo2' → lista na ordem da cascata (do mais barato ao maior)"""
+    return [model.strip() for model in (value or "").split(",") if model.strip()]
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> Optional[float]:
+    """Custo estimado em USD (None para modelo sem preço conhecido)"""
+    prices = MODEL_PRICES_PER_1K.get(model)
+    if prices is None:
+        return None
+    return (prompt_tokens * prices[0] + completion_tokens * prices[1]) / 1000
+
+def escalation_reason(validation: Dict[str, Any], threshold: float = None) -> Optional[str]:
+    """Motivo para subir de modelo (None se a resposta é aceitável)"""
+    threshold = CONFIDENCE_THRESHOLD if threshold is None else threshold
+    if validation.get("issues"):
+        return "validation_issues"
+    if validation.get("confianca_global", 0) < threshold:
+        return "low_confidence"
+    return None
+
+class TierStats:
+    """Latência, tokens e custo por modelo (thread-safe: lotes usam executor)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tiers: Dict[str, Dict[str, Any]] = {}
+
+    def _tier(self, model: str) -> Dict[str, Any]:
+        return self._tiers.setdefault(model, {
+            "calls": 0, "errors": 0, "total_latency": 0.0, "prompt_tokens": 0,
+            "completion_tokens": 0, "cost_usd": 0.0, "accepted": 0, "escalated": 0,
+        })
+
+    def record_call(self, model: str, latency: float, prompt_tokens: int = 0,
+                    completion_tokens: int = 0, error: bool = False):
+        with self._lock:
+            tier = self._tier(model)
+            tier["calls"] += 1
+            tier["errors"] += int(error)
+            tier["total_latency"] += latency
+            tier["prompt_tokens"] += prompt_tokens
+            tier["completion_tokens"] += completion_tokens
+            tier["cost_usd"] += estimate_cost(model, prompt_tokens, completion_tokens) or 0.0
+
+    def record_outcome(self, model: str, escalated: bool):
+        """Resposta do modelo aceita ou escalada para o próximo"""
+        with self._lock:
+            self._tier(model)["escalated" if escalated else "accepted"] += 1
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Contadores com latência média por chamada"""
+        with self._lock:
+            return {
+                model: {
+                    **{key: value for key, value in tier.items() if key != "total_latency"},
+                    "avg_latency_seconds": round(tier["total_latency"] / tier["calls"], 3) if tier["calls"] else 0,
+                    "cost_usd": round(tier["cost_usd"], 6),
+                }
+                for model, tier in self._tiers.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self._tiers.clear()
+
+tier_stats = TierStats()
@@ -0,0 +1,132 @@
+"""
+Gravação/reprodução das chamadas LLM (cassete)
+record: chama a API normalmente e grava hash do pedido, resposta, tokens e latência
+replay: responde do arquivo, sem rede, com a latência original (ou escalada)
+Arquivo JSONL, comprimido com gzip quando termina em .gz; uma linha por chamada
+Uso: LLM_CASSETTE_MODE=record|replay no .env; python llm_cassette.py [arquivo] mostra o resumo
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from config import LLM_CASSETTE_MODE, LLM_CASSETTE_PATH, LLM_CASSETTE_LATENCY_SCALE
+
+logger = logging.getLogger(__name__)
+
+CASSETTE_MODES = ("off", "record", "replay")
+
+class CassetteMiss(KeyError):
+    """Pedido sem resposta gravada no cassete (modo replay)"""
+
+def request_key(model: str, messages: list, temperature: float) -> str:
+    """Hash estável do pedido (modelo, mensagens e temperatura)"""
+    payload = json.dumps({"model": model, "messages": messages, "temperature": temperature},
+                         ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+def _open(path: str, mode: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+class Cassette:
+    """Respostas gravadas por hash do pedido; pedidos repetidos são reproduzidos em ordem"""
+
+    def __init__(self, path: str, mode: str = "replay", latency_scale: float = 1.0, sleep=time.sleep):
+        if mode not in CASSETTE_MODES:
+            raise ValueError(f"Modo de cassete inválido: {mode} (use {', '.join(CASSETTE_MODES)})")
+        self.path = path
+        self.mode = mode
+        self.latency_scale = latency_scale
+        self.sleep = sleep
+        self._lock = threading.Lock()
+        self._entries: Dict[str, List[Dict[str, Any]]] = {}
+        self._cursor: Dict[str, int] = {}
+        if mode == "replay":
+            self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            raise FileNotFoundError(f"Cassete não encontrado: {self.path}")
+        with _open(self.path, "r") as source:
+            for line in source:
+                if line.strip():
+                    entry = json.loads(line)
+                    self._entries.setdefault(entry["key"], []).append(entry)
+        logger.info(f"Cassete {self.path}: {len(self)} respostas carregadas")
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self._entries.values())
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == "record"
+
+    def record(self, model: str, messages: list, temperature: float, content: str,
+               latency: float, prompt_tokens: int = 0, completion_tokens: int = 0):
+        """Acrescenta uma chamada ao arquivo (append: gravações podem ser retomadas)"""
+        entry = {
+            "key": request_key(model, messages, temperature), "model": model, "content": content,
+            "latency": round(latency, 4), "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+        }
+        with self._lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with _open(self.path, "a") as target:
+                target.write(json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n")
+            self._entries.setdefault(entry["key"], []).append(entry)
+
+    def replay(self, model: str, messages: list, temperature: float) -> Dict[str, Any]:
+        """
+        Resposta gravada para o pedido, após esperar latência * latency_scale
+        Levanta CassetteMiss se o pedido não foi gravado
+        """
+        key = request_key(model, messages, temperature)
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                raise CassetteMiss(f"Pedido {key} ({model}) não está no cassete {self.path}")
+            index = self._cursor.get(key, 0)
+            self._cursor[key] = index + 1
+            entry = entries[index % len(entries)]
+        if self.latency_scale > 0 and entry["latency"] > 0:
+            self.sleep(entry["latency"] * self.latency_scale)
+        return entry
+
+def cassette_from_config() -> Optional[Cassette]:
+    """Cassete definido por LLM_CASSETTE_MODE/LLM_CASSETTE_PATH (None se desligado)"""
+    if LLM_CASSETTE_MODE == "off":
+        return None
+    return Cassette(LLM_CASSETTE_PATH, LLM_CASSETTE_MODE, LLM_CASSETTE_LATENCY_SCALE)
+
+def main():
+    parser = argparse.ArgumentParser(description="Resumo de um cassete de chamadas LLM")
+    parser.add_argument("path", nargs="?", default=LLM_CASSETTE_PATH, help="Arquivo do cassete")
+    args = parser.parse_args()
+
+    cassette = Cassette(args.path, "replay")
+    entries = [entry for entries in cassette._entries.values() for entry in entries]
+    print(f"Cassete: {args.path}")
+    print(f"Chamadas gravadas: {len(entries)} ({len(cassette._entries)} pedidos distintos)")
+    by_model: Dict[str, List[Dict[str, Any]]] = {}
+    for entry in entries:
+        by_model.setdefault(entry["model"], []).append(entry)
+    for model, calls in sorted(by_model.items()):
+        latency = sum(call["latency"] for call in calls) / len(calls)
+        tokens = sum(call["prompt_tokens"] + call["completion_tokens"] for call in calls)
+        print(f"  {model}: {len(calls)} chamadas, latência média {latency:.2f}s, {tokens} tokens")
+
+if __name__ == "__main__":
+    main()
@@ -4,14 +4,25 @@ E3-S2: Implementar chamada LLM simples extract_from_text(raw_text)
 """
 import json
 import logging
+import time
 from typing import Dict, Any, Optional, Tuple
 from datetime import datetime
 from openai import OpenAI
-from config import OPENAI_API_KEY
+from config import (
+    OPENAI_API_KEY, OPENAI_BASE_URL, LLM_MODEL, LLM_CASCADE_ENABLED, LLM_CASCADE_MODELS, PRE_EXTRACTION_ENABLED
+)
+from llm_cascade import parse_models, escalation_reason, tier_stats
+from llm_cassette import cassette_from_config
+from metrics import LLM_REQUEST_SECONDS, LLM_RETRIES, LLM_TOKENS
+import tracing
+from pre_extractor import RuleBasedPreExtractor, CONFIDENCE_FIELDS
 from prompts import (
     SYSTEM_PROMPT, 
     build_extraction_prompt, 
     build_few_shot_prompt,
+    build_reduced_prompt,
+    build_field_prompt,
+    FIELD_RULES,
     REFORMAT_PROMPT,
     validate_extracted_data,
     get_prompt_metadata
@@ -22,52 +33,102 @@ logger = logging.getLogger(__name__)
 class LLMExtractor:
     """Classe para extração de dados usando LLM"""
     
-    def __init__(self, api_key: str = None, model: str = "gpt-3.5-turbo"):
+    def __init__(self, api_key: str = None, model: str = None, cascade_models: list = None,
+                 stats=None, cassette=None):
         """
         Inicializa o extrator LLM
         
         Args:
             api_key: Chave da API OpenAI (usa config se None)
-            model: Modelo a usar (default: gpt-3.5-turbo)
+            model: Modelo a usar (default: LLM_MODEL)
+            cascade_models: Modelos do mais barato ao maior (default: config,
+                se LLM_CASCADE_ENABLED; senão só `model`)
+            stats: Contadores por modelo (default: tier_stats do processo)
+            cassette: Gravação/reprodução das chamadas (default: LLM_CASSETTE_MODE)
         """
         self.api_key = api_key or OPENAI_API_KEY
-        self.model = model
+        self.model = model or LLM_MODEL
+        if cascade_models is None:
+            cascade_models = parse_models(LLM_CASCADE_MODELS) if LLM_CASCADE_ENABLED else []
+        self.cascade_models = cascade_models or [self.model]
+        self.stats = stats or tier_stats
+        self.cassette = cassette if cassette is not None else cassette_from_config()
         self.client = None
+        self.pre_extractor = RuleBasedPreExtractor()
+        
+        # Replay responde do cassete: não precisa de chave nem de rede
+        if self.cassette is not None and self.cassette.replaying:
+            logger.info(f"LLMExtractor em replay do cassete {self.cassette.path}")
+            return
         
         if not self.api_key:
             raise ValueError("OPENAI_API_KEY não configurada. Adicione no arquivo .env")
         
         # Configurar cliente OpenAI
-        self.client = OpenAI(api_key=self.api_key)
+        self.client = OpenAI(api_key=self.api_key, base_url=OPENAI_BASE_URL or None)
         
-        logger.info(f"LLMExtractor inicializado com modelo {model}")
+        logger.info(f"LLMExtractor inicializado com modelo(s) {' -> '.join(self.cascade_models)}")
     
-    def _call_openai(self, messages: list, temperature: float = 0) -> str:
+    def _call_openai(self, messages: list, temperature: float = 0, model: str = None) -> str:
         """
         Chama a API OpenAI e retorna o conteúdo da resposta
+        Latência e tokens entram nos contadores do modelo (tier_stats)
+        Com cassete: grava a chamada (record) ou responde dele (replay)
         """
-        try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                temperature=temperature,
-                max_tokens=1000,
-                timeout=30
-            )
-            
-            content = response.choices[0].message.content.strip()
-            
-            # Log da resposta (sem dados sensíveis)
-            logger.debug(f"OpenAI response length: {len(content)} chars")
-            
-            return content
-            
-        except Exception as e:
-            logger.error(f"Erro na chamada OpenAI: {e}")
-            raise
+        model = model or self.model
+        with tracing.span("llm_call", model=model):
+            start = time.perf_counter()
+            if self.cassette is not None and self.cassette.replaying:
+                recorded = self.cassette.replay(model, messages, temperature)
+                self._record_call(model, time.perf_counter() - start, "replay",
+                                  recorded["prompt_tokens"], recorded["completion_tokens"])
+                return recorded["content"]
+            try:
+                response = self.client.chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    temperature=temperature,
+                    max_tokens=1000,
+                    timeout=30
+                )
+                
+                latency = time.perf_counter() - start
+                usage = getattr(response, "usage", None)
+                prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+                completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+                self._record_call(model, latency, "ok", prompt_tokens, completion_tokens)
+                content = response.choices[0].message.content.strip()
+                if self.cassette is not None and self.cassette.recording:
+                    self.cassette.record(model, messages, temperature, content, latency,
+                                         prompt_tokens, completion_tokens)
+                
+                # Log da resposta (sem dados sensíveis)
+                logger.debug(f"OpenAI response length: {len(content)} chars")
+                
+                return content
+                
+            except Exception as e:
+                self._record_call(model, time.perf_counter() - start, "error")
+                logger.error(f"Erro na chamada OpenAI: {e}")
+                raise
+    
+    def _record_call(self, model: str, latency: float, status: str,
+                     prompt_tokens: int = 0, completion_tokens: int = 0):
+        """Contadores do modelo (tier_stats) e métricas do Prometheus"""
+        self.stats.record_call(model, latency, prompt_tokens=prompt_tokens,
+                               completion_tokens=completion_tokens, error=status == "error")
+        LLM_REQUEST_SECONDS.observe(latency, model=model, status=status)
+        if prompt_tokens or completion_tokens:
+            LLM_TOKENS.inc(prompt_tokens, model=model, kind="prompt")
+            LLM_TOKENS.inc(completion_tokens, model=model, kind="completion")
+        span = tracing.current_span()
+        span.set_attribute("status", status)
+        span.set_attribute("prompt_tokens", prompt_tokens)
+        span.set_attribute("completion_tokens", completion_tokens)
     
     def extract_from_text(self, raw_text: str, use_few_shot: bool = True, 
-                         capture_timestamp: str = None) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+                         capture_timestamp: str = None,
+                         use_pre_extraction: bool = None) -> Tuple[Dict[str, Any], Dict[str, Any]]:
         """
         E3-S2: Função principal de extração
         
@@ -75,6 +136,7 @@ class LLMExtractor:
             raw_text: Texto bruto para extrair dados
             use_few_shot: Se deve usar few-shot examples
             capture_timestamp: Timestamp de captura (opcional)
+            use_pre_extraction: Roda regras antes do LLM (default: config)
         
         Returns:
             Tuple[extracted_data, metadata]
@@ -84,9 +146,25 @@ class LLMExtractor:
         
         start_time = datetime.now()
         
+        if use_pre_extraction is None:
+            use_pre_extraction = PRE_EXTRACTION_ENABLED
+        
         try:
+            # Pré-extração determinística (telefone, datas, tipo...)
+            known_fields = {}
+            pre_result = None
+            if use_pre_extraction:
+                pre_result = self.pre_extractor.extract(raw_text, capture_timestamp)
+                known_fields = self.pre_extractor.confident_fields(pre_result)
+                
+                # Todos os campos obrigatórios encontrados: dispensa o LLM
+                if self.pre_extractor.is_complete(pre_result):
+                    return self._build_rules_only_result(raw_text, pre_result, start_time)
+            
             # Construir prompt
-            if use_few_shot:
+            if known_fields:
+                user_prompt = build_reduced_prompt(raw_text, known_fields, capture_timestamp)
+            elif use_few_shot:
                 user_prompt = build_few_shot_prompt(raw_text, capture_timestamp)
             else:
                 user_prompt = build_extraction_prompt(raw_text, capture_timestamp)
@@ -97,20 +175,54 @@ class LLMExtractor:
                 {"role": "user", "content": user_prompt}
             ]
             
-            # Chamar OpenAI
+            # Chamar OpenAI (cascata: escala só se a resposta não for aceitável)
             logger.info(f"Extraindo dados de texto ({len(raw_text)} chars)")
-            response_text = self._call_openai(messages)
-            
-            # Tentar parsear JSON
-            try:
-                extracted_data = json.loads(response_text)
-            except json.JSONDecodeError as e:
-                logger.warning(f"JSON inválido na primeira tentativa: {e}")
-                # Tentar uma segunda vez com prompt de correção
-                extracted_data = self._retry_with_reformat(raw_text, response_text)
-            
-            # Validar dados extraídos
-            validation = validate_extracted_data(extracted_data)
+            cascade = []
+            json_repaired = False
+            for tier, model in enumerate(self.cascade_models):
+                tier_start = time.perf_counter()
+                is_last_tier = tier == len(self.cascade_models) - 1
+                try:
+                    response_text = self._call_openai(messages, model=model)
+                except Exception as e:
+                    if is_last_tier:
+                        raise
+                    logger.warning(f"Cascata: erro em {model} ({e}), escalando")
+                    LLM_RETRIES.inc(model=model, reason="error")
+                    cascade.append({"model": model, "latency_seconds": round(time.perf_counter() - tier_start, 3),
+                                    "escalation_reason": "error"})
+                    continue
+                
+                # Tentar parsear JSON
+                try:
+                    extracted_data = json.loads(response_text)
+                except json.JSONDecodeError as e:
+                    logger.warning(f"JSON inválido na primeira tentativa: {e}")
+                    json_repaired = True
+                    LLM_RETRIES.inc(model=model, reason="json_reformat")
+                    # Tentar uma segunda vez com prompt de correção
+                    with tracing.span("json_reformat", model=model):
+                        extracted_data = self._retry_with_reformat(raw_text, response_text, model=model)
+                
+                # Campos das regras prevalecem sobre o LLM
+                if known_fields:
+                    extracted_data = self._merge_pre_extraction(extracted_data, known_fields, pre_result)
+                
+                # Validar dados extraídos
+                validation = validate_extracted_data(extracted_data)
+                
+                reason = escalation_reason(validation)
+                escalate = reason is not None and not is_last_tier
+                self.stats.record_outcome(model, escalated=escalate)
+                cascade.append({
+                    "model": model,
+                    "latency_seconds": round(time.perf_counter() - tier_start, 3),
+                    "escalation_reason": reason if escalate else None
+                })
+                if not escalate:
+                    break
+                logger.info(f"Cascata: {model} insuficiente ({reason}), escalando")
+                LLM_RETRIES.inc(model=model, reason=reason)
             
             # Calcular tempo de processamento
             processing_time = (datetime.now() - start_time).total_seconds()
@@ -119,9 +231,14 @@ class LLMExtractor:
             metadata = {
                 "extraction_status": "success" if validation["valid"] else "validation_failed",
                 "processing_time_seconds": round(processing_time, 2),
-                "model_used": self.model,
+                "model_used": model,
                 "prompt_version": get_prompt_metadata()["version"],
                 "use_few_shot": use_few_shot,
+                "extraction_mode": "rules+llm" if known_fields else "llm",
+                "llm_skipped": False,
+                "pre_extracted_fields": sorted(known_fields),
+                "cascade": cascade,
+                "json_repaired": json_repaired,
                 "validation": validation,
                 "raw_text_length": len(raw_text),
                 "response_length": len(response_text),
@@ -146,7 +263,107 @@ class LLMExtractor:
             
             return {}, error_metadata
     
-    def _retry_with_reformat(self, raw_text: str, invalid_json: str) -> Dict[str, Any]:
+    def extract_fields(self, raw_text: str, fields: list,
+                       capture_timestamp: str = None) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Re-extração pontual: pede ao LLM apenas os campos indicados
+        (prompt mínimo, sem few-shots)
+        
+        Returns:
+            Tuple[campos extraídos + confianca_campos, metadata]
+        """
+        fields = [field for field in fields if field in FIELD_RULES]
+        if not fields:
+            raise ValueError("Nenhum campo válido para re-extração")
+        
+        start_time = datetime.now()
+        # O modelo barato já errou esses campos: usa o último nível da cascata
+        model = self.cascade_models[-1]
+        messages = [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": build_field_prompt(raw_text, fields, capture_timestamp)}
+        ]
+        
+        try:
+            response_text = self._call_openai(messages, model=model)
+            response = json.loads(response_text)
+            if not isinstance(response, dict):
+                raise ValueError("Resposta não é um objeto JSON")
+        except Exception as e:
+            logger.error(f"Erro na re-extração de {fields}: {e}")
+            return {}, {
+                "extraction_status": "error",
+                "error_message": str(e),
+                "extraction_mode": "fields",
+                "requested_fields": fields,
+                "model_used": model,
+                "processing_time_seconds": (datetime.now() - start_time).total_seconds()
+            }
+        
+        data = {field: response.get(field) for field in fields if field in response}
+        confidences = response.get("confianca_campos") or {}
+        data["confianca_campos"] = {
+            field: confidences[field] for field in fields
+            if isinstance(confidences.get(field), (int, float))
+        }
+        
+        metadata = {
+            "extraction_status": "success",
+            "extraction_mode": "fields",
+            "requested_fields": fields,
+            "model_used": model,
+            "prompt_version": get_prompt_metadata()["version"],
+            "processing_time_seconds": round((datetime.now() - start_time).total_seconds(), 2),
+            "response_length": len(response_text),
+            "timestamp": datetime.utcnow().isoformat()
+        }
+        logger.info(f"Re-extração de {fields} concluída em {metadata['processing_time_seconds']}s")
+        return data, metadata
+    
+    def _build_rules_only_result(self, raw_text: str, pre_result: Dict[str, Any],
+                                 start_time: datetime) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Monta extração apenas com as regras (sem chamada LLM)
+        """
+        extracted_data = self.pre_extractor.to_extraction(pre_result, raw_text)
+        validation = validate_extracted_data(extracted_data)
+        processing_time = (datetime.now() - start_time).total_seconds()
+        
+        metadata = {
+            "extraction_status": "success" if validation["valid"] else "validation_failed",
+            "processing_time_seconds": round(processing_time, 2),
+            "model_used": "rules",
+            "prompt_version": get_prompt_metadata()["version"],
+            "use_few_shot": False,
+            "extraction_mode": "rules",
+            "llm_skipped": True,
+            "pre_extracted_fields": sorted(pre_result["fields"]),
+            "validation": validation,
+            "raw_text_length": len(raw_text),
+            "response_length": 0,
+            "timestamp": datetime.utcnow().isoformat()
+        }
+        
+        logger.info(f"Extração por regras concluída em {processing_time:.3f}s (LLM dispensado)")
+        return extracted_data, metadata
+    
+    def _merge_pre_extraction(self, extracted_data: Dict[str, Any], known_fields: Dict[str, Any],
+                              pre_result: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Combina a resposta do LLM (campos faltantes) com os campos das regras
+        """
+        merged = dict(extracted_data)
+        merged.update(known_fields)
+        
+        confianca_campos = dict(extracted_data.get("confianca_campos") or {})
+        for field in known_fields:
+            if field in CONFIDENCE_FIELDS:
+                confianca_campos[field] = pre_result["confianca_campos"][field]
+        merged["confianca_campos"] = confianca_campos
+        
+        return merged
+    
+    def _retry_with_reformat(self, raw_text: str, invalid_json: str, model: str = None) -> Dict[str, Any]:
         """
         E3-S3: Tenta corrigir JSON inválido com prompt de reformatação
         """
@@ -163,7 +380,7 @@ class LLMExtractor:
         ]
         
         try:
-            response_text = self._call_openai(messages)
+            response_text = self._call_openai(messages, model=model)
             extracted_data = json.loads(response_text)
             logger.info("JSON corrigido com sucesso na segunda tentativa")
             return extracted_data
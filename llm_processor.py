@@ -3,66 +3,42 @@ Processador LLM integrado - Worker assíncrono
 E3-S4: Worker assíncrono (fila) + E3-S5: Status de processamento
 """
 import asyncio
+import json
 import logging
 from typing import Dict, Any, List
 from datetime import datetime
 from database import db, RawEntry, StructuredEntry
 from llm_extractor import LLMExtractor
+from session_merge import is_location_only
+from near_duplicates import NearDuplicateIndex
+from search import SearchIndex
+from llm_cascade import tier_stats
+from metrics import EXTRACTIONS
+import tracing
+from priority import prioritize, backlog_by_priority, QueueLatency
+from prompts import FIELD_RULES, VALID_TIPOS_DEMANDA, VALID_PRIORIDADES
+from config import NEAR_DUP_REUSE_EXTRACTION, PRIORITY_SCAN_LIMIT, CONFIDENCE_THRESHOLD
 from sqlalchemy import Column, String, Text, DateTime, update
 
 logger = logging.getLogger(__name__)
 
+def json_metadata(metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """Metadados como dict serializável para a coluna JSON (nunca str(dict))"""
+    return json.loads(json.dumps(metadata, default=str))
+
+# Campos que descrevem o problema: iguais entre relatos quase duplicados
+DEMAND_FIELDS = ("bairro", "referencia_local", "tipo_demanda", "descricao_curta", "prioridade_percebida")
+# Campos de quem relatou: sempre extraídos do próprio relato
+CONTACT_FIELDS = ("data_contato", "hora_contato", "nome", "telefone", "consentimento_comunicacao")
+
 class LLMProcessor:
     """Processador que integra LLM com banco de dados"""
     
-    def __init__(self):
+    def __init__(self, extractor: LLMExtractor = None):
         self.db = db
-        self.extractor = LLMExtractor()
-        
-        # Adicionar campos de status se não existirem
-        self._ensure_status_fields()
-    
-    def _ensure_status_fields(self):
-        """
-        E3-S5: Garante que os campos de status existem na tabela
-        """
-        try:
-            # Verificar se colunas existem e criar se necessário
-            from sqlalchemy import text
-            
-            # Adicionar campos de controle de extração
-            try:
-                self.db.session.execute(text("""
-                    ALTER TABLE structured_entries 
-                    ADD COLUMN extraction_status VARCHAR(20) DEFAULT 'pending'
-                """))
-                self.db.session.commit()
-                logger.info("Campo extraction_status adicionado")
-            except:
-                pass  # Campo já existe
-            
-            try:
-                self.db.session.execute(text("""
-                    ALTER TABLE structured_entries 
-                    ADD COLUMN error_msg TEXT
-                """))
-                self.db.session.commit()
-                logger.info("Campo error_msg adicionado")
-            except:
-                pass  # Campo já existe
-            
-            try:
-                self.db.session.execute(text("""
-                    ALTER TABLE structured_entries 
-                    ADD COLUMN llm_metadata TEXT
-                """))
-                self.db.session.commit()
-                logger.info("Campo llm_metadata adicionado")
-            except:
-                pass  # Campo já existe
-                
-        except Exception as e:
-            logger.warning(f"Erro ao verificar campos de status: {e}")
+        self.extractor = extractor or LLMExtractor()
+        self.duplicate_index = NearDuplicateIndex() if NEAR_DUP_REUSE_EXTRACTION else None
+        self.search_index = SearchIndex()
     
     def process_single_entry(self, raw_entry: RawEntry) -> Dict[str, Any]:
         """
@@ -71,66 +47,23 @@ class LLMProcessor:
         start_time = datetime.now()
         
         try:
-            logger.info(f"Processando raw_entry {raw_entry.id} com LLM...")
-            
-            # Extrair dados com LLM
-            extracted_data, metadata = self.extractor.extract_from_text(
-                raw_entry.texto_original,
-                capture_timestamp=raw_entry.timestamp_captura.isoformat()
-            )
+            # Localizações puras (placeholders antigos) nunca vão ao LLM
+            if is_location_only(raw_entry):
+                return self._mark_location_only(raw_entry, start_time)
             
-            # Buscar structured_entry existente
-            structured_entry = self.db.session.query(StructuredEntry).filter(
-                StructuredEntry.raw_text_id == raw_entry.id
-            ).first()
+            # Relato quase duplicado: reaproveita a demanda do irmão já processado
+            if self.duplicate_index:
+                sibling = self.duplicate_index.find_extracted_sibling(raw_entry)
+                if sibling:
+                    result = self._reuse_sibling_extraction(raw_entry, sibling, start_time)
+                    if result is not None:
+                        return result
             
-            if not structured_entry:
-                logger.error(f"Structured entry não encontrada para raw_id {raw_entry.id}")
-                return {"success": False, "error": "Structured entry não encontrada"}
-            
-            # Atualizar campos extraídos
-            structured_entry.data_contato = extracted_data.get("data_contato")
-            structured_entry.hora_contato = extracted_data.get("hora_contato")
-            structured_entry.nome = extracted_data.get("nome")
-            structured_entry.telefone = extracted_data.get("telefone")
-            structured_entry.bairro = extracted_data.get("bairro")
-            structured_entry.referencia_local = extracted_data.get("referencia_local")
-            structured_entry.tipo_demanda = extracted_data.get("tipo_demanda")
-            structured_entry.descricao_curta = extracted_data.get("descricao_curta")
-            structured_entry.prioridade_percebida = extracted_data.get("prioridade_percebida")
-            structured_entry.consentimento_comunicacao = extracted_data.get("consentimento_comunicacao")
-            structured_entry.confianca_global = metadata.get("validation", {}).get("confianca_global", 0)
-            structured_entry.confianca_campos = extracted_data.get("confianca_campos", {})
-            
-            # E3-S5: Campos de status
-            extraction_status = metadata.get("extraction_status", "unknown")
-            if extraction_status == "success":
-                if metadata.get("validation", {}).get("valid", False):
-                    structured_entry.extraction_status = "completed"
-                else:
-                    structured_entry.extraction_status = "validation_failed"
-            else:
-                structured_entry.extraction_status = "error"
-            
-            structured_entry.error_msg = metadata.get("error_message")
-            structured_entry.llm_metadata = str(metadata)
-            
-            # Salvar no banco
-            self.db.session.commit()
-            
-            processing_time = (datetime.now() - start_time).total_seconds()
-            
-            result = {
-                "success": True,
-                "raw_id": raw_entry.id,
-                "structured_id": structured_entry.id,
-                "extraction_status": structured_entry.extraction_status,
-                "processing_time": processing_time,
-                "confidence": structured_entry.confianca_global
-            }
+            logger.info(f"Processando raw_entry {raw_entry.id} com LLM...")
             
-            logger.info(f"Raw {raw_entry.id} processada em {processing_time:.2f}s - Status: {structured_entry.extraction_status}")
-            return result
+            # Extrair dados com LLM
+            extracted_data, metadata = self._extract(raw_entry)
+            return self._write_extraction(raw_entry, extracted_data, metadata, start_time)
             
         except Exception as e:
             logger.error(f"Erro ao processar raw_entry {raw_entry.id}: {e}")
@@ -145,6 +78,7 @@ class LLMProcessor:
                     structured_entry.extraction_status = "error"
                     structured_entry.error_msg = str(e)
                     self.db.session.commit()
+                    EXTRACTIONS.inc(status="error")
             except:
                 pass
             
@@ -155,6 +89,281 @@ class LLMProcessor:
                 "processing_time": (datetime.now() - start_time).total_seconds()
             }
     
+    def reprocess_entry(self, raw_entry: RawEntry) -> Dict[str, Any]:
+        """
+        Re-extração de uma entrada já processada (backfill de prompt)
+        Só grava se a extração vier com sucesso e válida: erro do LLM ou
+        validação reprovada mantém a extração anterior intacta
+        """
+        start_time = datetime.now()
+        
+        try:
+            extracted_data, metadata = self._extract(raw_entry)
+            if metadata.get("extraction_status") != "success":
+                error = metadata.get("error_message") or "extração sem sucesso"
+            elif not metadata.get("validation", {}).get("valid", False):
+                error = "validação reprovada"
+            else:
+                return self._write_extraction(raw_entry, extracted_data, metadata, start_time)
+        except Exception as e:
+            self.db.session.rollback()
+            error = str(e)
+        
+        logger.warning(f"Re-extração da raw {raw_entry.id} descartada (registro mantido): {error}")
+        return {
+            "success": False,
+            "raw_id": raw_entry.id,
+            "error": error,
+            "processing_time": (datetime.now() - start_time).total_seconds()
+        }
+    
+    def _extract(self, raw_entry: RawEntry):
+        """Chama o extrator (span extract_from_text) e devolve (dados, metadata)"""
+        with tracing.span("extract_from_text", raw_id=raw_entry.id) as span:
+            extracted_data, metadata = self.extractor.extract_from_text(
+                raw_entry.texto_original,
+                capture_timestamp=raw_entry.timestamp_captura.isoformat()
+            )
+            span.set_attribute("model", metadata.get("model_used"))
+            span.set_attribute("extraction_mode", metadata.get("extraction_mode"))
+            span.set_attribute("json_repaired", metadata.get("json_repaired"))
+        return extracted_data, metadata
+    
+    def _write_extraction(self, raw_entry: RawEntry, extracted_data: Dict[str, Any],
+                          metadata: Dict[str, Any], start_time: datetime) -> Dict[str, Any]:
+        """Grava o resultado da extração na structured_entry do relato"""
+        # Buscar structured_entry existente
+        structured_entry = self.db.session.query(StructuredEntry).filter(
+            StructuredEntry.raw_text_id == raw_entry.id
+        ).first()
+        
+        if not structured_entry:
+            logger.error(f"Structured entry não encontrada para raw_id {raw_entry.id}")
+            return {"success": False, "error": "Structured entry não encontrada"}
+        
+        # Atualizar campos extraídos
+        structured_entry.data_contato = extracted_data.get("data_contato")
+        structured_entry.hora_contato = extracted_data.get("hora_contato")
+        structured_entry.nome = extracted_data.get("nome")
+        structured_entry.telefone = extracted_data.get("telefone")
+        structured_entry.bairro = extracted_data.get("bairro")
+        structured_entry.referencia_local = extracted_data.get("referencia_local")
+        structured_entry.tipo_demanda = extracted_data.get("tipo_demanda")
+        structured_entry.descricao_curta = extracted_data.get("descricao_curta")
+        structured_entry.prioridade_percebida = extracted_data.get("prioridade_percebida")
+        structured_entry.consentimento_comunicacao = extracted_data.get("consentimento_comunicacao")
+        structured_entry.confianca_global = metadata.get("validation", {}).get("confianca_global", 0)
+        structured_entry.confianca_campos = extracted_data.get("confianca_campos", {})
+        
+        # E3-S5: Campos de status
+        extraction_status = metadata.get("extraction_status", "unknown")
+        if extraction_status == "success":
+            if metadata.get("validation", {}).get("valid", False):
+                structured_entry.extraction_status = "completed"
+            else:
+                structured_entry.extraction_status = "validation_failed"
+        else:
+            structured_entry.extraction_status = "error"
+        
+        structured_entry.error_msg = metadata.get("error_message")
+        structured_entry.llm_metadata = json_metadata(metadata)
+        structured_entry.prompt_version = metadata.get("prompt_version")
+        
+        # Salvar no banco
+        with tracing.span("write_back", raw_id=raw_entry.id, structured_id=structured_entry.id,
+                          extraction_status=structured_entry.extraction_status):
+            self.db.session.commit()
+        EXTRACTIONS.inc(status=structured_entry.extraction_status)
+        self.search_index.index_structured(structured_entry.id)
+        
+        processing_time = (datetime.now() - start_time).total_seconds()
+        
+        result = {
+            "success": True,
+            "raw_id": raw_entry.id,
+            "structured_id": structured_entry.id,
+            "extraction_status": structured_entry.extraction_status,
+            "processing_time": processing_time,
+            "confidence": structured_entry.confianca_global
+        }
+        
+        logger.info(f"Raw {raw_entry.id} processada em {processing_time:.2f}s - Status: {structured_entry.extraction_status}")
+        return result
+    
+    def _mark_location_only(self, raw_entry: RawEntry, start_time: datetime) -> Dict[str, Any]:
+        """Marca placeholder de localização pura sem chamar o LLM"""
+        structured_entry = self.db.session.query(StructuredEntry).filter(
+            StructuredEntry.raw_text_id == raw_entry.id
+        ).first()
+        
+        if structured_entry:
+            structured_entry.extraction_status = "location_only"
+            self.db.session.commit()
+        
+        logger.info(f"Raw {raw_entry.id} é apenas localização - LLM dispensado")
+        return {
+            "success": True,
+            "raw_id": raw_entry.id,
+            "structured_id": structured_entry.id if structured_entry else None,
+            "extraction_status": "location_only",
+            "processing_time": (datetime.now() - start_time).total_seconds(),
+            "confidence": None
+        }
+    
+    def _reuse_sibling_extraction(self, raw_entry: RawEntry, sibling: StructuredEntry,
+                                  start_time: datetime) -> Dict[str, Any]:
+        """
+        Copia do relato irmão (mesmo cluster) só os campos da demanda; nome,
+        telefone, consentimento e data/hora vêm de uma extração pontual do
+        próprio relato. Retorna None se essa extração falhar (extração completa)
+        """
+        structured_entry = self.db.session.query(StructuredEntry).filter(
+            StructuredEntry.raw_text_id == raw_entry.id
+        ).first()
+        
+        if not structured_entry:
+            logger.error(f"Structured entry não encontrada para raw_id {raw_entry.id}")
+            return {"success": False, "error": "Structured entry não encontrada"}
+        
+        with tracing.span("extract_from_text", raw_id=raw_entry.id, extraction_mode="near_duplicate"):
+            contact, metadata = self.extractor.extract_fields(
+                raw_entry.texto_original, list(CONTACT_FIELDS),
+                capture_timestamp=raw_entry.timestamp_captura.isoformat()
+            )
+        if metadata.get("extraction_status") != "success":
+            logger.warning(f"Raw {raw_entry.id}: contato não extraído ({metadata.get('error_message')}) "
+                           f"- extração completa")
+            return None
+        
+        for field in DEMAND_FIELDS:
+            setattr(structured_entry, field, getattr(sibling, field))
+        for field in CONTACT_FIELDS:
+            setattr(structured_entry, field, contact.get(field))
+        
+        sibling_confidences = sibling.confianca_campos or {}
+        confidences = {field: sibling_confidences[field] for field in DEMAND_FIELDS if field in sibling_confidences}
+        confidences.update(contact.get("confianca_campos", {}))
+        structured_entry.confianca_campos = confidences
+        structured_entry.confianca_global = (
+            round(sum(confidences.values()) / len(confidences), 3) if confidences else sibling.confianca_global
+        )
+        structured_entry.prompt_version = sibling.prompt_version
+        
+        structured_entry.flags = list(structured_entry.flags or []) + [f"duplicata_de:{sibling.raw_text_id}"]
+        structured_entry.extraction_status = "completed"
+        structured_entry.error_msg = None
+        structured_entry.llm_metadata = json_metadata({
+            "extraction_mode": "near_duplicate",
+            "reused_from_raw_id": sibling.raw_text_id,
+            "reused_fields": list(DEMAND_FIELDS),
+            "cluster_id": raw_entry.cluster_id,
+            "model_used": metadata.get("model_used")
+        })
+        self.db.session.commit()
+        self.search_index.index_structured(structured_entry.id)
+        
+        processing_time = (datetime.now() - start_time).total_seconds()
+        logger.info(f"Raw {raw_entry.id} reaproveitou a demanda da raw {sibling.raw_text_id} - só contato extraído")
+        return {
+            "success": True,
+            "raw_id": raw_entry.id,
+            "structured_id": structured_entry.id,
+            "extraction_status": "completed",
+            "processing_time": processing_time,
+            "confidence": structured_entry.confianca_global,
+            "reused_from": sibling.raw_text_id
+        }
+    
+    def weak_fields(self, structured_entry: StructuredEntry, threshold: float = None) -> List[str]:
+        """Campos com confiança abaixo do limiar (candidatos à re-extração)"""
+        threshold = CONFIDENCE_THRESHOLD if threshold is None else threshold
+        confidences = structured_entry.confianca_campos or {}
+        return [
+            field for field, confidence in confidences.items()
+            if field in FIELD_RULES and isinstance(confidence, (int, float)) and confidence < threshold
+        ]
+    
+    def reextract_fields(self, structured_entry: StructuredEntry, fields: List[str] = None,
+                         threshold: float = None) -> Dict[str, Any]:
+        """
+        Re-extrai só os campos fracos (ou os indicados) e aplica no registro
+        Um valor novo só substitui o atual se vier com confiança maior
+        """
+        start_time = datetime.now()
+        fields = fields or self.weak_fields(structured_entry, threshold)
+        if not fields:
+            return {"success": True, "structured_id": structured_entry.id, "updated": [], "skipped": True}
+        
+        raw_entry = self.db.session.get(RawEntry, structured_entry.raw_text_id)
+        data, metadata = self.extractor.extract_fields(
+            raw_entry.texto_original, fields,
+            capture_timestamp=raw_entry.timestamp_captura.isoformat()
+        )
+        if metadata["extraction_status"] != "success":
+            return {"success": False, "structured_id": structured_entry.id,
+                    "error": metadata.get("error_message")}
+        
+        confidences = dict(structured_entry.confianca_campos or {})
+        updated = []
+        for field in fields:
+            value = data.get(field)
+            if value is None:
+                continue
+            if field == "tipo_demanda" and value not in VALID_TIPOS_DEMANDA:
+                continue
+            if field == "prioridade_percebida" and value not in VALID_PRIORIDADES:
+                continue
+            new_confidence = data["confianca_campos"].get(field, 0.5)
+            if field in confidences and new_confidence <= confidences[field]:
+                continue
+            setattr(structured_entry, field, value)
+            if field in confidences or field in data["confianca_campos"]:
+                confidences[field] = new_confidence
+            updated.append(field)
+        
+        if updated:
+            # Novo dict: a coluna JSON não rastreia mutação in-place
+            structured_entry.confianca_campos = confidences
+            if confidences:
+                structured_entry.confianca_global = round(sum(confidences.values()) / len(confidences), 3)
+            self.db.session.commit()
+            self.search_index.index_structured(structured_entry.id)
+        
+        logger.info(f"Structured {structured_entry.id}: re-extração de {fields} atualizou {updated}")
+        return {
+            "success": True,
+            "structured_id": structured_entry.id,
+            "requested": fields,
+            "updated": updated,
+            "confidence": structured_entry.confianca_global,
+            "processing_time": (datetime.now() - start_time).total_seconds()
+        }
+    
+    def reextract_review_queue(self, limit: int = 50, threshold: float = None) -> Dict[str, Any]:
+        """Re-extração pontual nas entradas da fila de revisão"""
+        threshold = CONFIDENCE_THRESHOLD if threshold is None else threshold
+        # Menor confiança primeiro; amostra maior que o limite porque nem toda
+        # entrada tem campo abaixo do limiar
+        entries = self.db.session.query(StructuredEntry).filter(
+            StructuredEntry.revisado == False,
+            StructuredEntry.extraction_status == 'completed'
+        ).order_by(StructuredEntry.confianca_global).limit(limit * 4).all()
+        
+        results = {"checked": 0, "updated_entries": 0, "updated_fields": 0, "errors": 0}
+        for structured_entry in entries:
+            if results["checked"] >= limit:
+                break
+            if not self.weak_fields(structured_entry, threshold):
+                continue
+            results["checked"] += 1
+            result = self.reextract_fields(structured_entry, threshold=threshold)
+            if not result["success"]:
+                results["errors"] += 1
+            elif result["updated"]:
+                results["updated_entries"] += 1
+                results["updated_fields"] += len(result["updated"])
+        return results
+    
     async def process_batch_async(self, batch_size: int = 5, max_concurrent: int = 3) -> Dict[str, Any]:
         """
         E3-S4: Worker assíncrono para processar lote
@@ -162,15 +371,18 @@ class LLMProcessor:
         """
         start_time = datetime.now()
         
-        # Buscar entradas que precisam de processamento LLM
-        # (structured entries com status pending ou que são placeholders vazios)
-        pending_entries = self.db.session.query(StructuredEntry, RawEntry).join(
-            RawEntry, StructuredEntry.raw_text_id == RawEntry.id
-        ).filter(
-            (StructuredEntry.extraction_status.is_(None)) |
-            (StructuredEntry.extraction_status == 'pending') |
-            ((StructuredEntry.nome.is_(None)) & (StructuredEntry.telefone.is_(None)))
-        ).limit(batch_size).all()
+        # Lote escolhido por urgência (pré-score + envelhecimento), não pela ordem do banco
+        selected = prioritize(self._scan_pending(), batch_size)
+        pairs = {
+            structured_entry.id: (structured_entry, raw_entry)
+            for structured_entry, raw_entry in self.db.session.query(StructuredEntry, RawEntry).join(
+                RawEntry, StructuredEntry.raw_text_id == RawEntry.id
+            ).filter(StructuredEntry.id.in_([candidate.structured_id for candidate, _ in selected])).all()
+        }
+        pending_entries = [
+            pairs[candidate.structured_id] + (level,)
+            for candidate, level in selected if candidate.structured_id in pairs
+        ]
         
         if not pending_entries:
             return {
@@ -178,7 +390,8 @@ class LLMProcessor:
                 "message": "Nenhuma entrada pendente para processamento",
                 "processed": 0,
                 "errors": 0,
-                "total_time": 0
+                "total_time": 0,
+                "queue_latency": {}
             }
         
         logger.info(f"Processando {len(pending_entries)} entradas com LLM...")
@@ -190,20 +403,24 @@ class LLMProcessor:
             "avg_time_per_entry": 0,
             "total_time": 0
         }
+        queue_latency = QueueLatency()
         
         # Processar em batches para controlar concorrência
+        # (o semáforo libera na ordem de criação: mais urgentes primeiro)
         semaphore = asyncio.Semaphore(max_concurrent)
         
-        async def process_with_semaphore(structured_entry, raw_entry):
+        async def process_with_semaphore(structured_entry, raw_entry, level):
             async with semaphore:
+                queue_latency.record(level, raw_entry.timestamp_captura)
                 # Executar em thread separada pois OpenAI API é síncrona
                 loop = asyncio.get_event_loop()
-                return await loop.run_in_executor(None, self.process_single_entry, raw_entry)
+                # bind: spans da extração ficam sob o lote mesmo na outra thread
+                return await loop.run_in_executor(None, tracing.bind(self.process_single_entry), raw_entry)
         
         # Processar todas as entradas de forma assíncrona
         tasks = []
-        for structured_entry, raw_entry in pending_entries:
-            task = process_with_semaphore(structured_entry, raw_entry)
+        for structured_entry, raw_entry, level in pending_entries:
+            task = process_with_semaphore(structured_entry, raw_entry, level)
             tasks.append(task)
         
         # Aguardar conclusão de todas as tarefas
@@ -224,15 +441,48 @@ class LLMProcessor:
         # Calcular estatísticas
         total_time = (datetime.now() - start_time).total_seconds()
         results["total_time"] = total_time
+        results["queue_latency"] = queue_latency.summary()
         
         if results["processed"] > 0:
             avg_time = sum(d.get("processing_time", 0) for d in results["details"] if "processing_time" in d)
             results["avg_time_per_entry"] = round(avg_time / results["processed"], 2)
         
         logger.info(f"Batch concluído: {results['processed']} processadas, {results['errors']} erros em {total_time:.2f}s")
+        logger.info(f"Espera na fila por prioridade: {results['queue_latency']}")
         
         return results
     
+    def _pending_filter(self):
+        """
+        Structured entries ainda não extraídas (status pending ou nulo)
+        Relato concluído sem nome/telefone não volta ao lote: não tem contato
+        """
+        return (
+            (StructuredEntry.extraction_status.is_(None)) |
+            (StructuredEntry.extraction_status == 'pending')
+        )
+    
+    def _scan_pending(self) -> List[Any]:
+        """
+        Candidatas ao próximo lote (só colunas usadas no pré-score)
+        Metade mais antiga + metade mais recente: o envelhecimento alcança as
+        antigas e um relato urgente recém-chegado entra mesmo com backlog grande
+        """
+        columns = self.db.session.query(
+            StructuredEntry.id.label("structured_id"),
+            RawEntry.id.label("raw_id"),
+            RawEntry.texto_original,
+            RawEntry.timestamp_captura,
+            StructuredEntry.extraction_status
+        ).join(
+            RawEntry, StructuredEntry.raw_text_id == RawEntry.id
+        ).filter(self._pending_filter())
+        
+        half = max(PRIORITY_SCAN_LIMIT // 2, 1)
+        oldest = columns.order_by(RawEntry.id).limit(half).all()
+        newest = columns.order_by(RawEntry.id.desc()).limit(half).all()
+        return list({row.structured_id: row for row in oldest + newest}.values())
+    
     def get_processing_dashboard(self) -> Dict[str, Any]:
         """
         E3-S5: Painel mostra contagem por status
@@ -282,6 +532,14 @@ class LLMProcessor:
                 "total_raw_entries": total_raw,
                 "total_structured_entries": total_structured,
                 "average_confidence": round(avg_confidence, 3),
+                "backlog_by_priority": backlog_by_priority(self._scan_pending()),
+                "llm_tiers": tier_stats.snapshot(),
+                "prompt_versions": {
+                    version or "desconhecida": count
+                    for version, count in self.db.session.query(
+                        StructuredEntry.prompt_version, func.count(StructuredEntry.id)
+                    ).group_by(StructuredEntry.prompt_version).all()
+                },
                 "processing_coverage": round((total_structured / total_raw * 100) if total_raw > 0 else 0, 1)
             }
             
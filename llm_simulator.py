@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Simulador local da API OpenAI (chat completions) com injeção de falhas
+Latência log-normal com cauda longa, 429 com cabeçalhos de rate limit, erros 500,
+pedidos que não respondem antes do timeout do cliente e respostas com JSON inválido.
+Aponte o extrator para ele com OPENAI_BASE_URL=http://127.0.0.1:8100/v1
+Uso: python llm_simulator.py [--port 8100] [--latency-median 1.5] [--tail-rate 0.02]
+         [--rate-limit-rpm 60] [--error-rate 0.02] [--malformed-rate 0.05]
+"""
+import argparse
+import json
+import logging
+import math
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from typing import Any, Dict, Optional, Tuple
+
+from prompts import VALID_TIPOS_DEMANDA, VALID_PRIORIDADES
+
+logger = logging.getLogger(__name__)
+
+FAKE_NAMES = ["Maria", "José", "Ana", "Carlos", "Dona Lurdes", "Seu Antônio", None]
+FAKE_BAIRROS = ["Centro", "Vila Nova", "Jardim América", "São José", "Boa Vista", None]
+
+class FaultProfile:
+    """Distribuições de latência e taxas de falha do simulador"""
+
+    def __init__(self, latency_median: float = 1.5, latency_sigma: float = 0.5,
+                 tail_rate: float = 0.0, tail_seconds: float = 20.0,
+                 error_rate: float = 0.0, rate_limit_rpm: float = 0.0, rate_limit_rate: float = 0.0,
+                 timeout_rate: float = 0.0, hang_seconds: float = 35.0,
+                 malformed_rate: float = 0.0, seed: int = None):
+        self.latency_median = latency_median
+        self.latency_sigma = latency_sigma
+        self.tail_rate = tail_rate
+        self.tail_seconds = tail_seconds
+        self.error_rate = error_rate
+        self.rate_limit_rpm = rate_limit_rpm
+        self.rate_limit_rate = rate_limit_rate
+        self.timeout_rate = timeout_rate
+        self.hang_seconds = hang_seconds
+        self.malformed_rate = malformed_rate
+        self.seed = seed
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(vars(self))
+
+class LLMSimulator:
+    """Decide o desfecho de cada pedido e gera a resposta (sem HTTP: testável direto)"""
+
+    def __init__(self, profile: FaultProfile = None, sleep=time.sleep):
+        self.profile = profile or FaultProfile()
+        self.sleep = sleep
+        self.random = random.Random(self.profile.seed)
+        self._lock = threading.Lock()
+        # Import tardio: backpressure lê config, e load_test_pipeline.py ajusta o
+        # ambiente (banco, OPENAI_BASE_URL) depois de importar este módulo
+        from backpressure import TokenBucket
+        self.bucket = (TokenBucket(self.profile.rate_limit_rpm / 60.0, max(self.profile.rate_limit_rpm / 60.0, 1))
+                       if self.profile.rate_limit_rpm > 0 else None)
+        self.stats = {"requests": 0, "ok": 0, "malformed": 0, "rate_limited": 0,
+                      "errors": 0, "timeouts": 0, "tail": 0}
+
+    def _count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    def _roll(self, rate: float) -> bool:
+        with self._lock:
+            return rate > 0 and self.random.random() < rate
+
+    def sample_latency(self) -> Tuple[float, bool]:
+        """Latência do pedido (log-normal em torno da mediana) e se caiu na cauda"""
+        if self._roll(self.profile.tail_rate):
+            return self.profile.tail_seconds, True
+        with self._lock:
+            latency = self.random.lognormvariate(math.log(max(self.profile.latency_median, 1e-3)),
+                                                 self.profile.latency_sigma)
+        return latency, False
+
+    def _rate_limit_headers(self) -> Dict[str, str]:
+        reset = self.bucket.seconds_until_token() if self.bucket else 1.0
+        return {
+            "retry-after": str(max(1, math.ceil(reset))),
+            "x-ratelimit-limit-requests": str(int(self.profile.rate_limit_rpm or 0)),
+            "x-ratelimit-remaining-requests": "0",
+            "x-ratelimit-reset-requests": f"{reset:.3f}s",
+        }
+
+    def _completion_body(self, model: str, content: str) -> Dict[str, Any]:
+        prompt_tokens = self.random.randint(600, 1400)
+        completion_tokens = max(1, len(content) // 4)
+        return {
+            "id": f"chatcmpl-sim-{uuid.uuid4().hex[:12]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": content}}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens},
+        }
+
+    def _extraction_content(self) -> str:
+        with self._lock:
+            confidence = round(self.random.uniform(0.6, 0.98), 2)
+            data = {
+                "data_contato": None, "hora_contato": None,
+                "nome": self.random.choice(FAKE_NAMES),
+                "telefone": None,
+                "bairro": self.random.choice(FAKE_BAIRROS),
+                "referencia_local": None,
+                "tipo_demanda": self.random.choice(VALID_TIPOS_DEMANDA),
+                "descricao_curta": "Relato simulado",
+                "prioridade_percebida": self.random.choice(VALID_PRIORIDADES),
+                "consentimento_comunicacao": None,
+                "confianca_campos": {"nome": confidence, "bairro": confidence, "tipo_demanda": confidence},
+            }
+        return json.dumps(data, ensure_ascii=False)
+
+    def handle(self, request: Dict[str, Any]) -> Tuple[int, Dict[str, str], Optional[Dict[str, Any]]]:
+        """(status HTTP, cabeçalhos, corpo) para um pedido de chat completion"""
+        self._count("requests")
+        model = request.get("model", "gpt-3.5-turbo")
+
+        if self.bucket is not None and not self.bucket.try_take():
+            self._count("rate_limited")
+            return 429, self._rate_limit_headers(), {"error": {
+                "message": "Rate limit reached (simulador)", "type": "requests", "code": "rate_limit_exceeded"}}
+        if self._roll(self.profile.rate_limit_rate):
+            self._count("rate_limited")
+            return 429, self._rate_limit_headers(), {"error": {
+                "message": "Rate limit reached (simulador)", "type": "requests", "code": "rate_limit_exceeded"}}
+        if self._roll(self.profile.timeout_rate):
+            self._count("timeouts")
+            self.sleep(self.profile.hang_seconds)
+            return 504, {}, {"error": {"message": "Timeout (simulador)", "type": "server_error"}}
+
+        latency, tail = self.sample_latency()
+        if tail:
+            self._count("tail")
+        self.sleep(latency)
+
+        if self._roll(self.profile.error_rate):
+            self._count("errors")
+            return 500, {}, {"error": {"message": "Erro interno (simulador)", "type": "server_error"}}
+        if self._roll(self.profile.malformed_rate):
+            self._count("malformed")
+            return 200, {}, self._completion_body(model, "Claro! Aqui está: {nome: Maria, bairro: ")
+
+        self._count("ok")
+        return 200, {}, self._completion_body(model, self._extraction_content())
+
+class InProcessClient:
+    """
+    Cliente no formato do SDK OpenAI (client.chat.completions.create) que chama o
+    simulador direto, sem HTTP: benchmarks medem o pipeline, não a rede
+    """
+
+    def __init__(self, simulator: LLMSimulator):
+        self.simulator = simulator
+        self.chat = SimpleNamespace(completions=self)
+
+    def create(self, model: str, messages: list, **kwargs):
+        status, _, body = self.simulator.handle({"model": model, "messages": messages})
+        if status != 200:
+            raise RuntimeError(f"Simulador respondeu {status}: {body['error']['message']}")
+        message = body["choices"][0]["message"]
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=message["content"]))],
+            usage=SimpleNamespace(**body["usage"]),
+        )
+
+def _handler_class(simulator: LLMSimulator):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            logger.debug("simulador: " + format % args)
+
+        def _reply(self, status: int, headers: Dict[str, str], body: Optional[Dict[str, Any]]):
+            payload = json.dumps(body or {}).encode("utf-8")
+            try:
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # Cliente desistiu (timeout)
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            try:
+                request = json.loads(self.rfile.read(length) or b"{}")
+            except json.JSONDecodeError:
+                return self._reply(400, {}, {"error": {"message": "JSON inválido"}})
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                return self._reply(404, {}, {"error": {"message": f"Rota não simulada: {self.path}"}})
+            self._reply(*simulator.handle(request))
+
+        def do_GET(self):
+            self._reply(200, {}, {"stats": simulator.stats, "profile": simulator.profile.to_dict()})
+
+    return Handler
+
+def start_simulator(profile: FaultProfile = None, host: str = "127.0.0.1", port: int = 0):
+    """Sobe o servidor em thread daemon; retorna (server, simulator, base_url)"""
+    simulator = LLMSimulator(profile)
+    server = ThreadingHTTPServer((host, port), _handler_class(simulator))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="llm-simulator", daemon=True).start()
+    base_url = f"http://{host}:{server.server_address[1]}/v1"
+    logger.info(f"Simulador LLM em {base_url}")
+    return server, simulator, base_url
+
+def add_profile_arguments(parser: argparse.ArgumentParser):
+    """Opções de FaultProfile (compartilhadas com load_test_pipeline.py)"""
+    parser.add_argument("--latency-median", type=float, default=1.5, help="Latência mediana (s)")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="Dispersão log-normal")
+    parser.add_argument("--tail-rate", type=float, default=0.0, help="Fração de pedidos na cauda longa")
+    parser.add_argument("--tail-seconds", type=float, default=20.0, help="Latência da cauda (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fração de respostas 500")
+    parser.add_argument("--rate-limit-rpm", type=float, default=0.0, help="Limite de pedidos/min (0 = sem limite)")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fração extra de 429 aleatórios")
+    parser.add_argument("--timeout-rate", type=float, default=0.0, help="Fração de pedidos que não respondem")
+    parser.add_argument("--hang-seconds", type=float, default=35.0, help="Espera dos pedidos sem resposta (s)")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="Fração de respostas com JSON inválido")
+    parser.add_argument("--seed", type=int, help="Semente para repetir o cenário")
+
+def profile_from_args(args) -> FaultProfile:
+    return FaultProfile(
+        latency_median=args.latency_median, latency_sigma=args.latency_sigma,
+        tail_rate=args.tail_rate, tail_seconds=args.tail_seconds, error_rate=args.error_rate,
+        rate_limit_rpm=args.rate_limit_rpm, rate_limit_rate=args.rate_limit_rate,
+        timeout_rate=args.timeout_rate, hang_seconds=args.hang_seconds,
+        malformed_rate=args.malformed_rate, seed=args.seed,
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulador local da API OpenAI com injeção de falhas")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+
+    server, simulator, base_url = start_simulator(profile_from_args(args), args.host, args.port)
+    print("AgenticLead - Simulador LLM")
+    print("=" * 35)
+    print(f"OPENAI_BASE_URL={base_url}")
+    print("Estatísticas: GET na mesma porta | Ctrl+C para parar")
+    try:
+        while True:
+            time.sleep(10)
+            print(f"📊 {simulator.stats}")
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
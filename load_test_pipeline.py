@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Teste de carga do pipeline completo contra o simulador LLM
+Relatos chegam na taxa alvo pelo mesmo caminho do bot (save_raw_entry →
+FairScheduler → AutoProcessor: placeholders → LLM → export) e o relatório traz
+vazão, percentis de latência ponta a ponta e o que o simulador injetou
+(429, 500, timeouts, JSON inválido, cauda longa).
+Roda num diretório temporário com banco SQLite próprio: não toca nos dados reais.
+Uso: python load_test_pipeline.py --rate 2 --duration 60 --agents 5
+         [--latency-median 1.5 --tail-rate 0.02 --rate-limit-rpm 60 --malformed-rate 0.05]
+         [--base-url http://127.0.0.1:8100/v1]
+"""
+import argparse
+import asyncio
+import os
+import socket
+import sys
+import tempfile
+import time
+from collections import Counter
+from typing import Any, Dict, List
+
+from llm_simulator import add_profile_arguments, profile_from_args, start_simulator
+from synthetic_reports import SyntheticReportGenerator
+
+# Status finais da extração (o relato saiu da fila)
+DONE_STATUSES = ("completed", "validation_failed", "error", "location_only")
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def _percentile(values: List[float], percentile: float):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(int(round(percentile / 100 * (len(ordered) - 1))), len(ordered) - 1)]
+
+async def run_scenario(rate: float, duration: float, agents: int, drain_timeout: float,
+                       seed: int = None) -> Dict[str, Any]:
+    """Injeta relatos na taxa alvo e acompanha cada um até sair da fila"""
+    from sqlalchemy import select
+    from auto_processor import AutoProcessor
+    from backpressure import FairScheduler
+    from database import db, init_db, StructuredEntry
+
+    manager = init_db()
+    generator = SyntheticReportGenerator(seed=seed, location_only_rate=0)
+    scheduler = FairScheduler()
+    ingested: Dict[int, float] = {}
+    completed: Dict[int, float] = {}
+    statuses: Counter = Counter()
+    tickets: Counter = Counter()
+    pipeline_runs: List[float] = []
+    pipeline_errors: List[str] = []
+
+    async def pipeline_job():
+        # Mesmo job que o bot agenda por relato
+        start = time.perf_counter()
+        result = await AutoProcessor().process_new_entries()
+        pipeline_runs.append(time.perf_counter() - start)
+        if not result["success"]:
+            pipeline_errors.append(result["message"])
+
+    async def producer():
+        total = int(rate * duration)
+        started = time.monotonic()
+        for index in range(total):
+            delay = started + index / rate - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            agente_id = f"agente_{index % agents}"
+            raw_id = db.save_raw_entry(agente_id, generator.report()["texto"], message_id=index + 1)
+            ingested[raw_id] = time.monotonic()
+            tickets[scheduler.submit(agente_id, pipeline_job)["status"]] += 1
+
+    def poll_finished() -> None:
+        waiting = [raw_id for raw_id in ingested if raw_id not in completed]
+        if not waiting:
+            return
+        # Conexão própria: a sessão do loop é compartilhada com o pipeline
+        with manager.engine.connect() as connection:
+            rows = connection.execute(
+                select(StructuredEntry.raw_text_id, StructuredEntry.extraction_status)
+                .where(StructuredEntry.raw_text_id.in_(waiting),
+                       StructuredEntry.extraction_status.in_(DONE_STATUSES))
+            ).all()
+        now = time.monotonic()
+        for raw_id, status in rows:
+            completed[raw_id] = now
+            statuses[status] += 1
+
+    async def monitor(stop: asyncio.Event):
+        while not stop.is_set():
+            poll_finished()
+            await asyncio.sleep(0.25)
+
+    started = time.monotonic()
+    stop = asyncio.Event()
+    watcher = asyncio.ensure_future(monitor(stop))
+    await producer()
+    produced_at = time.monotonic()
+
+    # Esvazia as filas do scheduler e depois os relatos descartados (shed)
+    await scheduler.drain()
+    deadline = time.monotonic() + drain_timeout
+    while len(completed) < len(ingested) and time.monotonic() < deadline:
+        poll_finished()
+        if scheduler.get_stats()["in_flight"] == 0 and len(completed) < len(ingested):
+            await pipeline_job()
+        await asyncio.sleep(0.25)
+    poll_finished()
+    stop.set()
+    await watcher
+    elapsed = time.monotonic() - started
+
+    latencies = [completed[raw_id] - ingested[raw_id] for raw_id in completed]
+    return {
+        "target_rate": rate,
+        "ingested": len(ingested),
+        "finished": len(completed),
+        "unfinished": len(ingested) - len(completed),
+        "elapsed_seconds": round(elapsed, 1),
+        "ingest_seconds": round(produced_at - started, 1),
+        "throughput_per_second": round(len(completed) / elapsed, 2) if elapsed else 0,
+        "latency_p50_s": _round(_percentile(latencies, 50)),
+        "latency_p95_s": _round(_percentile(latencies, 95)),
+        "latency_p99_s": _round(_percentile(latencies, 99)),
+        "latency_max_s": _round(max(latencies) if latencies else None),
+        "pipeline_runs": len(pipeline_runs),
+        "pipeline_errors": len(pipeline_errors),
+        "pipeline_run_p95_s": _round(_percentile(pipeline_runs, 95)),
+        "statuses": dict(statuses),
+        "tickets": dict(tickets),
+    }
+
+def _round(value):
+    return round(value, 2) if value is not None else None
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga do pipeline (bot → DB → LLM → export)")
+    parser.add_argument("--rate", type=float, default=2.0, help="Relatos por segundo")
+    parser.add_argument("--duration", type=float, default=60, help="Segundos de injeção")
+    parser.add_argument("--agents", type=int, default=5, help="Agentes distintos (filas do scheduler)")
+    parser.add_argument("--drain-timeout", type=float, default=300, help="Espera máxima após a injeção (s)")
+    parser.add_argument("--base-url", help="Simulador já em execução (default: sobe um local)")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="agenticlead_load_")
+    port = None if args.base_url else _free_port()
+    base_url = args.base_url or f"http://127.0.0.1:{port}/v1"
+
+    # Antes de importar config: o pipeline inteiro lê estas variáveis
+    os.environ.update({
+        "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'load_test.db')}",
+        "OPENAI_BASE_URL": base_url,
+        "OPENAI_API_KEY": os.getenv("OPENAI_API_KEY") or "sk-simulador",
+        "LLM_CASSETTE_MODE": "off",
+    })
+    os.chdir(workdir)  # Exports (agenticlead_dados.*) ficam no diretório temporário
+
+    server = simulator = None
+    if port is not None:
+        server, simulator, _ = start_simulator(profile_from_args(args), port=port)
+
+    print("AgenticLead - Teste de carga do pipeline")
+    print("=" * 45)
+    print(f"LLM: {base_url} | {args.rate} relatos/s por {args.duration:.0f}s | {args.agents} agentes")
+    print(f"Diretório de trabalho: {workdir}\n")
+
+    try:
+        result = asyncio.run(run_scenario(args.rate, args.duration, args.agents, args.drain_timeout, args.seed))
+    except KeyboardInterrupt:
+        print("\n⏹️ Interrompido")
+        sys.exit(1)
+    finally:
+        if server is not None:
+            server.shutdown()
+
+    print(f"Relatos: {result['ingested']} injetados, {result['finished']} concluídos, "
+          f"{result['unfinished']} pendentes")
+    print(f"Vazão: {result['throughput_per_second']} relatos/s (alvo {args.rate}) "
+          f"em {result['elapsed_seconds']}s")
+    print(f"Latência ponta a ponta (s): p50 {result['latency_p50_s']} | p95 {result['latency_p95_s']} | "
+          f"p99 {result['latency_p99_s']} | máx {result['latency_max_s']}")
+    print(f"Status finais: {result['statuses']}")
+    print(f"Scheduler: {result['tickets']} | execuções do pipeline: {result['pipeline_runs']} "
+          f"({result['pipeline_errors']} com erro, p95 {result['pipeline_run_p95_s']}s)")
+    if simulator is not None:
+        print(f"Simulador: {simulator.stats}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Teste de carga do web_app servido pelo gunicorn
+Sobe o gunicorn com 1, 2, 4... workers e mede requisições/segundo
+Uso: python load_test_web.py --workers 1,2,4 --duration 10 --concurrency 32 --path /api/stats
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from statistics import median
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def _wait_ready(url: str, timeout: float = 30) -> bool:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=2) as response:
+                if response.status == 200:
+                    return True
+        except Exception:
+            time.sleep(0.2)
+    return False
+
+def _client(url: str, stop_at: float) -> list:
+    """Faz requisições em sequência até o fim do teste; retorna latências (ou None p/ erro)"""
+    latencies = []
+    while time.time() < stop_at:
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(url, timeout=10) as response:
+                response.read()
+                latencies.append(time.perf_counter() - start if response.status == 200 else None)
+        except Exception:
+            latencies.append(None)
+    return latencies
+
+def run_level(workers: int, threads: int, path: str, duration: float, concurrency: int) -> dict:
+    """Executa um nível de carga com o número de workers indicado"""
+    port = _free_port()
+    env = dict(os.environ, PORT=str(port), WEB_CONCURRENCY=str(workers), WEB_THREADS=str(threads))
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "web_app:app"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    url = f"http://127.0.0.1:{port}{path}"
+    try:
+        if not _wait_ready(url):
+            raise RuntimeError(f"gunicorn não respondeu em {url}")
+
+        stop_at = time.time() + duration
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(lambda _: _client(url, stop_at), range(concurrency)))
+    finally:
+        server.terminate()
+        server.wait(timeout=15)
+
+    latencies = [latency for client in results for latency in client]
+    ok = sorted(latency for latency in latencies if latency is not None)
+    return {
+        "workers": workers,
+        "requests": len(latencies),
+        "errors": len(latencies) - len(ok),
+        "rps": round(len(ok) / duration, 1),
+        "p50_ms": round(median(ok) * 1000, 1) if ok else None,
+        "p95_ms": round(ok[int(len(ok) * 0.95) - 1] * 1000, 1) if ok else None,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga do web_app (gunicorn)")
+    parser.add_argument("--workers", default="1,2,4", help="Níveis de workers, separados por vírgula")
+    parser.add_argument("--threads", type=int, default=4, help="Threads por worker")
+    parser.add_argument("--duration", type=float, default=10, help="Segundos por nível")
+    parser.add_argument("--concurrency", type=int, default=32, help="Clientes simultâneos")
+    parser.add_argument("--path", default="/api/stats", help="Endpoint testado")
+    args = parser.parse_args()
+
+    if not os.getenv("DATABASE_URL"):
+        print("❌ DATABASE_URL não configurada!")
+        sys.exit(1)
+
+    print("AgenticLead - Teste de carga do web app")
+    print("=" * 45)
+    print(f"Endpoint: {args.path} | {args.concurrency} clientes | {args.duration:.0f}s por nível\n")
+    print(f"{'workers':>8} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'erros':>6}")
+
+    baseline = None
+    for workers in [int(value) for value in args.workers.split(",")]:
+        result = run_level(workers, args.threads, args.path, args.duration, args.concurrency)
+        baseline = baseline or result["rps"]
+        scaling = result["rps"] / baseline if baseline else 0
+        print(f"{result['workers']:>8} {result['rps']:>8} {result['p50_ms']:>8} "
+              f"{result['p95_ms']:>8} {result['errors']:>6}   ({scaling:.2f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Monitor de travamentos do event loop
+Mede o atraso de um sleep periódico: qualquer trabalho síncrono no loop aparece como stall
+"""
+import asyncio
+import logging
+from typing import Callable, Dict, Any, Optional
+from config import LOOP_STALL_WARN_SECONDS
+
+logger = logging.getLogger(__name__)
+
+class EventLoopStallMonitor:
+    """Registra o maior atraso observado no event loop"""
+    
+    def __init__(self, interval: float = 0.1, warn_threshold: float = None,
+                 clock: Optional[Callable[[], float]] = None):
+        self.interval = interval
+        self.clock = clock  # padrão: loop.time()
+        self.warn_threshold = LOOP_STALL_WARN_SECONDS if warn_threshold is None else warn_threshold
+        self.max_stall = 0.0
+        self.last_stall = 0.0
+        self.stalls_over_threshold = 0
+        self.samples = 0
+        self._task: Optional[asyncio.Task] = None
+    
+    def start(self):
+        """Inicia a medição no loop atual"""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+    
+    async def stop(self):
+        """Para a medição"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    async def _run(self):
+        clock = self.clock or asyncio.get_running_loop().time
+        while True:
+            expected = clock() + self.interval
+            await asyncio.sleep(self.interval)
+            stall = max(clock() - expected, 0.0)
+            
+            self.samples += 1
+            self.last_stall = stall
+            if stall > self.max_stall:
+                self.max_stall = stall
+            if stall >= self.warn_threshold:
+                self.stalls_over_threshold += 1
+                logger.warning(f"Event loop travado por {stall * 1000:.0f} ms")
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Estatísticas de travamento em milissegundos"""
+        return {
+            "max_stall_ms": round(self.max_stall * 1000, 1),
+            "last_stall_ms": round(self.last_stall * 1000, 1),
+            "stalls_over_threshold": self.stalls_over_threshold,
+            "samples": self.samples
+        }
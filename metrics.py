@@ -0,0 +1,396 @@
+"""
+Métricas no formato texto do Prometheus (sem dependências externas)
+Contadores, gauges e histogramas com labels, num registro por processo.
+Expostas em /metrics pelo web_app e, no bot em polling, por METRICS_PORT.
+Com vários workers do gunicorn, METRICS_MULTIPROC_DIR aponta um diretório
+compartilhado: cada worker grava ali seus contadores/histogramas e o worker
+que atende o scrape soma todos (gauges calculados na hora vêm só dele).
+"""
+import glob
+import json
+import logging
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+from sqlalchemy.pool import QueuePool
+
+from config import METRICS_ENABLED, METRICS_FLUSH_SECONDS, METRICS_MULTIPROC_DIR
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Segundos: de consultas ao banco (ms) a caudas do LLM (dezenas de segundos)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _label_text(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], object] = {}
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name}: labels esperados {self.labelnames}, recebidos {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self, values: Dict[Tuple[str, ...], object] = None) -> List[str]:
+        """values: valores somados de todos os processos (None = só este processo)"""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples(self.snapshot() if values is None else values))
+        return lines
+
+    def snapshot(self) -> Dict[Tuple[str, ...], object]:
+        """Cópia dos valores deste processo"""
+        with self._lock:
+            return dict(self._values)
+
+    def merge(self, total: object, value: object) -> object:
+        """Soma o valor de outro processo ao acumulado"""
+        return value if total is None else total + value
+
+    def _samples(self, values: Dict[Tuple[str, ...], object]) -> Iterable[str]:
+        raise NotImplementedError
+
+class Counter(_Metric):
+    """Valor que só cresce (ex: chamadas, tokens)"""
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def _samples(self, values):
+        for key, value in sorted(values.items()):
+            yield f"{self.name}_total{_label_text(self.labelnames, key)} {_format_value(value)}"
+
+class Gauge(_Metric):
+    """Valor instantâneo; set_function calcula na hora do scrape (ex: backlog no banco)"""
+    kind = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._function: Callable[[], Dict[Tuple[str, ...], float]] = None
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def set_function(self, function: Callable[[], Dict[Tuple[str, ...], float]]):
+        """function() → {(valores dos labels): valor}"""
+        self._function = function
+
+    def render(self, values=None):
+        # Calculado na hora do scrape: não é somado entre processos
+        return super().render(None if self._function is not None else values)
+
+    def snapshot(self):
+        if self._function is None:
+            return super().snapshot()
+        try:
+            return self._function()
+        except Exception as e:
+            logger.warning(f"Métrica {self.name} indisponível: {e}")
+            return {}
+
+    def _samples(self, values):
+        for key, value in sorted(values.items()):
+            yield f"{self.name}{_label_text(self.labelnames, key)} {_format_value(value)}"
+
+class Histogram(_Metric):
+    """Distribuição em buckets cumulativos + soma e contagem"""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS, registry=None):
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.setdefault(key, {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0})
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state["buckets"][index] += 1
+            state["sum"] += value
+            state["count"] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        state = self._values.get(self._key(labels))
+        return state["count"] if state else 0
+
+    def snapshot(self):
+        with self._lock:
+            return {key: dict(state, buckets=list(state["buckets"])) for key, state in self._values.items()}
+
+    def merge(self, total, value):
+        if total is None:
+            return dict(value, buckets=list(value["buckets"]))
+        total["buckets"] = [a + b for a, b in zip(total["buckets"], value["buckets"])]
+        total["sum"] += value["sum"]
+        total["count"] += value["count"]
+        return total
+
+    def _samples(self, values):
+        names = self.labelnames + ("le",)
+        for key, state in sorted(values.items()):
+            for bound, cumulative in zip(self.buckets, state["buckets"]):
+                yield f"{self.name}_bucket{_label_text(names, key + (_format_value(bound),))} {cumulative}"
+            yield f"{self.name}_sum{_label_text(self.labelnames, key)} {_format_value(state['sum'])}"
+            yield f"{self.name}_count{_label_text(self.labelnames, key)} {state['count']}"
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric):
+        self._metrics.append(metric)
+
+    def render(self, merged: Dict[str, Dict[Tuple[str, ...], object]] = None) -> str:
+        """merged: valores somados por métrica (collect); None = só este processo"""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render(None if merged is None else merged.get(metric.name, {})))
+        return "\n".join(lines) + "\n"
+
+    def _shared(self) -> List[_Metric]:
+        # Gauges com set_function são calculados por quem atende o scrape
+        return [metric for metric in self._metrics if getattr(metric, "_function", None) is None]
+
+    def write_snapshot(self, directory: str, pid: int = None):
+        """Grava os valores deste processo em <directory>/metrics_<pid>.json (troca atômica)"""
+        pid = os.getpid() if pid is None else pid
+        payload = {
+            metric.name: {"kind": metric.kind,
+                          "values": [[list(key), value] for key, value in metric.snapshot().items()]}
+            for metric in self._shared()
+        }
+        path = os.path.join(directory, f"metrics_{pid}.json")
+        temporary = f"{path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as target:
+            json.dump(payload, target)
+        os.replace(temporary, path)
+
+    def collect(self, directory: str) -> Dict[str, Dict[Tuple[str, ...], object]]:
+        """Soma os valores gravados por todos os processos (vivos e encerrados)"""
+        by_name = {metric.name: metric for metric in self._shared()}
+        merged: Dict[str, Dict[Tuple[str, ...], object]] = {name: {} for name in by_name}
+        for path in sorted(glob.glob(os.path.join(directory, "metrics_*.json"))):
+            try:
+                with open(path, encoding="utf-8") as source:
+                    payload = json.load(source)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Snapshot de métricas ilegível {path}: {e}")
+                continue
+            for name, entry in payload.items():
+                metric = by_name.get(name)
+                if metric is None:
+                    continue
+                values = merged[name]
+                for key, value in entry["values"]:
+                    key = tuple(key)
+                    values[key] = metric.merge(values.get(key), value)
+        return merged
+
+REGISTRY = Registry()
+
+# --- Métricas do pipeline -------------------------------------------------
+
+INGEST_SECONDS = Histogram(
+    "agenticlead_ingest_seconds", "Gravação de um relato bruto (save_raw_entry)")
+SCHEDULER_WAIT_SECONDS = Histogram(
+    "agenticlead_scheduler_wait_seconds", "Espera no FairScheduler do bot até o pipeline iniciar")
+QUEUE_WAIT_SECONDS = Histogram(
+    "agenticlead_queue_wait_seconds", "Captura do relato até o início da extração", ["priority"],
+    buckets=(1, 5, 15, 30, 60, 120, 300, 900, 1800, 3600, 7200))
+LLM_REQUEST_SECONDS = Histogram(
+    "agenticlead_llm_request_seconds", "Chamadas ao LLM por modelo e resultado", ["model", "status"])
+LLM_RETRIES = Counter(
+    "agenticlead_llm_retries", "Novas chamadas ao LLM (reformatação de JSON, escalada da cascata)",
+    ["model", "reason"])
+LLM_TOKENS = Counter(
+    "agenticlead_llm_tokens", "Tokens consumidos por modelo", ["model", "kind"])
+EXTRACTIONS = Counter(
+    "agenticlead_extractions", "Extrações gravadas por status final", ["status"])
+EXPORT_SECONDS = Histogram(
+    "agenticlead_export_seconds", "Geração dos arquivos XLSX/CSV", ["status"])
+DB_QUERY_SECONDS = Histogram(
+    "agenticlead_db_query_seconds", "Execução de comandos SQL por operação", ["operation"])
+DB_POOL_WAIT_SECONDS = Histogram(
+    "agenticlead_db_pool_checkout_wait_seconds", "Espera por uma conexão livre no pool")
+DB_POOL_CHECKED_OUT = Gauge(
+    "agenticlead_db_pool_checked_out", "Conexões do pool em uso")
+BACKLOG = Gauge(
+    "agenticlead_backlog", "Structured entries por extraction_status", ["status"])
+
+def _backlog_by_status() -> Dict[Tuple[str, ...], float]:
+    import database
+    if database.db_manager is None:
+        return {}
+    from sqlalchemy import func
+    with database.db_manager.engine.connect() as connection:
+        table = database.StructuredEntry.__table__
+        rows = connection.execute(
+            table.select().with_only_columns(table.c.extraction_status, func.count())
+            .group_by(table.c.extraction_status)
+        ).all()
+    return {(status or "pending",): count for status, count in rows}
+
+def _pool_checked_out() -> Dict[Tuple[str, ...], float]:
+    import database
+    if database.db_manager is None:
+        return {}
+    pool = database.db_manager.engine.pool
+    return {(): pool.checkedout()} if hasattr(pool, "checkedout") else {}
+
+BACKLOG.set_function(_backlog_by_status)
+DB_POOL_CHECKED_OUT.set_function(_pool_checked_out)
+
+def render() -> str:
+    """
+    Todas as métricas (vazio se METRICS_ENABLED=false)
+    Com METRICS_MULTIPROC_DIR, soma os snapshots de todos os workers
+    """
+    if not METRICS_ENABLED:
+        return ""
+    if not METRICS_MULTIPROC_DIR:
+        return REGISTRY.render()
+    # O próprio snapshot vai atualizado; os dos outros workers têm até METRICS_FLUSH_SECONDS
+    REGISTRY.write_snapshot(METRICS_MULTIPROC_DIR)
+    return REGISTRY.render(REGISTRY.collect(METRICS_MULTIPROC_DIR))
+
+def clear_multiproc_dir(directory: str = None):
+    """Remove snapshots de execuções anteriores (master do gunicorn, antes dos workers)"""
+    directory = directory or METRICS_MULTIPROC_DIR
+    if not directory:
+        return
+    os.makedirs(directory, exist_ok=True)
+    for path in glob.glob(os.path.join(directory, "metrics_*.json*")):
+        os.remove(path)
+
+def mark_process_dead(pid: int, directory: str = None):
+    """
+    Worker encerrado: o snapshot fica (contadores e histogramas não podem
+    diminuir), mas seus gauges deixam de valer
+    """
+    directory = directory or METRICS_MULTIPROC_DIR
+    path = os.path.join(directory, f"metrics_{pid}.json") if directory else None
+    if not path or not os.path.exists(path):
+        return
+    with open(path, encoding="utf-8") as source:
+        payload = json.load(source)
+    payload = {name: entry for name, entry in payload.items() if entry["kind"] != "gauge"}
+    with open(f"{path}.tmp", "w", encoding="utf-8") as target:
+        json.dump(payload, target)
+    os.replace(f"{path}.tmp", path)
+
+def start_snapshot_writer(directory: str = None, interval: float = None):
+    """Thread daemon que grava o snapshot do processo periodicamente (cada worker, após o fork)"""
+    directory = directory or METRICS_MULTIPROC_DIR
+    if not METRICS_ENABLED or not directory:
+        return None
+    interval = METRICS_FLUSH_SECONDS if interval is None else interval
+
+    def loop():
+        while True:
+            time.sleep(interval)
+            try:
+                REGISTRY.write_snapshot(directory)
+            except OSError as e:
+                logger.warning(f"Falha ao gravar snapshot de métricas: {e}")
+
+    thread = threading.Thread(target=loop, name="metrics-snapshot", daemon=True)
+    thread.start()
+    return thread
+
+def sql_operation(statement: str) -> str:
+    """SELECT/INSERT/UPDATE/DELETE/... (primeira palavra do comando)"""
+    words = statement.lstrip().split(None, 1)
+    return words[0].upper() if words else "UNKNOWN"
+
+def instrument_engine(engine):
+    """Tempo de cada comando SQL (eventos do SQLAlchemy)"""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("metrics_query_start")
+        if starts:
+            DB_QUERY_SECONDS.observe(time.perf_counter() - starts.pop(), operation=sql_operation(statement))
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool que mede a espera por uma conexão livre (pool_timeout esgotando)"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_WAIT_SECONDS.observe(time.perf_counter() - start)
+
+def start_metrics_server(port: int, host: str = "0.0.0.0"):
+    """Servidor /metrics em thread daemon (processos sem Flask, como o bot em polling)"""
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_response(404)
+                self.end_headers()
+                return
+            payload = render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    logger.info(f"Métricas em http://{host}:{server.server_address[1]}/metrics")
+    return server
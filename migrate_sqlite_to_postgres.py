@@ -1,16 +1,16 @@
 #!/usr/bin/env python3
 """
 Script para migrar dados do SQLite para PostgreSQL
+Usa BulkMigrator (COPY em blocos, checkpoints retomáveis, checksum)
+Uso: python migrate_sqlite_to_postgres.py [--reset]
 """
 import os
 import sys
-from sqlalchemy import create_engine, text
-from sqlalchemy.orm import sessionmaker
-from database import Base, RawEntry, StructuredEntry
-from config import DATABASE_URL
+from sqlalchemy import create_engine
+from bulk_migration import BulkMigrator
 
-def migrate_data():
-    """Migra dados do SQLite para PostgreSQL"""
+def migrate_data(reset: bool = False):
+    """Migra dados do SQLite para PostgreSQL (retoma do último checkpoint)"""
     
     # URLs dos bancos
     sqlite_url = "sqlite:///agenticlead.db"
@@ -31,94 +31,30 @@ def migrate_data():
     print(f"🔄 Migrando de SQLite para PostgreSQL...")
     print(f"SQLite: {sqlite_url}")
     print(f"PostgreSQL: {postgres_url[:50]}...")
+    if reset:
+        print("🧹 Reset: checkpoints e dados do PostgreSQL serão apagados")
     
     try:
-        # Conectar ao SQLite (origem)
-        sqlite_engine = create_engine(sqlite_url)
-        SqliteSession = sessionmaker(bind=sqlite_engine)
-        sqlite_session = SqliteSession()
+        migrator = BulkMigrator(create_engine(sqlite_url), create_engine(postgres_url))
+        report = migrator.run(reset=reset)
         
-        # Conectar ao PostgreSQL (destino)
-        postgres_engine = create_engine(postgres_url)
-        PostgresSession = sessionmaker(bind=postgres_engine)
-        postgres_session = PostgresSession()
-        
-        # Criar tabelas no PostgreSQL
-        print("📋 Criando tabelas no PostgreSQL...")
-        Base.metadata.create_all(postgres_engine)
-        
-        # Limpar tabelas existentes no PostgreSQL (se existirem)
-        print("🧹 Limpando dados existentes no PostgreSQL...")
-        postgres_session.execute(text("DELETE FROM structured_entries"))
-        postgres_session.execute(text("DELETE FROM raw_entries"))
-        postgres_session.commit()
-        
-        # Migrar raw_entries
-        print("📦 Migrando raw_entries...")
-        raw_entries = sqlite_session.query(RawEntry).all()
-        
-        for entry in raw_entries:
-            new_entry = RawEntry(
-                id=entry.id,
-                timestamp_captura=entry.timestamp_captura,
-                agente_id=entry.agente_id,
-                texto_original=entry.texto_original,
-                latitude=entry.latitude,
-                longitude=entry.longitude,
-                processado=entry.processado,
-                telegram_message_id=entry.telegram_message_id
-            )
-            postgres_session.add(new_entry)
-        
-        postgres_session.commit()
-        print(f"✅ Migradas {len(raw_entries)} entradas brutas")
-        
-        # Migrar structured_entries
-        print("📊 Migrando structured_entries...")
-        structured_entries = sqlite_session.query(StructuredEntry).all()
-        
-        for entry in structured_entries:
-            new_entry = StructuredEntry(
-                id=entry.id,
-                raw_text_id=entry.raw_text_id,
-                data_contato=entry.data_contato,
-                hora_contato=entry.hora_contato,
-                nome=entry.nome,
-                telefone=entry.telefone,
-                bairro=entry.bairro,
-                referencia_local=entry.referencia_local,
-                tipo_demanda=entry.tipo_demanda,
-                descricao_curta=entry.descricao_curta,
-                prioridade_percebida=entry.prioridade_percebida,
-                consentimento_comunicacao=entry.consentimento_comunicacao,
-                fonte=entry.fonte,
-                confianca_global=entry.confianca_global,
-                flags=entry.flags,
-                confianca_campos=entry.confianca_campos,
-                timestamp_processamento=entry.timestamp_processamento,
-                revisado=entry.revisado,
-                extraction_status=entry.extraction_status,
-                error_msg=entry.error_msg,
-                llm_metadata=entry.llm_metadata,
-                processing_attempts=entry.processing_attempts,
-                last_processed_at=entry.last_processed_at
-            )
-            postgres_session.add(new_entry)
-        
-        postgres_session.commit()
-        print(f"✅ Migradas {len(structured_entries)} entradas estruturadas")
+        for table_name, copied in report["copied"].items():
+            print(f"✅ {table_name}: {copied} linhas copiadas nesta execução")
+        for index_name, rows in report["indexed"].items():
+            print(f"🔎 {index_name}: {rows} linhas reindexadas")
         
         # Verificar dados migrados
         print("\n📊 Verificando migração...")
-        pg_raw_count = postgres_session.query(RawEntry).count()
-        pg_structured_count = postgres_session.query(StructuredEntry).count()
-        
-        print(f"PostgreSQL - Raw entries: {pg_raw_count}")
-        print(f"PostgreSQL - Structured entries: {pg_structured_count}")
+        all_ok = True
+        for table_name, result in report["verification"].items():
+            status = "OK" if result["ok"] else "DIVERGENTE"
+            print(f"{table_name}: origem {result['source']['count']} / destino {result['target']['count']} "
+                  f"- checksum {status}")
+            all_ok = all_ok and result["ok"]
         
-        # Fechar sessões
-        sqlite_session.close()
-        postgres_session.close()
+        if not all_ok:
+            print("❌ Contagem/checksum divergente - rode novamente com --reset")
+            return False
         
         print("\n🎉 Migração concluída com sucesso!")
         print("\n⚙️  Próximos passos:")
@@ -130,13 +66,14 @@ def migrate_data():
         
     except Exception as e:
         print(f"❌ Erro durante a migração: {e}")
+        print("ℹ️  Rode novamente para retomar do último checkpoint")
         return False
 
 if __name__ == "__main__":
     print("🔄 Iniciando migração SQLite → PostgreSQL")
     print("=" * 50)
     
-    if migrate_data():
+    if migrate_data(reset="--reset" in sys.argv):
         print("\n✅ Migração concluída!")
     else:
         print("\n❌ Migração falhou!")
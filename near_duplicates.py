@@ -0,0 +1,202 @@
+"""
+Detecção de relatos quase duplicados (MinHash + LSH sobre texto_original)
+O mesmo problema relatado por vários agentes vira um cluster: os campos da
+demanda de um relato já processado são reaproveitados pelos demais
+"""
+import hashlib
+import logging
+import random
+import re
+from datetime import datetime, timedelta
+from typing import List, Optional, Set
+
+from config import NEAR_DUP_REUSE_THRESHOLD, NEAR_DUP_THRESHOLD, NEAR_DUP_WINDOW_HOURS
+from database import db, LshBucket, RawEntry, StructuredEntry, TextSignature
+from pre_extractor import RuleBasedPreExtractor, normalize_text
+from session_merge import LOCATION_TEXT_PREFIX
+
+logger = logging.getLogger(__name__)
+
+# 64 permutações em 16 bandas de 4 linhas: limiar LSH ≈ (1/16)^(1/4) ≈ 0.5
+NUM_PERMUTATIONS = 64
+BANDS = 16
+ROWS_PER_BAND = NUM_PERMUTATIONS // BANDS
+SHINGLE_SIZE = 4
+
+REBUILD_CHUNK_SIZE = 1000
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+# Coeficientes fixos: assinaturas persistidas continuam comparáveis entre execuções
+_random = random.Random(1807)
+_PERMUTATIONS = [
+    (_random.randint(1, _MERSENNE_PRIME - 1), _random.randint(0, _MERSENNE_PRIME - 1))
+    for _ in range(NUM_PERMUTATIONS)
+]
+
+_NON_WORD = re.compile(r'[^a-z0-9]+')
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> Set[str]:
+    """Shingles de caracteres do texto normalizado (sem acentos/pontuação)"""
+    cleaned = _NON_WORD.sub(' ', normalize_text(text)).strip()
+    if len(cleaned) <= size:
+        return {cleaned} if cleaned else set()
+    return {cleaned[i:i + size] for i in range(len(cleaned) - size + 1)}
+
+def _hash_shingle(shingle: str) -> int:
+    return int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=4).digest(), 'big')
+
+def minhash_signature(text: str) -> List[int]:
+    """Assinatura MinHash (NUM_PERMUTATIONS valores)"""
+    hashes = [_hash_shingle(shingle) for shingle in shingles(text)]
+    if not hashes:
+        return [_MAX_HASH] * NUM_PERMUTATIONS
+    return [
+        min(((a * value + b) % _MERSENNE_PRIME) & _MAX_HASH for value in hashes)
+        for a, b in _PERMUTATIONS
+    ]
+
+def estimated_similarity(signature_a: List[int], signature_b: List[int]) -> float:
+    """Jaccard estimado pela fração de posições iguais"""
+    equal = sum(1 for a, b in zip(signature_a, signature_b) if a == b)
+    return equal / NUM_PERMUTATIONS
+
+def band_buckets(signature: List[int]) -> List[str]:
+    """Chaves LSH 'banda:hash' da assinatura"""
+    buckets = []
+    for band in range(BANDS):
+        rows = signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]
+        digest = hashlib.blake2b(','.join(map(str, rows)).encode('ascii'), digest_size=8).hexdigest()
+        buckets.append(f"{band}:{digest}")
+    return buckets
+
+def rebuild_signatures(connection) -> int:
+    """
+    Recalcula assinaturas e buckets LSH de todas as raw_entries (cargas em massa)
+    cluster_id não é recalculado: vem com as linhas copiadas
+    """
+    connection.execute(LshBucket.__table__.delete())
+    connection.execute(TextSignature.__table__.delete())
+    rows = connection.execute(
+        RawEntry.__table__.select().with_only_columns(RawEntry.id, RawEntry.texto_original).order_by(RawEntry.id)
+    ).all()
+    # Mesma regra do processor: localização pura não é indexada
+    rows = [(raw_id, texto) for raw_id, texto in rows if not (texto or "").startswith(LOCATION_TEXT_PREFIX)]
+
+    now = datetime.utcnow()
+    for start in range(0, len(rows), REBUILD_CHUNK_SIZE):
+        signatures = [(raw_id, minhash_signature(texto or "")) for raw_id, texto in rows[start:start + REBUILD_CHUNK_SIZE]]
+        connection.execute(TextSignature.__table__.insert(), [
+            {"raw_id": raw_id, "signature": signature, "created_at": now} for raw_id, signature in signatures
+        ])
+        connection.execute(LshBucket.__table__.insert(), [
+            {"bucket": bucket, "raw_id": raw_id}
+            for raw_id, signature in signatures for bucket in band_buckets(signature)
+        ])
+    return len(rows)
+
+class NearDuplicateIndex:
+    """Índice LSH persistido, atualizado a cada relato ingerido"""
+
+    def __init__(self, threshold: float = None, window_hours: float = None, reuse_threshold: float = None):
+        self.db = db
+        self.threshold = NEAR_DUP_THRESHOLD if threshold is None else threshold
+        self.reuse_threshold = NEAR_DUP_REUSE_THRESHOLD if reuse_threshold is None else reuse_threshold
+        self.window_hours = NEAR_DUP_WINDOW_HOURS if window_hours is None else window_hours
+        self.pre_extractor = RuleBasedPreExtractor()
+
+    def _bairro(self, raw_entry: RawEntry) -> Optional[str]:
+        """Bairro extraído (structured) ou pré-extraído por regra, normalizado"""
+        structured = self.db.session.query(StructuredEntry.bairro).filter(
+            StructuredEntry.raw_text_id == raw_entry.id,
+            StructuredEntry.bairro.isnot(None)
+        ).first()
+        bairro = structured[0] if structured else \
+            self.pre_extractor.extract(raw_entry.texto_original)["fields"].get("bairro")
+        return normalize_text(bairro).strip() if bairro else None
+
+    def find_duplicate(self, raw_entry: RawEntry, signature: List[int]) -> Optional[RawEntry]:
+        """Relato mais parecido dentro da janela de tempo e do mesmo bairro (se conhecido)"""
+        window = timedelta(hours=self.window_hours)
+        candidates = self.db.session.query(RawEntry, TextSignature.signature).join(
+            LshBucket, LshBucket.raw_id == RawEntry.id
+        ).join(
+            TextSignature, TextSignature.raw_id == RawEntry.id
+        ).filter(
+            LshBucket.bucket.in_(band_buckets(signature)),
+            RawEntry.id != raw_entry.id,
+            RawEntry.timestamp_captura >= raw_entry.timestamp_captura - window,
+            RawEntry.timestamp_captura <= raw_entry.timestamp_captura + window
+        ).distinct().all()
+
+        scored = [
+            (estimated_similarity(signature, candidate_signature), candidate)
+            for candidate, candidate_signature in candidates
+        ]
+        scored = [item for item in scored if item[0] >= self.threshold]
+        if not scored:
+            return None
+
+        bairro = self._bairro(raw_entry)
+        for similarity, candidate in sorted(scored, key=lambda item: (-item[0], item[1].id)):
+            candidate_bairro = self._bairro(candidate)
+            if bairro and candidate_bairro and bairro != candidate_bairro:
+                continue
+            logger.info(f"Raw {raw_entry.id} quase duplicada de {candidate.id} (similaridade {similarity:.2f})")
+            return candidate
+        return None
+
+    def index_entry(self, raw_entry: RawEntry) -> Optional[int]:
+        """
+        Indexa o relato e define raw_entry.cluster_id
+        Retorna o id do relato irmão (None se não houver duplicata)
+        """
+        if self.db.session.get(TextSignature, raw_entry.id) is not None:
+            return None
+
+        signature = minhash_signature(raw_entry.texto_original or "")
+        duplicate = self.find_duplicate(raw_entry, signature)
+
+        self.db.session.add(TextSignature(raw_id=raw_entry.id, signature=signature))
+        self.db.session.add_all([
+            LshBucket(bucket=bucket, raw_id=raw_entry.id) for bucket in band_buckets(signature)
+        ])
+        if duplicate is not None:
+            raw_entry.cluster_id = duplicate.cluster_id or duplicate.id
+        else:
+            raw_entry.cluster_id = raw_entry.id
+        self.db.session.commit()
+
+        return duplicate.id if duplicate is not None else None
+
+    def find_extracted_sibling(self, raw_entry: RawEntry) -> Optional[StructuredEntry]:
+        """
+        Extração já concluída de outro relato do mesmo cluster que pode ser reaproveitada
+        Mais exigente que o agrupamento: similaridade >= reuse_threshold e o mesmo
+        bairro conhecido nos dois relatos (bairro desconhecido nunca reaproveita)
+        """
+        if raw_entry.cluster_id is None:
+            return None
+        bairro = self._bairro(raw_entry)
+        own_signature = self.db.session.get(TextSignature, raw_entry.id)
+        if not bairro or own_signature is None:
+            return None
+
+        siblings = self.db.session.query(StructuredEntry, TextSignature.signature).join(
+            RawEntry, StructuredEntry.raw_text_id == RawEntry.id
+        ).join(
+            TextSignature, TextSignature.raw_id == RawEntry.id
+        ).filter(
+            RawEntry.cluster_id == raw_entry.cluster_id,
+            RawEntry.id != raw_entry.id,
+            StructuredEntry.extraction_status == 'completed',
+            StructuredEntry.bairro.isnot(None)
+        ).order_by(StructuredEntry.id).all()
+
+        for sibling, signature in siblings:
+            if normalize_text(sibling.bairro).strip() != bairro:
+                continue
+            if estimated_similarity(own_signature.signature, signature) >= self.reuse_threshold:
+                return sibling
+        return None
@@ -0,0 +1,237 @@
+"""
+Pré-extrator determinístico (regex + palavras-chave)
+Alternativa Híbrida (LLM + Regex): extrai campos triviais antes da chamada LLM
+"""
+import re
+import unicodedata
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional
+
+from config import PRE_EXTRACTION_MIN_CONFIDENCE, PRE_EXTRACTION_REQUIRED_FIELDS
+from prompts import REQUIRED_FIELDS
+
+# Telefone brasileiro: DDD + 8/9 dígitos, com ou sem +55 e separadores
+PHONE_PATTERN = re.compile(
+    r'(?<![\d+])(?:\+?\s?55[\s.-]?)?\(?([1-9][1-9])\)?[\s.-]?(9?\d{4})[\s.-]?(\d{4})(?!\d)'
+)
+
+# Datas explícitas: 18/07, 18/07/25, 18/07/2025
+DATE_PATTERN = re.compile(r'(?<![\d/])(\d{1,2})/(\d{1,2})(?:/(\d{2}|\d{4}))?(?![\d/])')
+
+# Datas relativas (texto sem acentos, minúsculo)
+RELATIVE_DAYS = [
+    (re.compile(r'\banteontem\b'), 2),
+    (re.compile(r'\bontem\b'), 1),
+    (re.compile(r'\bhoje\b'), 0),
+]
+
+# Horas explícitas: 15h, 15h30, 15:30
+TIME_PATTERN = re.compile(r'(?<![\d:/])([01]?\d|2[0-3])(?:h([0-5]\d)?\b|:([0-5]\d)(?!\d))')
+
+# Palavras-chave por tipo de demanda (texto sem acentos, minúsculo)
+DEMAND_KEYWORDS = {
+    "ARVORE": re.compile(r'\b(arvores?|galhos?|podas?|tronco|raiz(?:es)?)\b'),
+    "BUEIRO": re.compile(r'\b(bueiros?|boca de lobo|esgoto|galeria pluvial|drenagem)\b'),
+    "GRAMA": re.compile(r'\b(grama|gramado|mato|matagal|capina|rocada)\b'),
+    "ILUMINACAO": re.compile(r'\b(postes?|lampadas?|iluminacao|luminarias?|luz apagada|luz queimada)\b'),
+    "LIMPEZA": re.compile(r'\b(lixo|entulho|limpeza|varricao|coleta)\b'),
+    "SEGURANCA": re.compile(r'\b(seguranca|assaltos?|roubos?|furtos?|violencia|drogas)\b'),
+}
+
+EXPLICIT_PRIORITY_PATTERN = re.compile(r'\bprioridade\s+(alta|media|baixa)\b')
+LOW_PRIORITY_PATTERN = re.compile(r'\b(pouco urgente|nao (?:e|eh) urgente|sem urgencia)\b')
+HIGH_PRIORITY_PATTERN = re.compile(
+    r'\b(urgente|urgencia|emergencia|risco|perigo|vazamento|choque|fio caido|fios caidos)\b'
+)
+
+CONSENT_PATTERN = re.compile(
+    r'\b(quer (?:receber|atualizacao|retorno|ser avisad[oa])|pode (?:mandar|avisar|ligar)'
+    r'|(?:pediu|quer) (?:pra|para) avisar|quer que avisem)\b'
+)
+
+# Nomes exigem inicial maiúscula no texto original
+_NAME = r'[A-ZÀ-Ý][a-zà-ÿ]+(?:\s+(?:d[aeo]s?\s+)?[A-ZÀ-Ý][a-zà-ÿ]+){0,3}'
+NAME_PATTERNS = [
+    (re.compile(r'(?i:\b(?:sr|sra|seu|dona|dna)\b\.?)\s+(' + _NAME + r')'), 0.9),
+    (re.compile(r'(?i:\b(?:falei|conversei)\s+com\s+(?:o\s+|a\s+)?)(' + _NAME + r')'), 0.85),
+]
+BAIRRO_PATTERN = re.compile(r'(?i:\bbairro\s+)(' + _NAME + r')')
+
+# Campos que entram em confianca_campos (mesmos dos few-shots)
+CONFIDENCE_FIELDS = ("nome", "telefone", "bairro", "tipo_demanda")
+# Sem regra confiável para estes campos: sem LLM ficam vazios e com confiança zero (fila de revisão)
+UNRESOLVED_FIELDS = ("descricao_curta", "prioridade_percebida")
+
+# Palavras que não podem iniciar um nome capturado
+NAME_STOPWORDS = {"Rua", "Av", "Avenida", "Praça", "Praca", "Bairro", "Hoje", "Ontem", "Esquina"}
+
+
+def normalize_text(text: str) -> str:
+    """Remove acentos, unifica hífens e converte para minúsculo"""
+    text = text.replace('\u2011', '-').replace('\u2013', '-').replace('\u2010', '-')
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).lower()
+
+
+class RuleBasedPreExtractor:
+    """Extrai campos triviais (telefone, data, tipo...) sem chamar o LLM"""
+
+    def __init__(self, min_confidence: float = None, required_fields: List[str] = None):
+        self.min_confidence = PRE_EXTRACTION_MIN_CONFIDENCE if min_confidence is None else min_confidence
+        self.required_fields = required_fields or PRE_EXTRACTION_REQUIRED_FIELDS
+
+    def extract(self, raw_text: str, capture_timestamp: str = None) -> Dict[str, Any]:
+        """
+        Executa todos os extratores determinísticos
+
+        Returns:
+            {"fields": {campo: valor}, "confianca_campos": {campo: 0-1}}
+        """
+        capture = self._parse_capture(capture_timestamp)
+        original = raw_text.replace('\u2011', '-').replace('\u2013', '-')
+        normalized = normalize_text(raw_text)
+
+        fields: Dict[str, Any] = {}
+        confidences: Dict[str, float] = {}
+
+        for extractor in (self._extract_phone, self._extract_date, self._extract_time,
+                          self._extract_tipo_demanda, self._extract_prioridade,
+                          self._extract_consentimento):
+            found = extractor(normalized, capture)
+            if found:
+                field, value, confidence = found
+                fields[field] = value
+                confidences[field] = confidence
+
+        for extractor in (self._extract_nome, self._extract_bairro):
+            found = extractor(original)
+            if found:
+                field, value, confidence = found
+                fields[field] = value
+                confidences[field] = confidence
+
+        return {"fields": fields, "confianca_campos": confidences}
+
+    def confident_fields(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Retorna apenas os campos com confiança >= limiar"""
+        return {
+            field: value for field, value in result["fields"].items()
+            if result["confianca_campos"].get(field, 0) >= self.min_confidence
+        }
+
+    def is_complete(self, result: Dict[str, Any]) -> bool:
+        """True se todos os campos obrigatórios foram extraídos com confiança"""
+        confident = self.confident_fields(result)
+        return all(field in confident for field in self.required_fields)
+
+    def to_extraction(self, result: Dict[str, Any], raw_text: str) -> Dict[str, Any]:
+        """
+        Converte o resultado no formato completo de extração (mesmo do LLM),
+        usado quando a chamada LLM é dispensada
+        """
+        data = {field: None for field in REQUIRED_FIELDS}
+        data.update(result["fields"])
+        confidences = dict(result["confianca_campos"])
+
+        # Nada de valor inventado (texto truncado, prioridade BAIXA): confiança zero
+        # derruba a confiança global e a re-extração pontual pede esses campos
+        for field in UNRESOLVED_FIELDS:
+            if data.get(field) is None:
+                confidences[field] = 0.0
+        if data.get("consentimento_comunicacao") is None:
+            data["consentimento_comunicacao"] = False
+
+        data["confianca_campos"] = {
+            field: confidence for field, confidence in confidences.items()
+            if field in CONFIDENCE_FIELDS or field in UNRESOLVED_FIELDS
+        }
+        return data
+
+    def _parse_capture(self, capture_timestamp: Optional[str]) -> datetime:
+        if capture_timestamp:
+            try:
+                return datetime.fromisoformat(capture_timestamp)
+            except ValueError:
+                pass
+        return datetime.utcnow()
+
+    def _extract_phone(self, text: str, capture: datetime):
+        phones = []
+        for match in PHONE_PATTERN.finditer(text):
+            ddd, first, last = match.groups()
+            # Celular com 9 dígitos precisa começar com 9
+            if len(first) == 5 and not first.startswith('9'):
+                continue
+            phone = f"+55{ddd}{first}{last}"
+            if phone not in phones:
+                phones.append(phone)
+        if not phones:
+            return None
+        return "telefone", phones[0], 0.95 if len(phones) == 1 else 0.6
+
+    def _extract_date(self, text: str, capture: datetime):
+        for match in DATE_PATTERN.finditer(text):
+            day, month, year = match.groups()
+            if year is None:
+                year = capture.year
+            elif len(year) == 2:
+                year = 2000 + int(year)
+            try:
+                date = datetime(int(year), int(month), int(day))
+            except ValueError:
+                continue
+            return "data_contato", date.strftime('%Y-%m-%d'), 0.95
+
+        for pattern, days_ago in RELATIVE_DAYS:
+            if pattern.search(text):
+                date = capture - timedelta(days=days_ago)
+                return "data_contato", date.strftime('%Y-%m-%d'), 0.9
+        return None
+
+    def _extract_time(self, text: str, capture: datetime):
+        match = TIME_PATTERN.search(text)
+        if not match:
+            return None
+        hour, minutes_h, minutes_colon = match.groups()
+        minutes = minutes_h or minutes_colon or "00"
+        return "hora_contato", f"{int(hour):02d}:{minutes}", 0.9
+
+    def _extract_tipo_demanda(self, text: str, capture: datetime):
+        hits = {
+            tipo: len(pattern.findall(text))
+            for tipo, pattern in DEMAND_KEYWORDS.items()
+        }
+        hits = {tipo: count for tipo, count in hits.items() if count}
+        if not hits:
+            return None
+        best = max(hits, key=hits.get)
+        confidence = 0.9 if len(hits) == 1 else 0.6
+        return "tipo_demanda", best, confidence
+
+    def _extract_prioridade(self, text: str, capture: datetime):
+        match = EXPLICIT_PRIORITY_PATTERN.search(text)
+        if match:
+            return "prioridade_percebida", match.group(1).upper(), 0.95
+        if LOW_PRIORITY_PATTERN.search(text):
+            return "prioridade_percebida", "BAIXA", 0.8
+        if HIGH_PRIORITY_PATTERN.search(text):
+            return "prioridade_percebida", "ALTA", 0.8
+        return None
+
+    def _extract_consentimento(self, text: str, capture: datetime):
+        if CONSENT_PATTERN.search(text):
+            return "consentimento_comunicacao", True, 0.85
+        return None
+
+    def _extract_nome(self, text: str):
+        for pattern, confidence in NAME_PATTERNS:
+            match = pattern.search(text)
+            if match and match.group(1).split()[0] not in NAME_STOPWORDS:
+                return "nome", match.group(1), confidence
+        return None
+
+    def _extract_bairro(self, text: str):
+        match = BAIRRO_PATTERN.search(text)
+        if match:
+            return "bairro", match.group(1), 0.9
+        return None
@@ -0,0 +1,122 @@
+"""
+Fila de extração por urgência
+Pré-score barato (palavras-chave, marcadores de urgência do agente, tipo de
+demanda) + envelhecimento: relatos antigos sobem de prioridade e nunca ficam
+para trás indefinidamente
+"""
+import heapq
+import logging
+import re
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import PRIORITY_AGING_POINTS_PER_HOUR
+from metrics import QUEUE_WAIT_SECONDS
+from pre_extractor import (
+    DEMAND_KEYWORDS, EXPLICIT_PRIORITY_PATTERN, HIGH_PRIORITY_PATTERN, LOW_PRIORITY_PATTERN,
+    normalize_text,
+)
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_LEVELS = ("ALTA", "MEDIA", "BAIXA")
+
+# Só trabalho ainda não extraído envelhece
+AGING_STATUSES = (None, "pending")
+
+# Pontos base por nível (antes do envelhecimento)
+LEVEL_SCORES = {"ALTA": 100.0, "MEDIA": 50.0, "BAIXA": 10.0}
+
+# Sem palavra de urgência o tipo de demanda define o nível
+TYPE_LEVELS = {
+    "SEGURANCA": "MEDIA",
+    "BUEIRO": "MEDIA",
+    "ILUMINACAO": "MEDIA",
+    "ARVORE": "MEDIA",
+    "LIMPEZA": "BAIXA",
+    "GRAMA": "BAIXA",
+}
+
+# Marcadores que o próprio agente usa para sinalizar urgência (texto original)
+AGENT_URGENCY_MARKERS = re.compile(r'(!{2,}|🚨|⚠️|\bURGENTE\b|\bEMERG[ÊE]NCIA\b)')
+AGENT_MARKER_BONUS = 20.0
+
+def urgency_level(text: str) -> str:
+    """Nível de urgência estimado só pelo texto (ALTA/MEDIA/BAIXA)"""
+    normalized = normalize_text(text or "")
+    explicit = EXPLICIT_PRIORITY_PATTERN.search(normalized)
+    if explicit:
+        return explicit.group(1).upper()
+    if LOW_PRIORITY_PATTERN.search(normalized):
+        return "BAIXA"
+    if HIGH_PRIORITY_PATTERN.search(normalized) or AGENT_URGENCY_MARKERS.search(text or ""):
+        return "ALTA"
+    for tipo, pattern in DEMAND_KEYWORDS.items():
+        if pattern.search(normalized):
+            return TYPE_LEVELS.get(tipo, "BAIXA")
+    return "MEDIA"  # Sem pistas: não deixa texto desconhecido no fim da fila
+
+def pre_score(text: str, captured_at: datetime, now: datetime = None,
+              aging_per_hour: float = None) -> Tuple[float, str]:
+    """Pontuação (maior = primeiro) e nível de urgência do relato"""
+    now = now or datetime.utcnow()
+    aging_per_hour = PRIORITY_AGING_POINTS_PER_HOUR if aging_per_hour is None else aging_per_hour
+    level = urgency_level(text)
+    score = LEVEL_SCORES[level]
+    if AGENT_URGENCY_MARKERS.search(text or ""):
+        score += AGENT_MARKER_BONUS
+    age_hours = max((now - captured_at).total_seconds(), 0) / 3600 if captured_at else 0
+    return score + age_hours * aging_per_hour, level
+
+def prioritize(candidates: List[Any], batch_size: int, now: datetime = None) -> List[Tuple[Any, str]]:
+    """
+    Seleciona as `batch_size` pendentes mais prioritárias, em ordem de execução
+    candidates: linhas com raw_id, texto_original e timestamp_captura
+    (extraction_status opcional: fora de pending/nulo não envelhece);
+    empate favorece o relato mais antigo
+    """
+    now = now or datetime.utcnow()
+    scored = []
+    for candidate in candidates:
+        aging = None if getattr(candidate, "extraction_status", None) in AGING_STATUSES else 0
+        score, level = pre_score(candidate.texto_original, candidate.timestamp_captura, now, aging)
+        scored.append((score, -candidate.raw_id, candidate, level))
+    best = heapq.nlargest(batch_size, scored, key=lambda item: (item[0], item[1]))
+    return [(candidate, level) for _, _, candidate, level in best]
+
+class QueueLatency:
+    """Espera na fila (captura → início da extração) por nível de urgência"""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {level: [] for level in PRIORITY_LEVELS}
+
+    def record(self, level: str, captured_at: Optional[datetime], started_at: datetime = None):
+        if captured_at is None:
+            return
+        started_at = started_at or datetime.utcnow()
+        wait = max((started_at - captured_at).total_seconds(), 0)
+        self.samples[level].append(wait)
+        QUEUE_WAIT_SECONDS.observe(wait, priority=level)
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """Contagem, média e máximo (segundos) por nível com amostras"""
+        return {
+            level: {
+                "count": len(values),
+                "avg_seconds": round(sum(values) / len(values), 1),
+                "max_seconds": round(max(values), 1),
+            }
+            for level, values in self.samples.items() if values
+        }
+
+def backlog_by_priority(candidates: List[Any], now: datetime = None) -> Dict[str, Dict[str, Any]]:
+    """Pendentes e maior espera atual (segundos) por nível de urgência"""
+    now = now or datetime.utcnow()
+    backlog = {}
+    for candidate in candidates:
+        level = urgency_level(candidate.texto_original)
+        wait = max((now - candidate.timestamp_captura).total_seconds(), 0)
+        item = backlog.setdefault(level, {"pending": 0, "oldest_wait_seconds": 0.0})
+        item["pending"] += 1
+        item["oldest_wait_seconds"] = round(max(item["oldest_wait_seconds"], wait), 1)
+    return backlog
@@ -2,6 +2,12 @@
 Processador de dados - Job de associação raw→structured
 """
 from database import db, RawEntry, StructuredEntry
+from session_merge import LocationMerger, is_location_only
+from near_duplicates import NearDuplicateIndex
+from geo import GeoIndex
+from search import SearchIndex
+from config import NEAR_DUP_ENABLED
+import tracing
 from datetime import datetime
 import logging
 
@@ -12,6 +18,10 @@ class DataProcessor:
     
     def __init__(self):
         self.db = db
+        self.location_merger = LocationMerger()
+        self.duplicate_index = NearDuplicateIndex() if NEAR_DUP_ENABLED else None
+        self.geo_index = GeoIndex()
+        self.search_index = SearchIndex()
     
     def create_placeholder_entry(self, raw_entry: RawEntry) -> int:
         """
@@ -39,7 +49,9 @@ class DataProcessor:
                 'revisado': False
             }
             
-            structured_id = self.db.save_structured_entry(structured_data)
+            with tracing.span("create_placeholder", raw_id=raw_entry.id) as span:
+                structured_id = self.db.save_structured_entry(structured_data)
+                span.set_attribute("structured_id", structured_id)
             logger.info(f"Placeholder criado: raw_id={raw_entry.id} -> structured_id={structured_id}")
             
             return structured_id
@@ -48,16 +60,68 @@ class DataProcessor:
             logger.error(f"Erro ao criar placeholder para raw_id={raw_entry.id}: {e}")
             raise
     
+    @staticmethod
+    def _empty_results() -> dict:
+        return {
+            'processed': 0,
+            'errors': 0,
+            'created_ids': [],
+            'locations_merged': 0,
+            'location_only': 0,
+            'near_duplicates': 0
+        }
+    
+    def process_raw_entry(self, raw_entry: RawEntry, results: dict = None) -> int:
+        """
+        Associa uma raw_entry ao seu placeholder (localização, geo, LSH, busca)
+        Retorna o structured_id (None para localização pura)
+        """
+        results = self._empty_results() if results is None else results
+        # Localização pura: não gera placeholder nem chamada LLM,
+        # será anexada ao próximo relato do agente
+        if is_location_only(raw_entry):
+            self.db.mark_as_processed(raw_entry.id)
+            results['location_only'] += 1
+            return None
+        
+        if self.location_merger.merge_into_report(raw_entry):
+            results['locations_merged'] += 1
+        
+        # Geohash + mapa de calor (relatos com coordenadas)
+        self.geo_index.index_entry(raw_entry)
+        
+        # Indexar no LSH e agrupar com relatos quase duplicados
+        if self.duplicate_index and self.duplicate_index.index_entry(raw_entry):
+            results['near_duplicates'] += 1
+        
+        # Verificar se já existe structured_entry para esta raw
+        existing = self.db.session.query(StructuredEntry).filter(
+            StructuredEntry.raw_text_id == raw_entry.id
+        ).first()
+        
+        if existing:
+            logger.info(f"Structured entry já existe para raw_id={raw_entry.id}")
+            # Marcar como processada
+            self.db.mark_as_processed(raw_entry.id)
+            return existing.id
+        
+        # Criar placeholder
+        structured_id = self.create_placeholder_entry(raw_entry)
+        results['created_ids'].append(structured_id)
+        self.search_index.index_structured(structured_id)
+        
+        # Marcar raw_entry como processada
+        self.db.mark_as_processed(raw_entry.id)
+        
+        results['processed'] += 1
+        return structured_id
+    
     def process_unprocessed_entries(self) -> dict:
         """
         Processa todas as entradas raw não processadas
         Cria placeholders para garantir 100% de cobertura
         """
-        results = {
-            'processed': 0,
-            'errors': 0,
-            'created_ids': []
-        }
+        results = self._empty_results()
         
         try:
             # Buscar entradas não processadas
@@ -67,26 +131,7 @@ class DataProcessor:
             
             for raw_entry in unprocessed:
                 try:
-                    # Verificar se já existe structured_entry para esta raw
-                    existing = self.db.session.query(StructuredEntry).filter(
-                        StructuredEntry.raw_text_id == raw_entry.id
-                    ).first()
-                    
-                    if existing:
-                        logger.info(f"Structured entry já existe para raw_id={raw_entry.id}")
-                        # Marcar como processada
-                        self.db.mark_as_processed(raw_entry.id)
-                        continue
-                    
-                    # Criar placeholder
-                    structured_id = self.create_placeholder_entry(raw_entry)
-                    results['created_ids'].append(structured_id)
-                    
-                    # Marcar raw_entry como processada
-                    self.db.mark_as_processed(raw_entry.id)
-                    
-                    results['processed'] += 1
-                    
+                    self.process_raw_entry(raw_entry, results)
                 except Exception as e:
                     logger.error(f"Erro ao processar raw_id={raw_entry.id}: {e}")
                     results['errors'] += 1
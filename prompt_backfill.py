@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Backfill de extrações feitas com versões antigas do prompt
+Re-extrai (em segundo plano) as structured_entries cujo prompt_version difere
+de prompts.PROMPT_VERSION, num ritmo configurável e pausando enquanto houver
+fila de relatos novos. O progresso fica na tabela prompt_backfill_state:
+o job pode ser interrompido e retomado.
+Uso: python prompt_backfill.py [--rate 20] [--limit N] [--reset] [--status]
+"""
+import argparse
+import ast
+import logging
+import re
+import sys
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from sqlalchemy import func, text
+
+from backpressure import TokenBucket
+from config import BACKFILL_RATE_PER_MINUTE, BACKFILL_MAX_LIVE_PENDING
+from database import db, RawEntry, StructuredEntry
+from prompts import PROMPT_VERSION
+
+logger = logging.getLogger(__name__)
+
+STATE_TABLE = "prompt_backfill_state"
+
+# Status com extração do LLM que pode ser refeita (erros seguem o fluxo normal)
+STALE_STATUSES = ("completed", "validation_failed")
+
+# Espera enquanto a fila de relatos novos está acima do limite
+LIVE_TRAFFIC_WAIT_SECONDS = 15
+
+_PROMPT_VERSION_IN_METADATA = re.compile(r"""['"]prompt_version['"]\s*:\s*['"]([^'"]+)['"]""")
+
+def prompt_version_from_metadata(llm_metadata: Any) -> Optional[str]:
+    """Versão do prompt gravada em llm_metadata (dict, JSON ou str(dict))"""
+    if isinstance(llm_metadata, dict):
+        return llm_metadata.get("prompt_version")
+    if not llm_metadata:
+        return None
+    if isinstance(llm_metadata, str):
+        try:
+            parsed = ast.literal_eval(llm_metadata)
+            if isinstance(parsed, dict):
+                return parsed.get("prompt_version")
+        except (ValueError, SyntaxError):
+            pass
+        match = _PROMPT_VERSION_IN_METADATA.search(llm_metadata)
+        return match.group(1) if match else None
+    return None
+
+def backfill_prompt_version_column(connection) -> int:
+    """Preenche prompt_version a partir de llm_metadata (migração)"""
+    table = StructuredEntry.__table__
+    rows = connection.execute(
+        table.select().with_only_columns(table.c.id, table.c.llm_metadata)
+        .where(table.c.prompt_version.is_(None), table.c.llm_metadata.isnot(None))
+    ).all()
+    updates = [
+        {"entry_id": entry_id, "version": version}
+        for entry_id, metadata in rows
+        if (version := prompt_version_from_metadata(metadata))
+    ]
+    if updates:
+        connection.execute(
+            text("UPDATE structured_entries SET prompt_version = :version WHERE id = :entry_id"),
+            updates
+        )
+    return len(updates)
+
+class PromptBackfill:
+    """Re-extração das entradas com prompt antigo, com ritmo e checkpoint"""
+
+    def __init__(self, processor=None, rate_per_minute: float = None, max_live_pending: int = None,
+                 target_version: str = PROMPT_VERSION):
+        self.db = db
+        self.processor = processor
+        self.rate_per_minute = BACKFILL_RATE_PER_MINUTE if rate_per_minute is None else rate_per_minute
+        self.max_live_pending = BACKFILL_MAX_LIVE_PENDING if max_live_pending is None else max_live_pending
+        self.target_version = target_version
+        self.bucket = TokenBucket(self.rate_per_minute / 60.0, 1)
+
+    def _ensure_state_table(self):
+        self.db.session.execute(text(f"""
+            CREATE TABLE IF NOT EXISTS {STATE_TABLE} (
+                target_version VARCHAR(20) PRIMARY KEY,
+                last_id INTEGER NOT NULL,
+                processed INTEGER NOT NULL,
+                errors INTEGER NOT NULL,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """))
+        self.db.session.commit()
+
+    def get_state(self) -> Dict[str, Any]:
+        """Checkpoint da versão alvo (last_id = maior id já tentado)"""
+        self._ensure_state_table()
+        row = self.db.session.execute(
+            text(f"SELECT last_id, processed, errors FROM {STATE_TABLE} WHERE target_version = :version"),
+            {"version": self.target_version}
+        ).first()
+        if row is None:
+            return {"last_id": 0, "processed": 0, "errors": 0}
+        return {"last_id": row[0], "processed": row[1], "errors": row[2]}
+
+    def _save_state(self, state: Dict[str, Any]):
+        params = {"version": self.target_version, **state}
+        updated = self.db.session.execute(text(f"""
+            UPDATE {STATE_TABLE}
+            SET last_id = :last_id, processed = :processed, errors = :errors, updated_at = CURRENT_TIMESTAMP
+            WHERE target_version = :version
+        """), params)
+        if updated.rowcount == 0:
+            self.db.session.execute(text(f"""
+                INSERT INTO {STATE_TABLE} (target_version, last_id, processed, errors)
+                VALUES (:version, :last_id, :processed, :errors)
+            """), params)
+        self.db.session.commit()
+
+    def reset(self):
+        """Recomeça do início (ex: após corrigir um erro recorrente)"""
+        self._ensure_state_table()
+        self.db.session.execute(text(f"DELETE FROM {STATE_TABLE} WHERE target_version = :version"),
+                                {"version": self.target_version})
+        self.db.session.commit()
+
+    def _stale_filter(self):
+        return (
+            StructuredEntry.extraction_status.in_(STALE_STATUSES),
+            StructuredEntry.revisado == False,  # Revisão humana nunca é sobrescrita
+            (StructuredEntry.prompt_version.is_(None)) |
+            (StructuredEntry.prompt_version != self.target_version),
+        )
+
+    def remaining(self, after_id: int = 0) -> int:
+        """Entradas com prompt antigo ainda não tentadas"""
+        return self.db.session.query(func.count(StructuredEntry.id)).filter(
+            *self._stale_filter(), StructuredEntry.id > after_id
+        ).scalar()
+
+    def live_pending(self) -> int:
+        """Relatos novos aguardando extração (tráfego ao vivo tem prioridade)"""
+        return self.db.session.query(func.count(StructuredEntry.id)).filter(
+            (StructuredEntry.extraction_status.is_(None)) | (StructuredEntry.extraction_status == 'pending')
+        ).scalar()
+
+    def progress(self) -> Dict[str, Any]:
+        """Processadas, erros e restantes para a versão alvo"""
+        state = self.get_state()
+        remaining = self.remaining(state["last_id"])
+        done = state["processed"] + state["errors"]
+        return {
+            "target_version": self.target_version,
+            **state,
+            "remaining": remaining,
+            "percent": round(done / (done + remaining) * 100, 1) if done + remaining else 100.0,
+            "eta_minutes": round(remaining / self.rate_per_minute, 1) if self.rate_per_minute > 0 else None,
+        }
+
+    def _wait_for_budget(self, sleep=time.sleep):
+        """Respeita o ritmo configurado e cede lugar ao tráfego ao vivo"""
+        while self.max_live_pending >= 0 and self.live_pending() > self.max_live_pending:
+            logger.info("Backfill pausado: fila de relatos novos acima do limite")
+            self.db.session.rollback()
+            sleep(LIVE_TRAFFIC_WAIT_SECONDS)
+        while not self.bucket.try_take():
+            sleep(max(self.bucket.seconds_until_token(), 0.01))
+
+    def run(self, limit: int = None, sleep=time.sleep, on_progress=None) -> Dict[str, Any]:
+        """
+        Re-extrai entradas antigas em ordem de id até acabar (ou `limit`)
+        Cada entrada tentada avança o checkpoint, com ou sem erro; uma
+        re-extração com erro ou inválida mantém a extração anterior
+        """
+        if self.processor is None:
+            from llm_processor import LLMProcessor
+            self.processor = LLMProcessor()
+
+        state = self.get_state()
+        handled = 0
+        while limit is None or handled < limit:
+            entry = self.db.session.query(StructuredEntry).filter(
+                *self._stale_filter(), StructuredEntry.id > state["last_id"]
+            ).order_by(StructuredEntry.id).first()
+            if entry is None:
+                break
+
+            self._wait_for_budget(sleep)
+            raw_entry = self.db.session.get(RawEntry, entry.raw_text_id)
+            result = self.processor.reprocess_entry(raw_entry)
+
+            state["last_id"] = entry.id
+            state["processed" if result.get("success") else "errors"] += 1
+            self._save_state(state)
+            handled += 1
+            if on_progress:
+                on_progress(self.progress())
+
+        return self.progress()
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill de extrações com prompt antigo")
+    parser.add_argument("--rate", type=float, default=BACKFILL_RATE_PER_MINUTE, help="Re-extrações por minuto")
+    parser.add_argument("--limit", type=int, help="Máximo de entradas nesta execução")
+    parser.add_argument("--reset", action="store_true", help="Recomeça do início")
+    parser.add_argument("--status", action="store_true", help="Só mostra o progresso")
+    args = parser.parse_args()
+
+    from database import init_db
+    init_db()
+
+    print("AgenticLead - Backfill de prompt")
+    print("=" * 35)
+
+    backfill = PromptBackfill(rate_per_minute=args.rate)
+    if args.reset:
+        backfill.reset()
+    if args.status:
+        progress = backfill.progress()
+        print(f"Versão alvo: {progress['target_version']}")
+        print(f"Processadas: {progress['processed']} | Erros: {progress['errors']} | "
+              f"Restantes: {progress['remaining']} ({progress['percent']}%)")
+        return
+
+    from config import OPENAI_API_KEY
+    if not OPENAI_API_KEY:
+        print("❌ OPENAI_API_KEY não configurada!")
+        sys.exit(1)
+
+    started = datetime.now()
+
+    def report(progress):
+        print(f"[{progress['percent']:5.1f}%] {progress['processed']} ok, {progress['errors']} erros, "
+              f"{progress['remaining']} restantes (ETA {progress['eta_minutes']} min)")
+
+    try:
+        final = backfill.run(limit=args.limit, on_progress=report)
+    except KeyboardInterrupt:
+        print("\n⏸️ Interrompido - execute novamente para retomar")
+        return
+    elapsed = (datetime.now() - started).total_seconds()
+    print(f"\n✅ Concluído em {elapsed:.0f}s - restantes: {final['remaining']}")
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,12 @@
 """
-Prompts para extração LLM - Versão 1.0
+Prompts para extração LLM - Versão 1.1
 E3-S1: Definir prompt v1 (single) com instruções & few-shots
 """
 from datetime import datetime
 from typing import Dict, Any
 
-# Versão do prompt para controle
-PROMPT_VERSION = "v1.0"
+# Versão do prompt para controle (v1.1: prompt reduzido e re-extração por campo)
+PROMPT_VERSION = "v1.1"
 
 # Prompt do sistema
 SYSTEM_PROMPT = """Você é um extrator de dados especializado em demandas públicas. 
@@ -153,6 +153,81 @@ Referência temporal: {capture_timestamp}
 
 Responda APENAS com JSON válido seguindo o mesmo formato dos exemplos:"""
 
+def build_reduced_prompt(raw_text: str, known_fields: Dict[str, Any],
+                         capture_timestamp: str = None) -> str:
+    """
+    Constrói prompt reduzido (sem few-shots) pedindo apenas os campos
+    que a pré-extração por regras não encontrou com confiança
+    """
+    if not capture_timestamp:
+        capture_timestamp = datetime.utcnow().isoformat()
+
+    missing_fields = [
+        field for field in REQUIRED_FIELDS
+        if field not in known_fields and field != "confianca_campos"
+    ]
+    known_text = "\n".join(f"- {field}: {value}" for field, value in known_fields.items())
+    output_fields = ",\n".join(f'  "{field}": ...' for field in missing_fields)
+
+    return f"""Texto bruto:
+\"\"\"
+{raw_text}
+\"\"\"
+
+Campos JÁ EXTRAÍDOS (não repita):
+{known_text}
+
+REGRAS:
+1. Se não houver evidência explícita de um campo, use null
+2. Data/hora: referência {capture_timestamp}
+3. tipo_demanda: ARVORE, BUEIRO, GRAMA, ILUMINACAO, LIMPEZA, SEGURANCA, OUTRO
+4. prioridade_percebida: ALTA, MEDIA ou BAIXA
+5. consentimento_comunicacao: true SOMENTE se texto indicar
+6. descricao_curta: máximo 120 caracteres
+
+Responda APENAS com JSON contendo os campos faltantes:
+{{
+{output_fields},
+  "confianca_campos": {{"campo": 0.0-1.0}}
+}}"""
+
+# Regra de cada campo para a re-extração pontual (prompt mínimo)
+FIELD_RULES = {
+    "data_contato": "data do contato YYYY-MM-DD (\"hoje\"/\"ontem\" relativos à referência)",
+    "hora_contato": "hora do contato HH:MM",
+    "nome": "nome do cidadão (sem títulos como Sr/Dona)",
+    "telefone": "apenas dígitos; brasileiro sem DDI recebe +55",
+    "bairro": "nome do bairro citado no texto",
+    "referencia_local": "rua, esquina ou ponto de referência",
+    "tipo_demanda": "ARVORE, BUEIRO, GRAMA, ILUMINACAO, LIMPEZA, SEGURANCA ou OUTRO",
+    "descricao_curta": "resumo objetivo, máximo 120 caracteres",
+    "prioridade_percebida": "ALTA, MEDIA ou BAIXA",
+    "consentimento_comunicacao": "true SOMENTE se o texto indicar que quer ser avisado",
+}
+
+def build_field_prompt(raw_text: str, fields: list, capture_timestamp: str = None) -> str:
+    """
+    Constrói prompt mínimo pedindo só os campos indicados
+    (re-extração de campos com baixa confiança)
+    """
+    if not capture_timestamp:
+        capture_timestamp = datetime.utcnow().isoformat()
+
+    rules = "\n".join(f"- {field}: {FIELD_RULES[field]}" for field in fields)
+    output_fields = ", ".join(f'"{field}": ...' for field in fields)
+
+    return f"""Texto bruto:
+\"\"\"
+{raw_text}
+\"\"\"
+
+Referência temporal: {capture_timestamp}
+Extraia SOMENTE estes campos (null se não houver evidência explícita):
+{rules}
+
+Responda APENAS com JSON:
+{{{output_fields}, "confianca_campos": {{"campo": 0.0-1.0}}}}"""
+
 # Prompt para correção de JSON inválido
 REFORMAT_PROMPT = """O JSON anterior está inválido. Corrija e retorne SOMENTE o JSON válido, sem explicações:
 
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Re-extração pontual de campos com baixa confiança
+Pede ao LLM só os campos fracos (prompt mínimo) e aplica no registro existente
+Uso: python reextract_fields.py [--limit 50] [--threshold 0.75]
+     python reextract_fields.py --id 123 --fields bairro,nome
+"""
+import argparse
+import sys
+
+from config import CONFIDENCE_THRESHOLD, OPENAI_API_KEY
+from database import db, init_db, StructuredEntry
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-extração de campos com baixa confiança")
+    parser.add_argument("--limit", type=int, default=50, help="Máximo de entradas da fila de revisão")
+    parser.add_argument("--threshold", type=float, default=CONFIDENCE_THRESHOLD, help="Limiar de confiança")
+    parser.add_argument("--id", type=int, help="Re-extrai apenas esta structured_entry")
+    parser.add_argument("--fields", help="Campos a re-extrair (com --id), separados por vírgula")
+    args = parser.parse_args()
+
+    if not OPENAI_API_KEY:
+        print("❌ OPENAI_API_KEY não configurada!")
+        sys.exit(1)
+
+    init_db()
+    from llm_processor import LLMProcessor
+    processor = LLMProcessor()
+
+    print("AgenticLead - Re-extração de campos")
+    print("=" * 40)
+
+    if args.id:
+        entry = db.session.get(StructuredEntry, args.id)
+        if entry is None:
+            print(f"❌ Structured entry {args.id} não encontrada")
+            sys.exit(1)
+        fields = [field.strip() for field in args.fields.split(",")] if args.fields else None
+        result = processor.reextract_fields(entry, fields=fields, threshold=args.threshold)
+        if not result["success"]:
+            print(f"❌ Erro: {result.get('error')}")
+            sys.exit(1)
+        print(f"Campos pedidos: {result.get('requested', [])}")
+        print(f"Campos atualizados: {result['updated']}")
+        return
+
+    results = processor.reextract_review_queue(limit=args.limit, threshold=args.threshold)
+    print(f"Entradas com campos fracos: {results['checked']}")
+    print(f"Entradas atualizadas: {results['updated_entries']} ({results['updated_fields']} campos)")
+    print(f"Erros: {results['errors']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""
+Registro versionado de migrações do schema
+Consolida os scripts migrate_*.py em migrações ordenadas, aplicadas uma única
+vez no deploy (python schema_migrations.py). O runtime só lê a versão atual.
+"""
+import logging
+from typing import Callable, List, Tuple
+
+from sqlalchemy import inspect, text
+
+from database import (Base, GeoHeatmapCell, LshBucket, RawEntry, StructuredEntry, TelegramMessage, TextSignature,
+                      rebuild_message_keys)
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION_TABLE = "schema_version"
+
+# Lock consultivo do PostgreSQL (evita dois deploys migrando ao mesmo tempo)
+MIGRATION_LOCK_ID = 7314001
+
+def _add_column(connection, column, default_sql: str = None):
+    """Adiciona a coluna do modelo se ainda não existir (sem engolir erros)"""
+    table = column.table.name
+    existing = {c['name'] for c in inspect(connection).get_columns(table)}
+    if column.name in existing:
+        return False
+
+    column_type = column.type.compile(dialect=connection.dialect)
+    ddl = f"ALTER TABLE {table} ADD COLUMN {column.name} {column_type}"
+    if default_sql is not None:
+        ddl += f" DEFAULT {default_sql}"
+    connection.execute(text(ddl))
+    return True
+
+def _baseline(connection):
+    """Tabelas base (raw_entries, structured_entries)"""
+    Base.metadata.create_all(connection, tables=[RawEntry.__table__, StructuredEntry.__table__])
+
+def _llm_status_fields(connection):
+    """Campos de controle da extração LLM (antigo migrate_llm.py)"""
+    columns = StructuredEntry.__table__.c
+    _add_column(connection, columns.extraction_status, "'pending'")
+    _add_column(connection, columns.error_msg)
+    _add_column(connection, columns.llm_metadata)
+    _add_column(connection, columns.processing_attempts, "0")
+    _add_column(connection, columns.last_processed_at)
+
+    connection.execute(text("""
+        UPDATE structured_entries SET extraction_status = 'pending'
+        WHERE extraction_status IS NULL
+        AND (nome IS NULL AND telefone IS NULL AND tipo_demanda IS NULL)
+    """))
+    connection.execute(text("""
+        UPDATE structured_entries SET extraction_status = 'completed'
+        WHERE extraction_status IS NULL
+    """))
+
+def _consentimento_comunicacao(connection):
+    """Campo de consentimento extraído pelo LLM (usado pela API e pelo export)"""
+    _add_column(connection, StructuredEntry.__table__.c.consentimento_comunicacao)
+
+def _telegram_message_ids(connection):
+    """Relatos agrupados (antigo migrate_coalescing.py)"""
+    _add_column(connection, RawEntry.__table__.c.telegram_message_ids)
+
+def _idempotent_ingest_index(connection):
+    """Ingestão idempotente (antigo migrate_idempotent_ingest.py)"""
+    duplicate_raw_ids = """
+        SELECT r.id FROM raw_entries r
+        WHERE r.telegram_message_id IS NOT NULL
+        AND r.id > (
+            SELECT MIN(r2.id) FROM raw_entries r2
+            WHERE r2.agente_id = r.agente_id
+            AND r2.telegram_message_id = r.telegram_message_id
+        )
+    """
+    connection.execute(text(f"DELETE FROM structured_entries WHERE raw_text_id IN ({duplicate_raw_ids})"))
+    connection.execute(text(f"DELETE FROM raw_entries WHERE id IN ({duplicate_raw_ids})"))
+    connection.execute(text(
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_raw_entries_agente_message "
+        "ON raw_entries (agente_id, telegram_message_id)"
+    ))
+
+def _near_duplicate_index(connection):
+    """Índice MinHash/LSH de relatos quase duplicados"""
+    _add_column(connection, RawEntry.__table__.c.cluster_id)
+    connection.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_raw_entries_cluster_id ON raw_entries (cluster_id)"
+    ))
+    Base.metadata.create_all(connection, tables=[TextSignature.__table__, LshBucket.__table__])
+
+def _geospatial_index(connection):
+    """Geohash dos relatos (busca por raio) e mapa de calor pré-calculado"""
+    from geo import rebuild_heatmap
+
+    _add_column(connection, RawEntry.__table__.c.geohash)
+    connection.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_raw_entries_geohash ON raw_entries (geohash)"
+    ))
+    Base.metadata.create_all(connection, tables=[GeoHeatmapCell.__table__])
+    rebuild_heatmap(connection)
+
+def _full_text_search(connection):
+    """Busca textual: tsvector + GIN (PostgreSQL) ou FTS5 (SQLite)"""
+    from search import create_search_structures, rebuild_search_index
+
+    create_search_structures(connection)
+    rebuild_search_index(connection)
+
+def _prompt_version(connection):
+    """Versão do prompt em coluna própria (antes só dentro de llm_metadata)"""
+    from prompt_backfill import backfill_prompt_version_column
+
+    _add_column(connection, StructuredEntry.__table__.c.prompt_version)
+    connection.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_structured_entries_prompt_version "
+        "ON structured_entries (prompt_version)"
+    ))
+    backfill_prompt_version_column(connection)
+
+def _telegram_message_keys(connection):
+    """Todas as mensagens de um relato agrupado como chave de ingestão (não só a primeira)"""
+    Base.metadata.create_all(connection, tables=[TelegramMessage.__table__])
+    rebuild_message_keys(connection)
+
+# Migrações em ordem: (versão, nome, função). Nunca reordenar ou renumerar.
+MIGRATIONS: List[Tuple[int, str, Callable]] = [
+    (1, "baseline", _baseline),
+    (2, "llm_status_fields", _llm_status_fields),
+    (3, "consentimento_comunicacao", _consentimento_comunicacao),
+    (4, "telegram_message_ids", _telegram_message_ids),
+    (5, "idempotent_ingest_index", _idempotent_ingest_index),
+    (6, "near_duplicate_index", _near_duplicate_index),
+    (7, "geospatial_index", _geospatial_index),
+    (8, "full_text_search", _full_text_search),
+    (9, "prompt_version", _prompt_version),
+    (10, "telegram_message_keys", _telegram_message_keys),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+def _ensure_version_table(connection):
+    connection.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS {SCHEMA_VERSION_TABLE} (
+            version INTEGER PRIMARY KEY,
+            name VARCHAR(100) NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """))
+
+def current_version(connection) -> int:
+    """Versão aplicada no banco (0 se o registro ainda não existe)"""
+    if not inspect(connection).has_table(SCHEMA_VERSION_TABLE):
+        return 0
+    version = connection.execute(text(f"SELECT MAX(version) FROM {SCHEMA_VERSION_TABLE}")).scalar()
+    return version or 0
+
+def apply_migrations(engine, target: int = None) -> List[int]:
+    """
+    Aplica as migrações pendentes, cada uma em sua própria transação
+
+    Returns:
+        Versões aplicadas nesta execução
+    """
+    target = LATEST_VERSION if target is None else target
+    applied = []
+
+    is_postgres = engine.dialect.name == "postgresql"
+    lock_connection = engine.connect() if is_postgres else None
+    if lock_connection is not None:
+        lock_connection.execute(text("SELECT pg_advisory_lock(:id)"), {"id": MIGRATION_LOCK_ID})
+    try:
+        with engine.begin() as connection:
+            _ensure_version_table(connection)
+
+        for version, name, migration in MIGRATIONS:
+            if version > target:
+                break
+            with engine.begin() as connection:
+                if version <= current_version(connection):
+                    continue
+                logger.info(f"Aplicando migração {version}: {name}")
+                migration(connection)
+                connection.execute(
+                    text(f"INSERT INTO {SCHEMA_VERSION_TABLE} (version, name) VALUES (:version, :name)"),
+                    {"version": version, "name": name}
+                )
+            applied.append(version)
+    finally:
+        if lock_connection is not None:
+            lock_connection.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": MIGRATION_LOCK_ID})
+            lock_connection.close()
+
+    if applied:
+        # Conexões do pool abertas antes do DDL podem manter o schema antigo em cache (SQLite)
+        engine.dispose()
+
+    return applied
+
+def main():
+    from database import DatabaseManager
+
+    print("AgenticLead - Migrações de schema")
+    print("=" * 35)
+
+    manager = DatabaseManager(init_schema=False)
+    with manager.engine.connect() as connection:
+        before = current_version(connection)
+    print(f"Versão atual: {before} (última: {LATEST_VERSION})")
+
+    applied = apply_migrations(manager.engine)
+    for version, name, _ in MIGRATIONS:
+        if version in applied:
+            print(f"  [OK] {version}: {name}")
+    if not applied:
+        print("  [SKIP] Schema já está atualizado")
+
+    print("\nMigrações concluídas!")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""
+Busca textual nos relatos (texto_original, descricao_curta, referencia_local,
+nome, bairro)
+PostgreSQL: tsvector + índice GIN com stemming português e unaccent
+SQLite: tabela virtual FTS5 (remove_diacritics) com busca por prefixo
+O documento de cada structured_entry é atualizado a cada extração
+"""
+import logging
+import re
+from typing import Any, Dict, List
+
+from sqlalchemy import Integer, column, text
+
+from database import db
+
+logger = logging.getLogger(__name__)
+
+SEARCH_TABLE = "search_documents"
+
+# Configuração com unaccent (criada na migração); sem permissão usa 'portuguese'
+PG_SEARCH_CONFIG = "pt_unaccent"
+PG_FALLBACK_CONFIG = "portuguese"
+
+_TOKEN = re.compile(r'\w+', re.UNICODE)
+
+# Configuração de busca por banco (URL): pg_ts_config consultado uma vez
+_pg_configs: Dict[str, str] = {}
+
+DOCUMENT_QUERY = """
+    SELECT s.id, r.id, r.texto_original, s.descricao_curta, s.referencia_local, s.nome, s.bairro
+    FROM structured_entries s JOIN raw_entries r ON s.raw_text_id = r.id
+"""
+
+def _dialect(executor) -> str:
+    """Dialeto de uma Connection ou Session"""
+    bind = executor.get_bind() if hasattr(executor, "get_bind") else executor
+    return bind.dialect.name
+
+def _document_content(row) -> str:
+    return "\n".join(value for value in row[2:] if value)
+
+def _url_key(executor) -> str:
+    bind = executor.get_bind() if hasattr(executor, "get_bind") else executor
+    return str(getattr(bind, "engine", bind).url)
+
+def _pg_config(executor) -> str:
+    key = _url_key(executor)
+    config = _pg_configs.get(key)
+    if config is None:
+        exists = executor.execute(
+            text("SELECT 1 FROM pg_ts_config WHERE cfgname = :name"), {"name": PG_SEARCH_CONFIG}
+        ).scalar()
+        config = _pg_configs[key] = PG_SEARCH_CONFIG if exists else PG_FALLBACK_CONFIG
+    return config
+
+def create_search_structures(connection):
+    """Cria a tabela de documentos e o índice (GIN no PostgreSQL, FTS5 no SQLite)"""
+    if _dialect(connection) == "postgresql":
+        # A configuração pode passar a existir agora: consulta de novo no próximo uso
+        _pg_configs.pop(_url_key(connection), None)
+        # unaccent exige permissão de criar extensão: falha não impede a busca
+        savepoint = connection.begin_nested()
+        try:
+            connection.execute(text("CREATE EXTENSION IF NOT EXISTS unaccent"))
+            connection.execute(text(f"""
+                DO $$ BEGIN
+                    IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = '{PG_SEARCH_CONFIG}') THEN
+                        CREATE TEXT SEARCH CONFIGURATION {PG_SEARCH_CONFIG} (COPY = portuguese);
+                        ALTER TEXT SEARCH CONFIGURATION {PG_SEARCH_CONFIG}
+                            ALTER MAPPING FOR hword, hword_part, word WITH unaccent, portuguese_stem;
+                    END IF;
+                END $$
+            """))
+            savepoint.commit()
+        except Exception as e:
+            savepoint.rollback()
+            logger.warning(f"unaccent indisponível, usando configuração '{PG_FALLBACK_CONFIG}': {e}")
+
+        connection.execute(text(f"""
+            CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} (
+                structured_id INTEGER PRIMARY KEY REFERENCES structured_entries(id) ON DELETE CASCADE,
+                raw_id INTEGER NOT NULL,
+                content TEXT NOT NULL,
+                document TSVECTOR NOT NULL
+            )
+        """))
+        connection.execute(text(
+            f"CREATE INDEX IF NOT EXISTS ix_{SEARCH_TABLE}_document ON {SEARCH_TABLE} USING GIN (document)"
+        ))
+    else:
+        connection.execute(text(f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5(
+                content, raw_id UNINDEXED, tokenize = 'unicode61 remove_diacritics 2'
+            )
+        """))
+
+def _write_document(executor, row):
+    structured_id, raw_id, content = row[0], row[1], _document_content(row)
+    params = {"structured_id": structured_id, "raw_id": raw_id, "content": content}
+
+    if _dialect(executor) == "postgresql":
+        config = _pg_config(executor)
+        executor.execute(text(f"""
+            INSERT INTO {SEARCH_TABLE} (structured_id, raw_id, content, document)
+            VALUES (:structured_id, :raw_id, :content, to_tsvector('{config}', :content))
+            ON CONFLICT (structured_id) DO UPDATE
+            SET content = EXCLUDED.content, document = EXCLUDED.document
+        """), params)
+    else:
+        executor.execute(text(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = :structured_id"), params)
+        executor.execute(text(
+            f"INSERT INTO {SEARCH_TABLE} (rowid, content, raw_id) VALUES (:structured_id, :content, :raw_id)"
+        ), params)
+
+def rebuild_search_index(connection) -> int:
+    """Reindexa todas as structured_entries (migração/backfill)"""
+    connection.execute(text(f"DELETE FROM {SEARCH_TABLE}"))
+    rows = connection.execute(text(DOCUMENT_QUERY)).all()
+    for row in rows:
+        _write_document(connection, row)
+    return len(rows)
+
+def build_fts5_query(query: str) -> str:
+    """Termos do usuário → consulta FTS5 (AND de prefixos, sem operadores)"""
+    return " ".join(f'"{token}"*' for token in _TOKEN.findall(query))
+
+class SearchIndex:
+    """Índice de busca textual mantido incrementalmente"""
+
+    def __init__(self):
+        self.db = db
+
+    def index_structured(self, structured_id: int):
+        """Atualiza o documento de busca de uma structured_entry"""
+        try:
+            row = self.db.session.execute(
+                text(DOCUMENT_QUERY + " WHERE s.id = :id"), {"id": structured_id}
+            ).first()
+            if row is None:
+                return
+            _write_document(self.db.session, row)
+            self.db.session.commit()
+        except Exception as e:
+            # Busca desatualizada não pode derrubar o processamento
+            self.db.session.rollback()
+            logger.warning(f"Erro ao indexar structured {structured_id} na busca: {e}")
+
+    def match_subquery(self, query: str):
+        """
+        SELECT dos structured_id que casam com a busca, sem limite
+        (para filtrar listagens com IN no próprio banco)
+        """
+        query = (query or "").strip()
+        if _dialect(self.db.session) == "postgresql":
+            config = _pg_config(self.db.session)
+            statement = text(
+                f"SELECT structured_id FROM {SEARCH_TABLE} "
+                f"WHERE document @@ websearch_to_tsquery('{config}', :search_query)"
+            ).bindparams(search_query=query)
+        else:
+            # Consulta sem termos (só pontuação) não casa com nada
+            statement = text(
+                f"SELECT rowid AS structured_id FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH :search_query"
+            ).bindparams(search_query=build_fts5_query(query) or '""')
+        return statement.columns(column("structured_id", Integer))
+
+    def search_ids(self, query: str, limit: int = 200) -> List[int]:
+        """IDs de structured_entries que casam com a busca, por relevância"""
+        return [item["structured_id"] for item in self.search(query, limit)]
+
+    def search(self, query: str, limit: int = 50) -> List[Dict[str, Any]]:
+        """Resultados com trecho destacado, por relevância"""
+        query = (query or "").strip()
+        if not query:
+            return []
+
+        if _dialect(self.db.session) == "postgresql":
+            config = _pg_config(self.db.session)
+            rows = self.db.session.execute(text(f"""
+                SELECT structured_id, raw_id,
+                       ts_headline('{config}', content, q, 'MaxFragments=1, MaxWords=20, MinWords=5') AS snippet,
+                       ts_rank(document, q) AS rank
+                FROM {SEARCH_TABLE}, websearch_to_tsquery('{config}', :query) q
+                WHERE document @@ q
+                ORDER BY rank DESC, structured_id DESC
+                LIMIT :limit
+            """), {"query": query, "limit": limit}).all()
+        else:
+            fts_query = build_fts5_query(query)
+            if not fts_query:
+                return []
+            rows = self.db.session.execute(text(f"""
+                SELECT rowid, raw_id,
+                       snippet({SEARCH_TABLE}, 0, '<b>', '</b>', '...', 12) AS snippet,
+                       -bm25({SEARCH_TABLE}) AS rank
+                FROM {SEARCH_TABLE}
+                WHERE {SEARCH_TABLE} MATCH :query
+                ORDER BY rank DESC, rowid DESC
+                LIMIT :limit
+            """), {"query": fts_query, "limit": limit}).all()
+
+        return [
+            {"structured_id": row[0], "raw_id": int(row[1]), "snippet": row[2], "rank": round(float(row[3]), 4)}
+            for row in rows
+        ]
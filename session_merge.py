@@ -0,0 +1,69 @@
+"""
+Sessão do agente: anexa a localização compartilhada ao próximo relato em texto
+Localizações puras nunca passam pelo LLM
+"""
+import logging
+from datetime import timedelta
+from typing import Optional
+from database import db, RawEntry
+from config import LOCATION_MERGE_WINDOW_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Prefixo do texto salvo pelo bot para mensagens de localização
+LOCATION_TEXT_PREFIX = "LOCALIZAÇÃO:"
+
+def build_location_text(latitude: float, longitude: float) -> str:
+    """Texto gravado na raw_entry de uma localização compartilhada"""
+    return f"{LOCATION_TEXT_PREFIX} Latitude {latitude}, Longitude {longitude}"
+
+def is_location_only(raw_entry: RawEntry) -> bool:
+    """True se a raw_entry é apenas uma localização (sem relato)"""
+    return (
+        (raw_entry.texto_original or "").startswith(LOCATION_TEXT_PREFIX)
+        and raw_entry.latitude is not None
+    )
+
+class LocationMerger:
+    """Junta localizações ao relato seguinte do mesmo agente dentro da janela"""
+    
+    def __init__(self, window_seconds: int = None):
+        self.db = db
+        self.window_seconds = LOCATION_MERGE_WINDOW_SECONDS if window_seconds is None else window_seconds
+    
+    def find_location_for_report(self, raw_entry: RawEntry) -> Optional[RawEntry]:
+        """
+        Localização pura imediatamente anterior ao relato, do mesmo agente e
+        dentro da janela. Se houver outro relato no meio, a localização
+        pertence a ele.
+        """
+        window_start = raw_entry.timestamp_captura - timedelta(seconds=self.window_seconds)
+        
+        previous = self.db.session.query(RawEntry).filter(
+            RawEntry.agente_id == raw_entry.agente_id,
+            RawEntry.id < raw_entry.id,
+            RawEntry.timestamp_captura >= window_start
+        ).order_by(RawEntry.id.desc()).first()
+        
+        if previous is not None and is_location_only(previous):
+            return previous
+        return None
+    
+    def merge_into_report(self, raw_entry: RawEntry) -> Optional[int]:
+        """
+        Preenche latitude/longitude do relato com a localização anterior
+        Retorna o id da localização usada (ou None)
+        """
+        if raw_entry.latitude is not None or is_location_only(raw_entry):
+            return None
+        
+        location = self.find_location_for_report(raw_entry)
+        if not location:
+            return None
+        
+        raw_entry.latitude = location.latitude
+        raw_entry.longitude = location.longitude
+        self.db.session.commit()
+        
+        logger.info(f"Localização raw_id={location.id} anexada ao relato raw_id={raw_entry.id}")
+        return location.id
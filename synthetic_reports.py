@@ -0,0 +1,146 @@
+"""
+Gerador de relatos sintéticos de campo (português informal, como chegam pelo bot)
+Cada relato vem com os valores esperados para a extração, para benchmarks e
+testes de carga com LLM simulado. Determinístico para a mesma semente.
+"""
+import random
+import unicodedata
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List
+
+from prompts import VALID_TIPOS_DEMANDA
+
+FIRST_NAMES = [
+    "Maria", "José", "Ana", "João", "Antônio", "Francisca", "Carlos", "Paulo", "Lúcia",
+    "Raimunda", "Sebastião", "Rita", "Marcos", "Fernanda", "Luiz", "Cláudia", "Pedro", "Sônia",
+]
+TITLES = ["", "", "Dona ", "Seu ", "Sr. ", "Sra. "]
+BAIRROS = [
+    "Centro", "Vila Nova", "Jardim América", "São José", "Boa Vista", "Santa Luzia",
+    "Parque Industrial", "Vila Esperança", "Jardim das Flores", "Cidade Nova", "Alto da Serra",
+]
+REFERENCIAS = [
+    "perto da padaria", "em frente à escola municipal", "na esquina com a Rua 7",
+    "atrás do posto de saúde", "do lado do mercadinho", "na praça da igreja", "no ponto de ônibus",
+]
+
+# Frases por tipo de demanda (tipos válidos de prompts.VALID_TIPOS_DEMANDA)
+DEMANDAS = {
+    "ARVORE": ["árvore caída bloqueando a calçada", "galho grande quase caindo na fiação",
+               "pediu poda da árvore que tá entortando o muro"],
+    "BUEIRO": ["bueiro entupido, água parada há dias", "boca de lobo sem tampa",
+               "esgoto voltando pelo bueiro quando chove"],
+    "GRAMA": ["mato alto no terreno baldio", "grama da praça sem corte faz meses",
+              "capim tomando conta da calçada"],
+    "ILUMINACAO": ["poste apagado a rua toda escura", "lâmpada do poste piscando",
+                   "falta iluminação perto do ponto de ônibus"],
+    "LIMPEZA": ["lixo acumulado na esquina", "entulho jogado na calçada",
+                "coleta de lixo não passa faz uma semana"],
+    "SEGURANCA": ["assaltos frequentes à noite", "moradores com medo, pedem ronda",
+                  "carro abandonado suspeito na rua"],
+    "OUTRO": ["pediu informação sobre o posto de saúde", "reclamou do ônibus que atrasa",
+              "quer saber do cadastro do programa social"],
+}
+URGENCY = {
+    "ALTA": ["URGENTE", "risco de acidente", "criança quase se machucou", "muito grave"],
+    "MEDIA": ["", "tá incomodando", "pede pra ver logo"],
+    "BAIXA": ["sem pressa", "quando der", ""],
+}
+CONSENT = ["autorizou contato", "pode ligar pra ela", "aceita receber retorno", "não quer ser contatado"]
+OPENERS = ["Falei com", "Visitei", "Conversei com", "Atendi", "Passei na casa de", ""]
+SLANG = {" você": " vc", " também": " tb", " que ": " q ", " para ": " pra ", " está": " tá"}
+
+def _strip_accents(text: str) -> str:
+    return "".join(c for c in unicodedata.normalize("NFD", text) if unicodedata.category(c) != "Mn")
+
+class SyntheticReportGenerator:
+    """Relatos variados: nome, telefone, bairro, referência, urgência, consentimento e ruído de digitação"""
+
+    def __init__(self, seed: int = None, start: datetime = None, location_only_rate: float = 0.02):
+        self.random = random.Random(seed)
+        self.start = start or datetime(2025, 1, 6, 8, 0)
+        self.location_only_rate = location_only_rate
+        self._count = 0
+
+    def _phone(self) -> str:
+        ddd = self.random.choice(["11", "21", "31", "41", "51", "61", "71", "81", "85"])
+        number = f"9{self.random.randint(1000, 9999)}{self.random.randint(1000, 9999)}"
+        style = self.random.randint(0, 3)
+        if style == 0:
+            return f"({ddd}) {number[:5]}-{number[5:]}"
+        if style == 1:
+            return f"{ddd} {number[:5]} {number[5:]}"
+        if style == 2:
+            return f"{ddd}{number}"
+        return f"{number[:5]}-{number[5:]}"
+
+    def _noise(self, text: str) -> str:
+        """Digitação apressada: sem acento, abreviações, minúsculas"""
+        if self.random.random() < 0.3:
+            text = _strip_accents(text)
+        if self.random.random() < 0.4:
+            for full, short in SLANG.items():
+                text = text.replace(full, short)
+        if self.random.random() < 0.2:
+            text = text.lower()
+        return text
+
+    def report(self) -> Dict[str, Any]:
+        """Um relato com texto, agente, horário de captura e valores esperados"""
+        self._count += 1
+        rng = self.random
+        captured = self.start + timedelta(minutes=self._count * rng.uniform(0.5, 3))
+        agente_id = f"agente_{rng.randint(1, 40)}"
+
+        if rng.random() < self.location_only_rate:
+            return {"texto": "📍 Localização compartilhada", "agente_id": agente_id,
+                    "timestamp_captura": captured, "location_only": True, "expected": {}}
+
+        tipo = rng.choice(VALID_TIPOS_DEMANDA)
+        prioridade = rng.choices(["ALTA", "MEDIA", "BAIXA"], weights=[2, 5, 3])[0]
+        nome = rng.choice(FIRST_NAMES) if rng.random() < 0.85 else None
+        telefone = self._phone() if rng.random() < 0.6 else None
+        bairro = rng.choice(BAIRROS) if rng.random() < 0.9 else None
+        referencia = rng.choice(REFERENCIAS) if rng.random() < 0.5 else None
+        consentimento = rng.choice(CONSENT) if rng.random() < 0.4 else None
+        hora = f"{rng.randint(7, 18):02d}:{rng.choice(['00', '15', '30', '45'])}" if rng.random() < 0.3 else None
+
+        parts = []
+        opener = rng.choice(OPENERS)
+        if nome:
+            parts.append(f"{opener} {rng.choice(TITLES)}{nome}".strip())
+        if bairro:
+            parts.append(f"no bairro {bairro}" if rng.random() < 0.6 else bairro)
+        if referencia:
+            parts.append(referencia)
+        parts.append(rng.choice(DEMANDAS[tipo]))
+        urgency = rng.choice(URGENCY[prioridade])
+        if urgency:
+            parts.append(urgency)
+        if hora:
+            parts.append(f"às {hora.replace(':', 'h')}")
+        if telefone:
+            parts.append(f"tel {telefone}" if rng.random() < 0.5 else telefone)
+        if consentimento:
+            parts.append(consentimento)
+
+        texto = self._noise(", ".join(parts))
+        return {
+            "texto": texto,
+            "agente_id": agente_id,
+            "timestamp_captura": captured,
+            "location_only": False,
+            "expected": {
+                "nome": nome, "telefone": telefone, "bairro": bairro, "referencia_local": referencia,
+                "tipo_demanda": tipo, "prioridade_percebida": prioridade, "hora_contato": hora,
+                "consentimento_comunicacao": (None if consentimento is None
+                                              else not consentimento.startswith("não")),
+            },
+        }
+
+    def reports(self, count: int) -> Iterator[Dict[str, Any]]:
+        for _ in range(count):
+            yield self.report()
+
+    def texts(self, count: int) -> List[str]:
+        return [report["texto"] for report in self.reports(count)]
@@ -5,8 +5,14 @@ Versão com melhor tratamento de erros e logs detalhados
 import logging
 from telegram import Update
 from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes
-from database import db
-from config import TELEGRAM_BOT_TOKEN
+from database import db, init_db
+from config import TELEGRAM_BOT_TOKEN, TELEGRAM_WEBHOOK_URL, LOCATION_MERGE_WINDOW_SECONDS, METRICS_PORT
+from session_merge import build_location_text
+from coalescer import ReportCoalescer, join_fragments
+from backpressure import FairScheduler, PipelineRunner
+from loop_monitor import EventLoopStallMonitor
+from export_worker import get_export_worker
+import tracing
 import asyncio
 import traceback
 from datetime import datetime
@@ -25,8 +31,27 @@ logger = logging.getLogger(__name__)
 class AgenticLeadBotFixed:
     """Bot do Telegram com processamento automático melhorado"""
     
-    def __init__(self):
-        self.application = Application.builder().token(TELEGRAM_BOT_TOKEN).build()
+    def __init__(self, concurrent_updates: int = 1):
+        self.application = (
+            Application.builder()
+            .token(TELEGRAM_BOT_TOKEN)
+            .concurrent_updates(concurrent_updates)
+            .post_init(self._on_startup)
+            .post_stop(self._flush_pending_reports)
+            .post_shutdown(self._on_shutdown)
+            .build()
+        )
+        # Mede travamentos do event loop (trabalho síncrono bloqueando conversas)
+        self.loop_monitor = EventLoopStallMonitor()
+        # Agrupa mensagens em sequência do mesmo agente em um único relato
+        self.coalescer = ReportCoalescer(on_flush=self._process_report)
+        # Limita extrações simultâneas e reveza a fila entre agentes:
+        # cada job extrai só o próprio relato
+        self.scheduler = FairScheduler()
+        # Exportação dos arquivos: uma por vez, pedidos dos relatos concluídos agrupados
+        self.exports = PipelineRunner(self._export_files)
+        # Pipeline global do /process (todo o backlog): uma execução por vez
+        self.pipeline = PipelineRunner(self._process_backlog)
         self.setup_handlers()
     
     def setup_handlers(self):
@@ -114,6 +139,8 @@ Sou um assistente para captura de demandas públicas com IA.
             from auto_processor import AutoProcessor
             processor = AutoProcessor()
             global_stats = processor.get_summary_stats()
+            loop_stats = self.loop_monitor.get_stats()
+            queue_stats = self.scheduler.get_stats()
             
             stats_message = f"""
 📊 **Suas Estatísticas**
@@ -126,6 +153,8 @@ Sou um assistente para captura de demandas públicas com IA.
 🌍 **Sistema global:**
 📊 Total no sistema: {global_stats.get('entries', {}).get('total_raw', 0)}
 🎯 Cobertura: {global_stats.get('entries', {}).get('coverage', 0)}%
+⏱️ Maior travamento do bot: {loop_stats['max_stall_ms']} ms
+🚦 Fila: {queue_stats['in_flight']} em execução, {queue_stats['waiting']} aguardando
 
 🤖 Sistema funcionando normalmente!
             """
@@ -140,9 +169,7 @@ Sou um assistente para captura de demandas públicas com IA.
         try:
             await update.message.reply_text("🔄 Executando processamento manual...")
             
-            from auto_processor import AutoProcessor
-            processor = AutoProcessor()
-            results = await processor.process_new_entries()
+            results = await self.pipeline.request()
             
             if results["success"]:
                 await update.message.reply_text(
@@ -160,89 +187,155 @@ Sou um assistente para captura de demandas públicas com IA.
             await update.message.reply_text("❌ Erro no processamento manual.")
     
     async def handle_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Handler principal para mensagens de texto - VERSÃO MELHORADA"""
+        """Handler principal para mensagens de texto - agrupa fragmentos do agente"""
+        with tracing.span("handle_message", agente_id=str(update.effective_user.id),
+                          message_id=update.message.message_id):
+            try:
+                user_id = str(update.effective_user.id)
+                username = update.effective_user.username or "N/A"
+                message_text = update.message.text
+                
+                # Redelivery do Telegram: rejeitada antes de qualquer processamento
+                if db.recent_messages.seen(user_id, update.message.message_id):
+                    logger.info(f"Mensagem {update.message.message_id} de {user_id} já ingerida - ignorada")
+                    return
+                
+                logger.info(f"Fragmento de {username} ({user_id}): {message_text[:50]}...")
+                
+                # O relato é liberado após o período de silêncio do agente
+                await self.coalescer.add(
+                    agente_id=user_id,
+                    text=message_text,
+                    message_id=update.message.message_id,
+                    context=update
+                )
+                
+            except Exception as e:
+                logger.error(f"ERRO TOTAL na mensagem: {e}")
+                logger.error(f"Traceback: {traceback.format_exc()}")
+                await update.message.reply_text(
+                    f"❌ Erro crítico ao processar mensagem.\n"
+                    f"🔧 Use /process para tentar processamento manual."
+                )
+    
+    async def _process_report(self, user_id: str, fragments: list):
+        """Salva o relato (um ou mais fragmentos) e executa o pipeline uma vez"""
         processing_start = datetime.now()
+        update = fragments[-1]["context"]
         
-        try:
-            user_id = str(update.effective_user.id)
-            username = update.effective_user.username or "N/A"
-            message_text = update.message.text
-            message_id = update.message.message_id
-            
-            logger.info(f"INICIO - Mensagem de {username} ({user_id}): {message_text[:50]}...")
-            
-            # Passo 1: Salvar no banco
-            logger.info("PASSO 1: Salvando no banco...")
-            raw_id = db.save_raw_entry(
-                agente_id=user_id,
-                texto=message_text,
-                message_id=message_id
-            )
-            logger.info(f"PASSO 1: Raw entry {raw_id} salva com sucesso")
-            
-            # Passo 2: Confirmar recebimento
-            await update.message.reply_text(
-                f"✅ Registro #{raw_id} salvo!\n"
-                f"🤖 Processando com IA...\n"
-                f"⏳ Aguarde..."
-            )
-            
-            # Passo 3: Processamento automático COM LOGS DETALHADOS
-            logger.info("PASSO 2: Iniciando processamento automático...")
-            
+        with tracing.span("process_report", new_trace=True, agente_id=user_id,
+                          fragments=len(fragments)) as report_span:
             try:
-                from auto_processor import AutoProcessor
-                processor = AutoProcessor()
+                message_text = join_fragments(fragments)
+                message_ids = [f["message_id"] for f in fragments]
                 
-                logger.info("PASSO 2a: AutoProcessor criado")
+                logger.info(f"INICIO - Relato de {user_id} com {len(fragments)} mensagem(ns): {message_text[:50]}...")
                 
-                # Executar pipeline completo
-                logger.info("PASSO 2b: Executando process_new_entries...")
-                results = await processor.process_new_entries()
-                logger.info(f"PASSO 2c: Processamento concluído: {results}")
-                
-                processing_time = (datetime.now() - processing_start).total_seconds()
+                # Passo 1: Salvar no banco
+                logger.info("PASSO 1: Salvando no banco...")
+                raw_id = db.save_raw_entry(
+                    agente_id=user_id,
+                    texto=message_text,
+                    message_id=message_ids[0],
+                    message_ids=message_ids if len(message_ids) > 1 else None
+                )
+                if raw_id is None:
+                    logger.info(f"PASSO 1: Mensagem {message_ids[0]} de {user_id} já ingerida - ignorada")
+                    return
+                logger.info(f"PASSO 1: Raw entry {raw_id} salva com sucesso")
+                report_span.set_attribute("raw_id", raw_id)
                 
-                if results["success"]:
-                    # Notificar sucesso
-                    success_msg = (
-                        f"🎉 Processamento concluído!\n"
-                        f"📊 {results['message']}\n"
-                        f"📁 Arquivos: agenticlead_dados.xlsx/.csv\n"
-                        f"⏱️ Tempo total: {processing_time:.2f}s"
-                    )
-                    await update.message.reply_text(success_msg)
-                    logger.info(f"SUCESSO - {results['message']} em {processing_time:.2f}s")
+                # Passo 2: Agendar o pipeline (fila justa entre agentes) e confirmar recebimento
+                grouped = f"📎 {len(fragments)} mensagens agrupadas\n" if len(fragments) > 1 else ""
+                ticket = self.scheduler.submit(
+                    user_id, lambda: self._run_pipeline(update, raw_id, processing_start)
+                )
+                if ticket["status"] == "running":
+                    status_line = "🤖 Processando com IA...\n⏳ Aguarde..."
+                elif ticket["status"] == "queued":
+                    status_line = f"⏳ Na fila de processamento (posição {ticket['position']})"
                 else:
-                    # Notificar erro
-                    error_msg = (
-                        f"⚠️ Erro no processamento automático.\n"
-                        f"📝 Dados salvos (ID #{raw_id})\n"
-                        f"🔧 Use /process para tentar novamente"
-                    )
-                    await update.message.reply_text(error_msg)
-                    logger.error(f"ERRO no processamento: {results['message']}")
+                    # Descartado da fila: fica pendente (processado=False) para o
+                    # próximo lote do /process ou do monitor, sem iniciar execução
+                    status_line = "📥 Muitos relatos seus em espera: este será processado no próximo lote."
+                await update.message.reply_text(
+                    f"✅ Registro #{raw_id} salvo!\n"
+                    f"{grouped}"
+                    f"{status_line}"
+                )
                 
-            except Exception as proc_error:
-                processing_time = (datetime.now() - processing_start).total_seconds()
-                logger.error(f"ERRO CRÍTICO no processamento: {proc_error}")
+            except Exception as e:
+                logger.error(f"ERRO TOTAL na mensagem: {e}")
                 logger.error(f"Traceback: {traceback.format_exc()}")
+                await update.message.reply_text(
+                    f"❌ Erro crítico ao processar mensagem.\n"
+                    f"🔧 Use /process para tentar processamento manual."
+                )
+    
+    async def _process_backlog(self):
+        """Uma execução do pipeline global (extração + export de todo o backlog)"""
+        with tracing.span("run_pipeline", new_trace=True):
+            from auto_processor import AutoProcessor
+            return await AutoProcessor().process_new_entries()
+    
+    async def _export_files(self):
+        """Uma exportação dos arquivos (cobre todos os relatos concluídos até aqui)"""
+        from auto_processor import AutoProcessor
+        return await AutoProcessor().export()
+    
+    async def _run_pipeline(self, update: Update, raw_id: int, processing_start: datetime):
+        """Extrai só o relato do job (vez do agente na fila) e avisa o agente"""
+        # Processamento automático COM LOGS DETALHADOS
+        logger.info("PASSO 2: Iniciando processamento automático...")
+        
+        try:
+            with tracing.span("run_pipeline", new_trace=True, raw_ids=[raw_id]):
+                from auto_processor import AutoProcessor
+                
+                logger.info(f"PASSO 2b: Extraindo relato {raw_id}...")
+                results = await AutoProcessor().process_report(raw_id)
+                logger.info(f"PASSO 2c: Extração concluída: {results}")
                 
+                if results["success"]:
+                    # Export agrupado: relatos concluídos durante uma exportação saem na seguinte
+                    export_results = await self.exports.request()
+                    if export_results["errors"]:
+                        logger.error(f"Erros no export: {export_results['errors']}")
+            
+            processing_time = (datetime.now() - processing_start).total_seconds()
+            
+            if results["success"]:
+                # Notificar sucesso
+                success_msg = (
+                    f"🎉 Processamento concluído!\n"
+                    f"📊 {results['message']}\n"
+                    f"📁 Arquivos: agenticlead_dados.xlsx/.csv\n"
+                    f"⏱️ Tempo total: {processing_time:.2f}s"
+                )
+                await update.message.reply_text(success_msg)
+                logger.info(f"SUCESSO - {results['message']} em {processing_time:.2f}s")
+            else:
+                # Notificar erro
                 error_msg = (
                     f"⚠️ Erro no processamento automático.\n"
                     f"📝 Dados salvos (ID #{raw_id})\n"
-                    f"🔧 Use /process para processar manualmente\n"
-                    f"⏱️ Falhou em {processing_time:.2f}s"
+                    f"🔧 Use /process para tentar novamente"
                 )
                 await update.message.reply_text(error_msg)
+                logger.error(f"ERRO no processamento: {results['message']}")
             
-        except Exception as e:
-            logger.error(f"ERRO TOTAL na mensagem: {e}")
+        except Exception as proc_error:
+            processing_time = (datetime.now() - processing_start).total_seconds()
+            logger.error(f"ERRO CRÍTICO no processamento: {proc_error}")
             logger.error(f"Traceback: {traceback.format_exc()}")
-            await update.message.reply_text(
-                f"❌ Erro crítico ao processar mensagem.\n"
-                f"🔧 Use /process para tentar processamento manual."
+            
+            error_msg = (
+                f"⚠️ Erro no processamento automático.\n"
+                f"📝 Dados salvos (ID #{raw_id})\n"
+                f"🔧 Use /process para processar manualmente\n"
+                f"⏱️ Falhou em {processing_time:.2f}s"
             )
+            await update.message.reply_text(error_msg)
     
     async def handle_location(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handler para localização compartilhada"""
@@ -250,7 +343,7 @@ Sou um assistente para captura de demandas públicas com IA.
             location = update.message.location
             user_id = str(update.effective_user.id)
             
-            location_text = f"LOCALIZAÇÃO: Latitude {location.latitude}, Longitude {location.longitude}"
+            location_text = build_location_text(location.latitude, location.longitude)
             
             raw_id = db.save_raw_entry(
                 agente_id=user_id,
@@ -260,16 +353,38 @@ Sou um assistente para captura de demandas públicas com IA.
                 lon=location.longitude
             )
             
+            if raw_id is None:
+                logger.info(f"Localização {update.message.message_id} de {user_id} já ingerida - ignorada")
+                return
+            
             await update.message.reply_text(
                 f"📍 Localização #{raw_id} recebida!\n"
                 f"🗺️ Lat: {location.latitude:.6f}, Lon: {location.longitude:.6f}\n"
-                f"💬 Envie agora a descrição do problema."
+                f"💬 Envie a descrição do problema nos próximos "
+                f"{LOCATION_MERGE_WINDOW_SECONDS // 60} min para anexar a localização."
             )
             
         except Exception as e:
             logger.error(f"Erro ao processar localização: {e}")
             await update.message.reply_text("❌ Erro ao processar localização.")
     
+    async def _on_startup(self, application: Application):
+        """Inicia o monitor do event loop"""
+        self.loop_monitor.start()
+    
+    async def _on_shutdown(self, application: Application):
+        """Para o monitor e encerra o processo de exportação"""
+        await self.loop_monitor.stop()
+        get_export_worker().shutdown()
+        logger.info(f"Event loop - estatísticas finais: {self.loop_monitor.get_stats()}")
+    
+    async def _flush_pending_reports(self, application: Application):
+        """Processa relatos ainda no buffer (e na fila) antes de desligar"""
+        await self.coalescer.flush_all()
+        await self.scheduler.drain()
+        await self.exports.drain()
+        await self.pipeline.drain()
+    
     async def error_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handler global para erros"""
         logger.error(f"ERRO GLOBAL: {context.error}")
@@ -277,11 +392,21 @@ Sou um assistente para captura de demandas públicas com IA.
         logger.error(f"Traceback: {traceback.format_exc()}")
     
     def run(self):
-        """Inicia o bot"""
+        """Inicia o bot (polling); em modo webhook os updates chegam pelo web app"""
+        if TELEGRAM_WEBHOOK_URL:
+            logger.error(
+                "TELEGRAM_WEBHOOK_URL configurada: updates são recebidos pelo web app "
+                "(telegram_webhook.py). Polling não iniciado."
+            )
+            return
         logger.info("🤖 Iniciando AgenticLead Bot v2.0 (FIXED)...")
+        if METRICS_PORT:
+            from metrics import start_metrics_server
+            start_metrics_server(METRICS_PORT)
         self.application.add_error_handler(self.error_handler)
         self.application.run_polling()
 
 if __name__ == "__main__":
+    init_db()
     bot = AgenticLeadBotFixed()
     bot.run()
\ No newline at end of file
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Recebimento de updates do Telegram por webhook, servido junto com o web app
+O endpoint valida o segredo (X-Telegram-Bot-Api-Secret-Token), enfileira o
+update e responde na hora; cada processo web mantém a Application do bot num
+event loop próprio, que processa os updates em paralelo (concurrent_updates).
+Várias réplicas podem ficar atrás do balanceador: a ingestão é idempotente
+por telegram_message_id.
+Uso: python telegram_webhook.py set|delete|info
+"""
+import asyncio
+import hmac
+import logging
+import sys
+import threading
+from typing import Any, Dict
+
+from flask import Blueprint, jsonify, request
+
+from config import (
+    TELEGRAM_BOT_TOKEN, TELEGRAM_WEBHOOK_URL, TELEGRAM_WEBHOOK_PATH, TELEGRAM_WEBHOOK_SECRET,
+    TELEGRAM_WEBHOOK_WORKERS, TELEGRAM_WEBHOOK_MAX_CONNECTIONS,
+)
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+# Tempo máximo para iniciar/parar a Application do bot
+LIFECYCLE_TIMEOUT_SECONDS = 30
+
+class WebhookDispatcher:
+    """Application do bot rodando num event loop em thread separada"""
+
+    def __init__(self, application, on_startup=None, on_shutdown=None):
+        self.application = application
+        self.on_startup = on_startup
+        self.on_shutdown = on_shutdown
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._run_loop, name="telegram-webhook", daemon=True)
+        self.started = False
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def _run(self, coroutine):
+        future = asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+        return future.result(timeout=LIFECYCLE_TIMEOUT_SECONDS)
+
+    async def _start(self):
+        await self.application.initialize()
+        if self.on_startup:
+            await self.on_startup(self.application)
+        await self.application.start()
+
+    async def _stop(self):
+        await self.application.stop()
+        if self.on_shutdown:
+            await self.on_shutdown(self.application)
+        await self.application.shutdown()
+
+    def start(self):
+        """Inicia o loop e a Application (sem polling: updates vêm do submit)"""
+        if self.started:
+            return
+        self.thread.start()
+        self._run(self._start())
+        self.started = True
+        logger.info("Dispatcher do webhook iniciado")
+
+    def stop(self):
+        """Processa o que estiver pendente e encerra a Application"""
+        if not self.started:
+            return
+        try:
+            self._run(self._stop())
+        except Exception as e:
+            logger.error(f"Erro ao encerrar dispatcher do webhook: {e}")
+        finally:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join(timeout=LIFECYCLE_TIMEOUT_SECONDS)
+            self.started = False
+
+    def submit(self, payload: Dict[str, Any]):
+        """Enfileira o update sem esperar o processamento"""
+        from telegram import Update
+        update = Update.de_json(payload, self.application.bot)
+        asyncio.run_coroutine_threadsafe(self.application.update_queue.put(update), self.loop)
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+def get_dispatcher() -> WebhookDispatcher:
+    """Dispatcher do processo atual (criado no primeiro update, depois do fork)"""
+    global _dispatcher
+    if _dispatcher is None:
+        with _dispatcher_lock:
+            if _dispatcher is None:
+                from telegram_bot_fixed import AgenticLeadBotFixed
+                bot = AgenticLeadBotFixed(concurrent_updates=TELEGRAM_WEBHOOK_WORKERS)
+                bot.application.add_error_handler(bot.error_handler)
+
+                async def on_shutdown(application):
+                    await bot._flush_pending_reports(application)
+                    await bot._on_shutdown(application)
+
+                dispatcher = WebhookDispatcher(bot.application, bot._on_startup, on_shutdown)
+                dispatcher.start()
+                _dispatcher = dispatcher
+    return _dispatcher
+
+def shutdown_dispatcher():
+    """Encerra o dispatcher do processo (se existir)"""
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is not None:
+            _dispatcher.stop()
+            _dispatcher = None
+
+def is_valid_secret(received: str) -> bool:
+    """Compara o cabeçalho com o segredo configurado (tempo constante)"""
+    if not TELEGRAM_WEBHOOK_SECRET or not received:
+        return False
+    return hmac.compare_digest(received.encode("utf-8"), TELEGRAM_WEBHOOK_SECRET.encode("utf-8"))
+
+webhook_blueprint = Blueprint("telegram_webhook", __name__)
+
+@webhook_blueprint.route(TELEGRAM_WEBHOOK_PATH, methods=["POST"])
+def telegram_webhook():
+    """Recebe um update do Telegram e confirma imediatamente"""
+    if not TELEGRAM_WEBHOOK_SECRET:
+        return jsonify({"error": "Webhook desativado"}), 404
+    if not is_valid_secret(request.headers.get(SECRET_HEADER, "")):
+        logger.warning(f"Webhook com segredo inválido de {request.remote_addr}")
+        return jsonify({"error": "Segredo inválido"}), 403
+
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict) or "update_id" not in payload:
+        return jsonify({"error": "Update inválido"}), 400
+
+    try:
+        get_dispatcher().submit(payload)
+    except Exception as e:
+        # 5xx faz o Telegram reenviar o update mais tarde
+        logger.error(f"Erro ao enfileirar update {payload.get('update_id')}: {e}")
+        return jsonify({"error": "Indisponível"}), 503
+    return jsonify({"ok": True})
+
+async def _manage_webhook(action: str):
+    from telegram import Bot
+    async with Bot(TELEGRAM_BOT_TOKEN) as bot:
+        if action == "set":
+            url = TELEGRAM_WEBHOOK_URL + TELEGRAM_WEBHOOK_PATH
+            await bot.set_webhook(
+                url=url,
+                secret_token=TELEGRAM_WEBHOOK_SECRET,
+                max_connections=TELEGRAM_WEBHOOK_MAX_CONNECTIONS,
+                allowed_updates=["message"],
+            )
+            print(f"✅ Webhook registrado: {url}")
+        elif action == "delete":
+            await bot.delete_webhook()
+            print("✅ Webhook removido (use polling)")
+        info = await bot.get_webhook_info()
+        print(f"URL: {info.url or '-'}")
+        print(f"Pendentes: {info.pending_update_count}")
+        print(f"Conexões máximas: {info.max_connections}")
+        if info.last_error_message:
+            print(f"Último erro: {info.last_error_message}")
+
+def main():
+    action = sys.argv[1] if len(sys.argv) > 1 else "info"
+    if action not in ("set", "delete", "info"):
+        print("Uso: python telegram_webhook.py set|delete|info")
+        sys.exit(1)
+    if action == "set" and not (TELEGRAM_WEBHOOK_URL and TELEGRAM_WEBHOOK_SECRET):
+        print("❌ TELEGRAM_WEBHOOK_URL e TELEGRAM_WEBHOOK_SECRET são obrigatórios!")
+        sys.exit(1)
+    asyncio.run(_manage_webhook(action))
+
+if __name__ == "__main__":
+    main()
@@ -97,4 +97,31 @@ def main():
     asyncio.run(test_automatic_flow())
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
+def test_relato_agendado_extrai_so_o_proprio(monkeypatch, tmp_path):
+    """process_report: placeholder + extração apenas do relato do job"""
+    import auto_processor
+    import database
+    from database import DatabaseManager, StructuredEntry
+
+    manager = DatabaseManager(f"sqlite:///{tmp_path / 'report.db'}")
+    monkeypatch.setattr(database, "db_manager", manager)
+    other_id = manager.save_raw_entry("a1", "grama alta na praça", message_id=1)
+    raw_id = manager.save_raw_entry("a2", "bueiro entupido no Centro", message_id=2)
+
+    extracted = []
+
+    class FakeLLMProcessor:
+        db = manager
+
+        def process_single_entry(self, raw_entry):
+            extracted.append(raw_entry.id)
+            return {"success": True, "raw_id": raw_entry.id, "extraction_status": "completed"}
+
+    monkeypatch.setattr(auto_processor, "LLMProcessor", FakeLLMProcessor)
+    processor = AutoProcessor()
+    result = asyncio.run(processor.process_report(raw_id))
+
+    assert result["success"] and extracted == [raw_id]
+    assert manager.session.query(StructuredEntry).filter_by(raw_text_id=raw_id).count() == 1
+    assert manager.session.query(StructuredEntry).filter_by(raw_text_id=other_id).count() == 0
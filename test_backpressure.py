@@ -0,0 +1,170 @@
+"""
+Testes do controle de carga do bot (token bucket + fila justa)
+"""
+import asyncio
+from types import SimpleNamespace
+
+from backpressure import FairScheduler, PipelineRunner, TokenBucket
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_token_bucket_reabastece_com_o_tempo():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=0.5, capacity=2, clock=clock)
+
+    assert bucket.try_take() and bucket.try_take()
+    assert not bucket.try_take()
+    assert bucket.seconds_until_token() == 2.0
+
+    clock.now = 2.0
+    assert bucket.try_take()
+
+def test_fila_round_robin_entre_agentes():
+    """Agente com rajada não passa na frente dos outros"""
+    order = []
+
+    async def scenario():
+        release = asyncio.Event()
+        scheduler = FairScheduler(max_in_flight=1, rate_per_minute=6000, burst=100, max_queued_per_agent=50)
+
+        def job(name):
+            async def run():
+                order.append(name)
+                await release.wait()
+            return run
+
+        assert scheduler.submit("pesado", job("p1"))["status"] == "running"
+        for index in range(2, 6):
+            ticket = scheduler.submit("pesado", job(f"p{index}"))
+        assert ticket == {"status": "queued", "position": 4}
+
+        ticket = scheduler.submit("leve", job("l1"))
+        assert ticket == {"status": "queued", "position": 2}
+
+        release.set()
+        await scheduler.drain()
+
+    asyncio.run(scenario())
+    assert order == ["p1", "p2", "l1", "p3", "p4", "p5"]
+
+def test_limite_por_agente_e_descarte():
+    started = []
+
+    async def scenario():
+        scheduler = FairScheduler(max_in_flight=10, rate_per_minute=60, burst=1, max_queued_per_agent=2)
+
+        async def job():
+            started.append(asyncio.get_running_loop().time())
+
+        results = [scheduler.submit("a1", job)["status"] for _ in range(4)]
+        assert results == ["running", "queued", "queued", "shed"]
+        assert scheduler.get_stats()["shed"] == 1
+
+        # Sem ficha o próximo job só sai depois do reabastecimento (~1 s)
+        await asyncio.sleep(0.1)
+        assert len(started) == 1
+        await scheduler.drain()
+
+    asyncio.run(scenario())
+    assert len(started) == 3
+
+def test_pipeline_global_um_por_vez_com_pedidos_agrupados():
+    """Pedidos durante uma execução viram uma única execução seguinte"""
+    runs = []
+
+    async def scenario():
+        release = asyncio.Event()
+        active = []
+
+        async def pipeline():
+            active.append(1)
+            assert len(active) == 1  # Nunca duas execuções ao mesmo tempo
+            runs.append(len(runs) + 1)
+            await release.wait()
+            active.pop()
+            return runs[-1]
+
+        runner = PipelineRunner(pipeline)
+        first = runner.request()
+        await asyncio.sleep(0)
+        followers = [runner.request() for _ in range(3)]
+        # Relato adiado (shed): ninguém aguarda, mas a execução seguinte acontece
+        runner.request()
+
+        assert runner.get_stats() == {"running": True, "pending": True, "runs": 1, "coalesced": 3}
+        release.set()
+        assert await first == 1
+        assert await asyncio.gather(*followers) == [2, 2, 2]
+        await runner.drain()
+        assert not runner.running
+
+    asyncio.run(scenario())
+    assert runs == [1, 2]
+
+def test_falha_do_pipeline_chega_a_quem_aguarda():
+    async def scenario():
+        async def pipeline():
+            raise RuntimeError("banco fora do ar")
+
+        runner = PipelineRunner(pipeline)
+        runner.request()  # Ninguém aguarda: sem aviso de exceção perdida
+        waiting = runner.request()
+        try:
+            await waiting
+        except RuntimeError as e:
+            return str(e)
+
+    assert asyncio.run(scenario()) == "banco fora do ar"
+
+def test_agente_pesado_nao_toma_a_extracao(monkeypatch, tmp_path):
+    """Cada job extrai só o próprio relato; relato descartado não inicia execução"""
+    import auto_processor
+    import database
+    from database import DatabaseManager
+    from telegram_bot_fixed import AgenticLeadBotFixed
+
+    monkeypatch.setattr(database, "db_manager", DatabaseManager(f"sqlite:///{tmp_path / 'bot.db'}"))
+    extracted, exports = [], []
+
+    class FakeAutoProcessor:
+        async def process_report(self, raw_id):
+            extracted.append(raw_id)
+            await asyncio.sleep(0)
+            return {"success": True, "raw_id": raw_id, "message": "ok"}
+
+    async def export_files():
+        exports.append(len(extracted))
+        return {"errors": []}
+
+    monkeypatch.setattr(auto_processor, "AutoProcessor", FakeAutoProcessor)
+
+    class Message:
+        def __init__(self, message_id):
+            self.message_id = message_id
+
+        async def reply_text(self, text):
+            pass
+
+    def fragments(message_id):
+        return [{"text": f"relato {message_id}", "message_id": message_id,
+                 "context": SimpleNamespace(message=Message(message_id))}]
+
+    async def scenario():
+        bot = AgenticLeadBotFixed.__new__(AgenticLeadBotFixed)
+        bot.scheduler = FairScheduler(max_in_flight=1, rate_per_minute=6000, burst=100, max_queued_per_agent=3)
+        bot.exports = PipelineRunner(export_files)
+        for message_id in range(1, 9):
+            await bot._process_report("pesado", fragments(message_id))
+        await bot._process_report("leve", fragments(100))
+        await bot.scheduler.drain()
+        await bot.exports.drain()
+
+    asyncio.run(scenario())
+    # 1 executando + 3 na fila do pesado; os outros 4 ficam para o próximo lote
+    assert extracted == [1, 2, 9, 3, 4]
+    assert exports and exports[-1] == len(extracted)
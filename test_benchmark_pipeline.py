@@ -0,0 +1,34 @@
+"""
+Testes do gerador de relatos sintéticos e do benchmark do pipeline
+"""
+from benchmark_pipeline import compare_with_baselines, run_scenario, save_baselines, load_baselines
+from prompts import VALID_TIPOS_DEMANDA
+from synthetic_reports import SyntheticReportGenerator
+
+def test_gerador_deterministico_e_realista():
+    first = list(SyntheticReportGenerator(seed=7).reports(50))
+    second = list(SyntheticReportGenerator(seed=7).reports(50))
+    assert [report["texto"] for report in first] == [report["texto"] for report in second]
+
+    reports = [report for report in first if not report["location_only"]]
+    assert all(report["expected"]["tipo_demanda"] in VALID_TIPOS_DEMANDA for report in reports)
+    assert len({report["texto"] for report in reports}) == len(reports)
+    with_name = next(report for report in reports if report["expected"]["nome"])
+    assert with_name["expected"]["nome"].lower()[:3] in with_name["texto"].lower()
+
+def test_cenario_pequeno_e_comparacao(tmp_path):
+    results = run_scenario("sqlite", rows=30, batch=8, workdir=str(tmp_path))
+
+    assert set(results) == {"bulk_load", "ingest", "placeholders", "extraction", "export", "dashboard"}
+    assert results["placeholders"]["per_second"] > 0
+    assert results["extraction"]["per_second"] > 0
+    assert (tmp_path / "bench.csv").exists()
+
+    baseline_file = str(tmp_path / "baselines.json")
+    save_baselines({"sqlite/30": results}, baseline_file)
+    baselines = load_baselines(baseline_file)
+    assert compare_with_baselines({"sqlite/30": results}, baselines) == []
+
+    slower = {"sqlite/30": {"export": {"seconds": results["export"]["seconds"] * 2 + 1}}}
+    regressions = compare_with_baselines(slower, baselines, tolerance=0.25)
+    assert [item["stage"] for item in regressions] == ["export"]
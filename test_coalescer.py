@@ -0,0 +1,77 @@
+"""
+Testes do agrupamento de mensagens por agente
+"""
+import asyncio
+from coalescer import ReportCoalescer, join_fragments
+
+def _run(coro):
+    return asyncio.run(coro)
+
+def test_agrupa_fragmentos_em_sequencia():
+    """Fragmentos dentro do período de silêncio viram um único relato"""
+    flushed = []
+
+    async def on_flush(agente_id, fragments):
+        flushed.append((agente_id, join_fragments(fragments), [f["message_id"] for f in fragments]))
+
+    async def scenario():
+        coalescer = ReportCoalescer(on_flush, quiet_seconds=0.05, max_wait_seconds=5, max_fragments=10)
+        await coalescer.add("a1", "falei com Maria", 1)
+        await coalescer.add("a1", "bueiro entupido", 2)
+        await coalescer.add("a2", "poste apagado", 7)
+        await coalescer.add("a1", "tel 11 99999-8888", 3)
+        await asyncio.sleep(0.2)
+
+    _run(scenario())
+    assert sorted(flushed) == [
+        ("a1", "falei com Maria\nbueiro entupido\ntel 11 99999-8888", [1, 2, 3]),
+        ("a2", "poste apagado", [7]),
+    ]
+
+def test_limite_de_fragmentos_libera_imediatamente():
+    """Ao atingir max_fragments o relato é liberado sem esperar o silêncio"""
+    flushed = []
+
+    async def on_flush(agente_id, fragments):
+        flushed.append(len(fragments))
+
+    async def scenario():
+        coalescer = ReportCoalescer(on_flush, quiet_seconds=10, max_wait_seconds=60, max_fragments=2)
+        await coalescer.add("a1", "parte 1", 1)
+        await coalescer.add("a1", "parte 2", 2)
+        await asyncio.sleep(0.05)
+        assert coalescer.pending_agents() == 0
+
+    _run(scenario())
+    assert flushed == [2]
+
+def test_mensagem_repetida_ignorada_e_flush_all():
+    """Redelivery do mesmo message_id não duplica o fragmento"""
+    flushed = []
+
+    async def on_flush(agente_id, fragments):
+        flushed.append([f["message_id"] for f in fragments])
+
+    async def scenario():
+        coalescer = ReportCoalescer(on_flush, quiet_seconds=10, max_wait_seconds=60, max_fragments=10)
+        await coalescer.add("a1", "parte 1", 1)
+        await coalescer.add("a1", "parte 1", 1)
+        await coalescer.flush_all()
+
+    _run(scenario())
+    assert flushed == [[1]]
+
+def test_desligado_processa_cada_mensagem():
+    """quiet_seconds=0 mantém um relato por mensagem"""
+    flushed = []
+
+    async def on_flush(agente_id, fragments):
+        flushed.append(fragments[0]["text"])
+
+    async def scenario():
+        coalescer = ReportCoalescer(on_flush, quiet_seconds=0)
+        await coalescer.add("a1", "um", 1)
+        await coalescer.add("a1", "dois", 2)
+
+    _run(scenario())
+    assert flushed == ["um", "dois"]
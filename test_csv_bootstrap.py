@@ -0,0 +1,83 @@
+"""
+Testes da carga inicial do CSV com checksum
+"""
+import shutil
+
+from sqlalchemy import create_engine, event, text
+
+from csv_bootstrap import CsvBootstrapLoader
+from search import SEARCH_TABLE
+from schema_migrations import apply_migrations
+
+def _engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'bootstrap.db'}")
+    apply_migrations(engine)
+    return engine
+
+def _counts(engine):
+    with engine.connect() as connection:
+        return (
+            connection.execute(text("SELECT COUNT(*) FROM raw_entries")).scalar(),
+            connection.execute(text("SELECT COUNT(*) FROM structured_entries")).scalar(),
+        )
+
+def test_csv_carregado_uma_vez_por_checksum(tmp_path):
+    """Segundo deploy com o mesmo arquivo pula; arquivo alterado recarrega"""
+    csv_path = tmp_path / "agenticlead_dados.csv"
+    shutil.copy("agenticlead_dados.csv", csv_path)
+    engine = _engine(tmp_path)
+    loader = CsvBootstrapLoader(engine, str(csv_path))
+
+    first = loader.load()
+    assert first["status"] == "loaded"
+    raw_count, structured_count = _counts(engine)
+    assert structured_count == first["rows"] > 0
+    assert raw_count > 0
+
+    assert loader.load()["status"] == "skipped"
+
+    with open(csv_path) as source:
+        lines = source.read().splitlines(keepends=True)
+    with open(csv_path, "w") as target:
+        target.writelines(lines[:3])
+
+    assert loader.load()["status"] == "loaded"
+    assert _counts(engine) == (2, 2)
+
+def test_csv_preserva_campos_e_status(tmp_path):
+    csv_path = tmp_path / "agenticlead_dados.csv"
+    shutil.copy("agenticlead_dados.csv", csv_path)
+    engine = _engine(tmp_path)
+    CsvBootstrapLoader(engine, str(csv_path)).load()
+
+    with engine.connect() as connection:
+        row = connection.execute(text(
+            "SELECT nome, telefone, consentimento_comunicacao, extraction_status, revisado "
+            "FROM structured_entries WHERE id = 1"
+        )).one()
+    assert tuple(row) == ("Maria Silva", "+5511999998888", 1, "completed", 0)
+
+def test_recarga_substitui_indices_derivados(tmp_path):
+    """Com chaves estrangeiras ativas, a recarga limpa e recria busca e assinaturas"""
+    csv_path = tmp_path / "agenticlead_dados.csv"
+    shutil.copy("agenticlead_dados.csv", csv_path)
+    engine = _engine(tmp_path)
+    # SQLite só aplica as FKs com o pragma (o PostgreSQL sempre aplica)
+    event.listen(engine, "connect", lambda dbapi_connection, _: dbapi_connection.execute("PRAGMA foreign_keys=ON"))
+    engine.dispose()
+    loader = CsvBootstrapLoader(engine, str(csv_path))
+
+    first = loader.load()
+    assert first["indexed"]["search_documents"] == first["rows"]
+    assert first["indexed"]["text_signatures"] > 0
+
+    with open(csv_path) as source:
+        lines = source.read().splitlines(keepends=True)
+    with open(csv_path, "w") as target:
+        target.writelines(lines[:3])
+
+    second = loader.load()
+    assert second["status"] == "loaded"
+    with engine.connect() as connection:
+        assert connection.execute(text(f"SELECT COUNT(*) FROM {SEARCH_TABLE}")).scalar() == 2
+        assert connection.execute(text("SELECT COUNT(*) FROM text_signatures")).scalar() == 2
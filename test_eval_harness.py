@@ -0,0 +1,63 @@
+"""
+Testes da avaliação offline de variantes
+"""
+import json
+
+from database import DatabaseManager, StructuredEntry
+from eval_harness import EvalHarness, load_golden_dataset, normalize_value, parse_variants
+from llm_extractor import LLMExtractor
+
+def _answer(bairro):
+    return json.dumps({
+        "data_contato": "2025-01-10", "hora_contato": None, "nome": "Maria", "telefone": "(11) 98888-7777",
+        "bairro": bairro, "referencia_local": None, "tipo_demanda": "BUEIRO",
+        "descricao_curta": "Bueiro entupido", "prioridade_percebida": "MEDIA",
+        "consentimento_comunicacao": None,
+        "confianca_campos": {"nome": 0.9, "bairro": 0.9, "tipo_demanda": 0.9},
+    })
+
+def _factory(fake_openai, answers):
+    def build(variant, stats):
+        extractor = LLMExtractor(api_key="sk-test", model=variant["model"],
+                                 cascade_models=variant["cascade"], stats=stats)
+        fake_openai(extractor, answers)
+        return extractor
+    return build
+
+def test_normalizacao_e_variantes():
+    assert normalize_value("bairro", " Vila  Esperança ") == normalize_value("bairro", "vila esperanca")
+    assert normalize_value("telefone", "(11) 98888-7777") == "11988887777"
+    assert normalize_value("nome", "") is None
+
+    variants = parse_variants("a:model=gpt-4o-mini,few_shot=false;b:cascade=gpt-4o-mini|gpt-4o,pre=false")
+    assert variants[0]["model"] == "gpt-4o-mini" and variants[0]["few_shot"] is False
+    assert variants[1]["cascade"] == ["gpt-4o-mini", "gpt-4o"] and variants[1]["pre_extraction"] is False
+
+def test_compara_variantes_com_revisao(tmp_path, fake_openai):
+    manager = DatabaseManager(f"sqlite:///{tmp_path / 'eval.db'}")
+    raw_id = manager.save_raw_entry("a1", "Dona Maria, bueiro entupido no Centro, tel 11 98888-7777",
+                                    message_id=1)
+    manager.session.add(StructuredEntry(
+        raw_text_id=raw_id, data_contato="2025-01-10", nome="Maria", telefone="11988887777",
+        bairro="Centro", tipo_demanda="BUEIRO", prioridade_percebida="MEDIA", revisado=True,
+    ))
+    manager.session.commit()
+    other_id = manager.save_raw_entry("a1", "relato sem revisão", message_id=2)
+    manager.session.add(StructuredEntry(raw_text_id=other_id, revisado=False))
+    manager.session.commit()
+
+    dataset = load_golden_dataset(manager.session)
+    assert len(dataset) == 1 and dataset[0]["expected"]["bairro"] == "Centro"
+
+    harness = EvalHarness(dataset, workers=2, extractor_factory=_factory(fake_openai, {
+        "gpt-4o-mini": _answer("Centro"), "gpt-3.5-turbo": "isso não é json",
+    }))
+    good, bad = harness.run(parse_variants(
+        "mini:model=gpt-4o-mini,pre=false;velho:model=gpt-3.5-turbo,pre=false"
+    ))
+
+    assert good["field_accuracy"]["bairro"] == 1.0
+    assert good["json_failure_rate"] == 0.0
+    assert good["prompt_tokens"] == 1000 and good["cost_per_1k_reports_usd"] > 0
+    assert bad["json_failure_rate"] == 1.0
+    assert bad["field_accuracy"]["bairro"] == 0.0
@@ -0,0 +1,38 @@
+"""
+Testes do worker de exportação
+"""
+import asyncio
+
+import pandas as pd
+
+import database
+import export_worker
+from database import DatabaseManager
+from export_worker import ExportWorker
+
+def test_export_gera_xlsx_e_csv(tmp_path, monkeypatch):
+    manager = DatabaseManager(f"sqlite:///{tmp_path / 'export.db'}")
+    monkeypatch.setattr(database, "db_manager", manager)
+    raw_id = manager.save_raw_entry("a1", "Falei com Maria no Centro, bueiro entupido")
+    manager.save_structured_entry({"raw_text_id": raw_id, "nome": "Maria", "bairro": "Centro",
+                                   "tipo_demanda": "INFRAESTRUTURA"})
+
+    xlsx, csv = tmp_path / "dados.xlsx", tmp_path / "dados.csv"
+    results = asyncio.run(ExportWorker(use_process_pool=False).export(str(xlsx), str(csv)))
+
+    assert results["errors"] == []
+    assert results["rows"] == 1 and results["xlsx"] == str(xlsx) and results["csv"] == str(csv)
+    for frame in (pd.read_excel(xlsx), pd.read_csv(csv)):
+        assert frame.loc[0, "nome"] == "Maria"
+        assert frame.loc[0, "bairro"] == "Centro"
+
+def test_falha_inesperada_volta_no_resultado(monkeypatch):
+    def quebra(xlsx_filename, csv_filename):
+        raise RuntimeError("banco fora do ar")
+
+    monkeypatch.setattr(export_worker, "run_export_job", quebra)
+    results = asyncio.run(ExportWorker(use_process_pool=False).export())
+
+    assert results["xlsx"] is None and results["csv"] is None
+    assert results["errors"] == ["banco fora do ar"]
+    assert "export_time" in results
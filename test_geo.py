@@ -0,0 +1,40 @@
+"""
+Testes do índice geoespacial (geohash, busca por raio e mapa de calor)
+"""
+from collections import Counter
+
+from database import DatabaseManager, RawEntry
+from geo import HEATMAP_PRECISION, GeoIndex, covering_cells, decode_geohash, encode_geohash, haversine_meters
+
+def test_geohash_codifica_e_decodifica():
+    assert encode_geohash(57.64911, 10.40744) == "u4pruydqq"
+    latitude, longitude = decode_geohash("u4pruydqq")
+    assert haversine_meters(latitude, longitude, 57.64911, 10.40744) < 5
+
+def test_celulas_cobrem_o_raio():
+    cells = covering_cells(-23.5505, -46.6333, 300)
+    assert 0 < len(cells) <= 64
+    # Ponto a ~250 m ao norte cai numa das células
+    point = encode_geohash(-23.5505 + 250 / 111320.0, -46.6333)
+    assert any(point.startswith(cell) for cell in cells)
+
+def test_busca_por_raio_e_mapa_de_calor(tmp_path):
+    manager = DatabaseManager(f"sqlite:///{tmp_path / 'geo.db'}")
+    index = GeoIndex()
+    index.db = manager
+
+    reports = [
+        ("poste apagado", -23.5505, -46.6333),
+        ("bueiro entupido", -23.5505 + 200 / 111320.0, -46.6333),  # ~200 m
+        ("lixo na calçada", -23.5605, -46.6333),                    # ~1,1 km
+    ]
+    for message_id, (texto, latitude, longitude) in enumerate(reports, 1):
+        raw_id = manager.save_raw_entry("a1", texto, message_id=message_id, lat=latitude, lon=longitude)
+        index.index_entry(manager.session.get(RawEntry, raw_id))
+
+    nearby = index.nearby(-23.5505, -46.6333, 300)
+    assert [item["raw_id"] for item in nearby] == [1, 2]
+    assert nearby[1]["distance_m"] > 150
+
+    expected = Counter(encode_geohash(latitude, longitude)[:HEATMAP_PRECISION] for _, latitude, longitude in reports)
+    assert {cell["cell"]: cell["total"] for cell in index.heatmap()} == dict(expected)
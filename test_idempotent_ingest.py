@@ -0,0 +1,78 @@
+"""
+Testes da ingestão idempotente por (agente_id, telegram_message_id)
+"""
+import pytest
+
+from database import DatabaseManager, RawEntry, StructuredEntry, TelegramMessage
+
+def test_mensagem_repetida_nao_duplica(tmp_path):
+    """Redelivery da mesma mensagem retorna None e não cria nova raw_entry"""
+    manager = DatabaseManager(f"sqlite:///{tmp_path / 'ingest.db'}")
+    
+    first = manager.save_raw_entry("agente1", "bueiro entupido", message_id=10)
+    assert first is not None
+    
+    # Filtro em memória
+    assert manager.save_raw_entry("agente1", "bueiro entupido", message_id=10) is None
+    
+    # Reinício do bot: filtro vazio, banco rejeita pela chave da mensagem
+    manager.recent_messages = type(manager.recent_messages)()
+    assert manager.save_raw_entry("agente1", "bueiro entupido", message_id=10) is None
+    
+    # Outro agente com o mesmo message_id é outra mensagem
+    assert manager.save_raw_entry("agente2", "poste apagado", message_id=10) is not None
+    
+    assert manager.session.query(RawEntry).count() == 2
+    manager.close()
+
+def test_relato_agrupado_registra_todas_as_mensagens(tmp_path):
+    """Fragmentos de um relato agrupado também são reconhecidos como ingeridos"""
+    manager = DatabaseManager(f"sqlite:///{tmp_path / 'ingest.db'}")
+    
+    raw_id = manager.save_raw_entry("agente1", "parte 1\nparte 2", message_id=20, message_ids=[20, 21])
+    assert raw_id is not None
+    assert manager.recent_messages.seen("agente1", 21)
+    assert manager.session.get(RawEntry, raw_id).telegram_message_ids == [20, 21]
+    
+    # Entradas sem message_id nunca são deduplicadas
+    assert manager.save_raw_entry("agente1", "sem id") is not None
+    assert manager.save_raw_entry("agente1", "sem id") is not None
+    manager.close()
+
+def test_fragmento_nao_inicial_reentregue_apos_reinicio(tmp_path):
+    """Após reinício (LRU vazio), qualquer mensagem de um relato agrupado é rejeitada"""
+    url = f"sqlite:///{tmp_path / 'ingest.db'}"
+    manager = DatabaseManager(url)
+    assert manager.save_raw_entry("agente1", "parte 1\nparte 2", message_id=20, message_ids=[20, 21]) is not None
+    manager.close()
+    
+    restarted = DatabaseManager(url)
+    assert not restarted.recent_messages.seen("agente1", 21)
+    assert restarted.save_raw_entry("agente1", "parte 2", message_id=21) is None
+    assert restarted.save_raw_entry("agente1", "parte 2\nparte 3", message_id=21, message_ids=[21, 22]) is None
+    assert restarted.session.query(RawEntry).count() == 1
+    
+    # A mensagem nova do relato rejeitado continua livre
+    assert restarted.save_raw_entry("agente1", "parte 3", message_id=22) is not None
+    restarted.close()
+
+@pytest.mark.parametrize("on_conflict", [True, False])
+def test_duplicata_preserva_trabalho_pendente_da_sessao(tmp_path, monkeypatch, on_conflict):
+    """Rejeitar a mensagem repetida desfaz só a própria ingestão, não o resto da sessão"""
+    manager = DatabaseManager(f"sqlite:///{tmp_path / 'ingest.db'}")
+    assert manager.ingest_index_ready()
+    if not on_conflict:
+        monkeypatch.setattr(manager, "_dialect_insert", lambda: None)
+    raw_id = manager.save_raw_entry("agente1", "parte 1\nparte 2", message_id=20, message_ids=[20, 21])
+    
+    manager.session.add(StructuredEntry(raw_text_id=raw_id, extraction_status="pending"))
+    assert manager._insert_ignoring_duplicate({
+        "agente_id": "agente1", "texto_original": "parte 2\nparte 3",
+        "telegram_message_id": 22, "telegram_message_ids": [22, 21], "latitude": None, "longitude": None,
+    }) is None
+    manager.session.commit()
+    
+    assert manager.session.query(StructuredEntry).filter_by(raw_text_id=raw_id).count() == 1
+    assert manager.session.query(RawEntry).count() == 1
+    assert manager.session.query(TelegramMessage).count() == 2
+    manager.close()
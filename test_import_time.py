@@ -0,0 +1,46 @@
+"""
+Orçamento de tempo de import (cold start) dos entry points
+O import não pode conectar no banco nem rodar DDL
+"""
+import os
+import subprocess
+import sys
+
+import pytest
+
+ENTRY_POINTS = [
+    "api", "web_app", "exporter", "processor", "auto_processor",
+    "auto_monitor", "llm_processor", "telegram_bot_fixed",
+]
+
+# Orçamento por entry point (segundos), ajustável em máquinas lentas
+IMPORT_BUDGET_SECONDS = float(os.getenv("IMPORT_TIME_BUDGET_SECONDS", "5"))
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+SCRIPT = """
+import sys, time
+sys.path.insert(0, {repo!r})
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+import database
+assert database.db_manager is None, "banco inicializado no import"
+print(elapsed)
+"""
+
+
+@pytest.mark.parametrize("module", ENTRY_POINTS)
+def test_entry_point_import_is_lazy_and_fast(module, tmp_path):
+    env = dict(os.environ)
+    env.pop("DATABASE_URL", None)
+
+    result = subprocess.run(
+        [sys.executable, "-c", SCRIPT.format(repo=REPO_DIR, module=module)],
+        cwd=tmp_path, env=env, capture_output=True, text=True, timeout=60,
+    )
+
+    assert result.returncode == 0, result.stderr
+    elapsed = float(result.stdout.strip().splitlines()[-1])
+    print(f"{module}: {elapsed:.3f}s")
+    assert elapsed < IMPORT_BUDGET_SECONDS
@@ -0,0 +1,63 @@
+"""
+Testes da cascata de modelos (barato primeiro, escala em baixa confiança)
+"""
+import json
+
+import pytest
+
+from llm_cascade import escalation_reason, tier_stats
+from llm_extractor import LLMExtractor
+
+TEXT = "Falei com a Dona Maria, problema na rua dela"
+
+def _answer(confidence, tipo="BUEIRO"):
+    return json.dumps({
+        "data_contato": None, "hora_contato": None, "nome": "Maria", "telefone": None,
+        "bairro": "Centro", "referencia_local": None, "tipo_demanda": tipo,
+        "descricao_curta": "Bueiro entupido", "prioridade_percebida": "MEDIA",
+        "consentimento_comunicacao": None,
+        "confianca_campos": {"nome": confidence, "bairro": confidence, "tipo_demanda": confidence},
+    })
+
+@pytest.fixture
+def cascade_extractor(fake_openai):
+    def build(answers):
+        extractor = LLMExtractor(api_key="sk-test", cascade_models=["gpt-4o-mini", "gpt-4o"])
+        return extractor, fake_openai(extractor, answers)
+    return build
+
+def test_motivo_de_escalada():
+    assert escalation_reason({"issues": ["tipo_demanda inválido: X"], "confianca_global": 0.9}) == "validation_issues"
+    assert escalation_reason({"issues": [], "confianca_global": 0.4}, threshold=0.75) == "low_confidence"
+    assert escalation_reason({"issues": [], "confianca_global": 0.9}, threshold=0.75) is None
+
+def test_modelo_barato_resolve_sem_escalar(cascade_extractor):
+    tier_stats.reset()
+    extractor, completions = cascade_extractor({"gpt-4o-mini": _answer(0.9), "gpt-4o": _answer(0.95)})
+
+    data, metadata = extractor.extract_from_text(TEXT, use_pre_extraction=False)
+
+    assert completions.models == ["gpt-4o-mini"]
+    assert metadata["model_used"] == "gpt-4o-mini"
+    assert tier_stats.snapshot()["gpt-4o-mini"]["accepted"] == 1
+
+def test_escala_em_baixa_confianca_ou_validacao(cascade_extractor):
+    tier_stats.reset()
+    extractor, completions = cascade_extractor({"gpt-4o-mini": _answer(0.4), "gpt-4o": _answer(0.9)})
+
+    data, metadata = extractor.extract_from_text(TEXT, use_pre_extraction=False)
+
+    assert completions.models == ["gpt-4o-mini", "gpt-4o"]
+    assert metadata["model_used"] == "gpt-4o"
+    assert metadata["validation"]["confianca_global"] == 0.9
+    assert [tier["escalation_reason"] for tier in metadata["cascade"]] == ["low_confidence", None]
+
+    stats = tier_stats.snapshot()
+    assert stats["gpt-4o-mini"]["escalated"] == 1
+    assert stats["gpt-4o"]["accepted"] == 1
+    assert stats["gpt-4o"]["cost_usd"] > stats["gpt-4o-mini"]["cost_usd"] > 0
+
+    completions.models.clear()
+    completions.answers["gpt-4o-mini"] = _answer(0.9, tipo="BURACO")
+    extractor.extract_from_text(TEXT, use_pre_extraction=False)
+    assert completions.models == ["gpt-4o-mini", "gpt-4o"]
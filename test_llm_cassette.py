@@ -0,0 +1,47 @@
+"""
+Testes do cassete de chamadas LLM (gravação e reprodução offline)
+"""
+import json
+
+import pytest
+
+from llm_cascade import TierStats
+from llm_cassette import Cassette, CassetteMiss
+from llm_extractor import LLMExtractor
+
+TEXT = "Falei com a Dona Maria, bueiro entupido no Centro"
+ANSWER = json.dumps({
+    "nome": "Maria", "bairro": "Centro", "tipo_demanda": "BUEIRO", "prioridade_percebida": "MEDIA",
+    "confianca_campos": {"nome": 0.9, "bairro": 0.9, "tipo_demanda": 0.9},
+})
+
+def test_grava_e_reproduz_sem_rede(tmp_path, fake_openai):
+    path = str(tmp_path / "cassette" / "llm.jsonl.gz")
+    recorder = LLMExtractor(api_key="sk-test", cascade_models=["gpt-4o-mini"],
+                            cassette=Cassette(path, "record"))
+    completions = fake_openai(recorder, ANSWER, usage=(800, 90))
+    recorded, _ = recorder.extract_from_text(TEXT, capture_timestamp="2025-01-10T09:00:00",
+                                             use_pre_extraction=False)
+    assert completions.calls == 1
+
+    sleeps = []
+    stats = TierStats()
+    replayer = LLMExtractor(api_key="", cascade_models=["gpt-4o-mini"], stats=stats,
+                            cassette=Cassette(path, "replay", latency_scale=0.5, sleep=sleeps.append))
+    assert replayer.client is None
+    replayed, metadata = replayer.extract_from_text(TEXT, capture_timestamp="2025-01-10T09:00:00",
+                                                    use_pre_extraction=False)
+
+    assert replayed == recorded
+    assert metadata["model_used"] == "gpt-4o-mini"
+    assert len(sleeps) <= 1
+    assert stats.snapshot()["gpt-4o-mini"]["prompt_tokens"] == 800
+
+def test_pedido_nao_gravado(tmp_path):
+    path = str(tmp_path / "llm.jsonl")
+    Cassette(path, "record").record("gpt-4o-mini", [{"role": "user", "content": "a"}], 0, "{}", 1.2)
+    cassette = Cassette(path, "replay", latency_scale=0)
+
+    assert cassette.replay("gpt-4o-mini", [{"role": "user", "content": "a"}], 0)["content"] == "{}"
+    with pytest.raises(CassetteMiss):
+        cassette.replay("gpt-4o-mini", [{"role": "user", "content": "b"}], 0)
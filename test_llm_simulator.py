@@ -0,0 +1,39 @@
+"""
+Testes do simulador local da API OpenAI (injeção de falhas)
+"""
+
+from openai import OpenAI
+
+from llm_cascade import TierStats
+from llm_extractor import LLMExtractor
+from llm_simulator import FaultProfile, LLMSimulator, start_simulator
+
+def test_desfechos_injetados():
+    sleeps = []
+    simulator = LLMSimulator(FaultProfile(latency_median=0.5, tail_rate=1.0, tail_seconds=20), sleep=sleeps.append)
+    status, _, body = simulator.handle({"model": "gpt-4o-mini"})
+    assert status == 200 and sleeps == [20]
+    assert body["usage"]["prompt_tokens"] > 0
+    assert simulator.stats["tail"] == 1
+
+    limited = LLMSimulator(FaultProfile(rate_limit_rate=1.0), sleep=sleeps.append)
+    status, headers, _ = limited.handle({"model": "gpt-4o-mini"})
+    assert status == 429 and headers["x-ratelimit-remaining-requests"] == "0"
+    assert int(headers["retry-after"]) >= 1
+
+    broken = LLMSimulator(FaultProfile(latency_median=0.01, malformed_rate=1.0), sleep=sleeps.append)
+    status, _, body = broken.handle({"model": "gpt-4o-mini"})
+    assert status == 200 and broken.stats["malformed"] == 1
+
+def test_extrator_contra_servidor_local():
+    server, simulator, base_url = start_simulator(FaultProfile(latency_median=0.01, latency_sigma=0.1, seed=3))
+    try:
+        extractor = LLMExtractor(api_key="sk-test", cascade_models=["gpt-4o-mini"], stats=TierStats())
+        extractor.client = OpenAI(api_key="sk-test", base_url=base_url, max_retries=0)
+        data, metadata = extractor.extract_from_text("Dona Maria, bueiro entupido", use_pre_extraction=False)
+    finally:
+        server.shutdown()
+
+    assert metadata["extraction_status"] == "success"
+    assert data["tipo_demanda"] is not None
+    assert simulator.stats["ok"] == 1
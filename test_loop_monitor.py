@@ -0,0 +1,30 @@
+"""
+Testes do monitor de travamentos do event loop
+"""
+import asyncio
+
+from loop_monitor import EventLoopStallMonitor
+
+def test_travamento_detectado_com_relogio_falso():
+    # Pares (antes do sleep, depois do sleep): 500 ms travado, depois 20 ms
+    times = iter([0.0, 0.5, 1.0, 1.02])
+    now = [0.0]
+
+    def clock():
+        now[0] = next(times, now[0])
+        return now[0]
+
+    monitor = EventLoopStallMonitor(interval=0, warn_threshold=0.25, clock=clock)
+
+    async def run():
+        monitor.start()
+        while monitor.samples < 3:
+            await asyncio.sleep(0)
+        await monitor.stop()
+
+    asyncio.run(run())
+
+    stats = monitor.get_stats()
+    assert stats["max_stall_ms"] == 500.0
+    assert stats["stalls_over_threshold"] == 1
+    assert stats["samples"] >= 3
@@ -0,0 +1,103 @@
+"""
+Testes das métricas no formato do Prometheus
+"""
+import os
+
+import metrics
+from database import DatabaseManager, StructuredEntry
+from llm_cascade import TierStats
+from llm_extractor import LLMExtractor
+from web_app import app
+
+def test_formato_texto_do_prometheus():
+    registry = metrics.Registry()
+    calls = metrics.Counter("x_calls", "Chamadas", ["model"], registry=registry)
+    latency = metrics.Histogram("x_seconds", "Latência", ["model"], buckets=(0.1, 1), registry=registry)
+    calls.inc(model="gpt-4o-mini")
+    calls.inc(2, model="gpt-4o-mini")
+    latency.observe(0.05, model="a")
+    latency.observe(0.5, model="a")
+
+    text = registry.render()
+    assert "# TYPE x_calls counter" in text
+    assert 'x_calls_total{model="gpt-4o-mini"} 3' in text
+    assert 'x_seconds_bucket{model="a",le="0.1"} 1' in text
+    assert 'x_seconds_bucket{model="a",le="+Inf"} 2' in text
+    assert 'x_seconds_count{model="a"} 2' in text
+
+def test_llm_e_banco_instrumentados(tmp_path, fake_openai):
+    extractor = LLMExtractor(api_key="sk-test", cascade_models=["gpt-4o-mini"], stats=TierStats())
+    fake_openai(extractor, "{}", usage=(10, 5))
+    before = metrics.LLM_REQUEST_SECONDS.count(model="gpt-4o-mini", status="ok")
+    tokens = metrics.LLM_TOKENS.value(model="gpt-4o-mini", kind="prompt")
+    extractor._call_openai([{"role": "user", "content": "oi"}], model="gpt-4o-mini")
+    assert metrics.LLM_REQUEST_SECONDS.count(model="gpt-4o-mini", status="ok") == before + 1
+    assert metrics.LLM_TOKENS.value(model="gpt-4o-mini", kind="prompt") == tokens + 10
+
+    manager = DatabaseManager(f"sqlite:///{tmp_path / 'metrics.db'}")
+    ingested = metrics.INGEST_SECONDS.count()
+    selects = metrics.DB_QUERY_SECONDS.count(operation="SELECT")
+    raw_id = manager.save_raw_entry("a1", "relato", message_id=1)
+    manager.session.add(StructuredEntry(raw_text_id=raw_id, extraction_status="pending"))
+    manager.session.commit()
+    manager.session.query(StructuredEntry).all()
+    assert metrics.INGEST_SECONDS.count() == ingested + 1
+    assert metrics.DB_QUERY_SECONDS.count(operation="SELECT") > selects
+
+def test_endpoint_metrics(monkeypatch, tmp_path):
+    import database
+    monkeypatch.setattr(database, "db_manager", DatabaseManager(f"sqlite:///{tmp_path / 'endpoint.db'}"))
+    raw_id = database.db_manager.save_raw_entry("a1", "relato", message_id=1)
+    database.db_manager.session.add(StructuredEntry(raw_text_id=raw_id, extraction_status="pending"))
+    database.db_manager.session.commit()
+
+    response = app.test_client().get("/metrics")
+
+    assert response.status_code == 200
+    assert response.mimetype == "text/plain"
+    body = response.get_data(as_text=True)
+    assert 'agenticlead_backlog{status="pending"} 1' in body
+    assert "# TYPE agenticlead_llm_request_seconds histogram" in body
+    assert "agenticlead_db_pool_checked_out" in body
+
+def test_metricas_somadas_entre_workers(monkeypatch, tmp_path):
+    """Cada worker grava o snapshot; o scrape soma todos, inclusive os encerrados"""
+    def worker_registry():
+        registry = metrics.Registry()
+        calls = metrics.Counter("x_calls", "Chamadas", ["model"], registry=registry)
+        latency = metrics.Histogram("x_seconds", "Latência", buckets=(0.1, 1), registry=registry)
+        busy = metrics.Gauge("x_busy", "Ocupado", registry=registry)
+        backlog = metrics.Gauge("x_backlog", "Backlog", registry=registry)
+        backlog.set_function(lambda: {(): 7})
+        return registry, calls, latency, busy
+
+    first, calls, latency, busy = worker_registry()
+    calls.inc(model="a")
+    latency.observe(0.05)
+    busy.set(1)
+    first.write_snapshot(str(tmp_path), pid=101)
+
+    second, calls, latency, busy = worker_registry()
+    calls.inc(2, model="a")
+    calls.inc(model="b")
+    latency.observe(0.5)
+    busy.set(1)
+    second.write_snapshot(str(tmp_path), pid=102)
+
+    text = second.render(second.collect(str(tmp_path)))
+    assert 'x_calls_total{model="a"} 3' in text
+    assert 'x_calls_total{model="b"} 1' in text
+    assert 'x_seconds_bucket{le="0.1"} 1' in text
+    assert 'x_seconds_count 2' in text
+    assert "x_busy 2" in text
+    assert "x_backlog 7" in text  # Calculado uma vez, por quem atende
+
+    metrics.mark_process_dead(101, str(tmp_path))
+    text = second.render(second.collect(str(tmp_path)))
+    assert 'x_calls_total{model="a"} 3' in text
+    assert "x_busy 1" in text
+
+    # render() grava o snapshot de quem atende antes de somar
+    monkeypatch.setattr(metrics, "METRICS_MULTIPROC_DIR", str(tmp_path))
+    assert "# TYPE agenticlead_extractions counter" in metrics.render()
+    assert (tmp_path / f"metrics_{os.getpid()}.json").exists()
@@ -0,0 +1,136 @@
+"""
+Testes da detecção de relatos quase duplicados (MinHash/LSH)
+"""
+from database import DatabaseManager, RawEntry, StructuredEntry
+from near_duplicates import NearDuplicateIndex, estimated_similarity, minhash_signature
+
+POSTE_A = "Poste apagado na Rua das Flores em frente ao número 120, bairro Centro, moradores reclamando"
+POSTE_B = "poste apagado na rua das flores, em frente ao nº 120 no bairro Centro - moradores reclamando!"
+BUEIRO = "Bueiro entupido na Avenida Brasil perto da escola, água acumulando na calçada"
+
+def test_assinatura_aproxima_textos_parecidos():
+    similar = estimated_similarity(minhash_signature(POSTE_A), minhash_signature(POSTE_B))
+    different = estimated_similarity(minhash_signature(POSTE_A), minhash_signature(BUEIRO))
+
+    assert similar >= 0.5
+    assert different < 0.2
+
+def _index(tmp_path):
+    manager = DatabaseManager(f"sqlite:///{tmp_path / 'dup.db'}")
+    index = NearDuplicateIndex()
+    index.db = manager
+    return manager, index
+
+def test_relatos_parecidos_ganham_o_mesmo_cluster(tmp_path):
+    manager, index = _index(tmp_path)
+    ids = [
+        manager.save_raw_entry("agente1", POSTE_A, message_id=1),
+        manager.save_raw_entry("agente2", POSTE_B, message_id=1),
+        manager.save_raw_entry("agente3", BUEIRO, message_id=1),
+    ]
+    first, second, third = [manager.session.get(RawEntry, raw_id) for raw_id in ids]
+
+    assert index.index_entry(first) is None
+    assert index.index_entry(second) == first.id
+    assert index.index_entry(third) is None
+
+    assert first.cluster_id == second.cluster_id == first.id
+    assert third.cluster_id == third.id
+
+def test_bairros_diferentes_nao_agrupam(tmp_path):
+    manager, index = _index(tmp_path)
+    first = manager.session.get(RawEntry, manager.save_raw_entry("a1", POSTE_A, message_id=1))
+    other = manager.session.get(RawEntry, manager.save_raw_entry(
+        "a2", POSTE_A.replace("bairro Centro", "bairro Jardim Azul"), message_id=2
+    ))
+
+    index.index_entry(first)
+
+    assert index.index_entry(other) is None
+    assert other.cluster_id == other.id
+
+def _extracted(manager, raw_id, **fields):
+    entry = StructuredEntry(raw_text_id=raw_id, extraction_status="completed", **fields)
+    manager.session.add(entry)
+    manager.session.commit()
+    return entry
+
+def test_reuso_exige_similaridade_alta_e_bairro_conhecido(tmp_path):
+    manager, index = _index(tmp_path)
+    first = manager.session.get(RawEntry, manager.save_raw_entry("a1", POSTE_A, message_id=1))
+    second = manager.session.get(RawEntry, manager.save_raw_entry("a2", POSTE_B, message_id=1))
+    index.index_entry(first)
+    index.index_entry(second)
+    sibling = _extracted(manager, first.id, bairro="Centro", tipo_demanda="ILUMINACAO")
+
+    assert index.find_extracted_sibling(second).id == sibling.id
+
+    # Mesmo cluster, mas abaixo do limiar de reuso
+    index.reuse_threshold = 0.95
+    assert index.find_extracted_sibling(second) is None
+
+    # Bairro desconhecido no irmão: agrupa, mas não reaproveita
+    index.reuse_threshold = 0.5
+    sibling.bairro = None
+    manager.session.commit()
+    assert index.find_extracted_sibling(second) is None
+
+class FakeExtractor:
+    def __init__(self, fields_status="success"):
+        self.fields_status = fields_status
+        self.calls = []
+
+    def extract_fields(self, raw_text, fields, capture_timestamp=None):
+        self.calls.append(("fields", tuple(fields)))
+        if self.fields_status != "success":
+            return {}, {"extraction_status": "error", "error_message": "timeout"}
+        return {"nome": "João", "telefone": "+5511977776666", "consentimento_comunicacao": False,
+                "confianca_campos": {"nome": 0.9, "telefone": 0.9}}, \
+            {"extraction_status": "success", "model_used": "gpt-4o"}
+
+    def extract_from_text(self, raw_text, capture_timestamp=None):
+        self.calls.append(("full",))
+        return {"nome": "João", "bairro": "Centro", "tipo_demanda": "ILUMINACAO", "confianca_campos": {}}, \
+            {"extraction_status": "success", "validation": {"valid": True, "confianca_global": 0.8}}
+
+def _cluster_with_extracted_sibling(tmp_path):
+    manager, index = _index(tmp_path)
+    first = manager.session.get(RawEntry, manager.save_raw_entry("a1", POSTE_A, message_id=1))
+    second = manager.session.get(RawEntry, manager.save_raw_entry("a2", POSTE_B, message_id=1))
+    index.index_entry(first)
+    index.index_entry(second)
+    _extracted(manager, first.id, nome="Maria", telefone="+5511999998888", consentimento_comunicacao=True,
+               bairro="Centro", tipo_demanda="ILUMINACAO", descricao_curta="Poste apagado",
+               prioridade_percebida="MEDIA", confianca_campos={"nome": 0.9, "tipo_demanda": 0.8})
+    pending = StructuredEntry(raw_text_id=second.id, extraction_status="pending")
+    manager.session.add(pending)
+    manager.session.commit()
+    return manager, index, second, pending
+
+def test_duplicata_copia_so_a_demanda_e_extrai_o_contato(tmp_path, bare_processor):
+    manager, index, second, pending = _cluster_with_extracted_sibling(tmp_path)
+    extractor = FakeExtractor()
+
+    result = bare_processor(manager, extractor, duplicate_index=index).process_single_entry(second)
+
+    assert result["reused_from"] == 1
+    assert extractor.calls == [("fields", ("data_contato", "hora_contato", "nome", "telefone",
+                                           "consentimento_comunicacao"))]
+    manager.session.expire_all()
+    entry = manager.session.get(StructuredEntry, pending.id)
+    assert (entry.tipo_demanda, entry.bairro, entry.descricao_curta) == ("ILUMINACAO", "Centro", "Poste apagado")
+    # Contato é de quem relatou, nunca do irmão
+    assert (entry.nome, entry.telefone, entry.consentimento_comunicacao) == ("João", "+5511977776666", False)
+    assert entry.confianca_campos == {"tipo_demanda": 0.8, "nome": 0.9, "telefone": 0.9}
+
+def test_falha_no_contato_cai_na_extracao_completa(tmp_path, bare_processor):
+    manager, index, second, pending = _cluster_with_extracted_sibling(tmp_path)
+    extractor = FakeExtractor(fields_status="error")
+
+    result = bare_processor(manager, extractor, duplicate_index=index).process_single_entry(second)
+
+    assert "reused_from" not in result
+    assert extractor.calls == [("fields", ("data_contato", "hora_contato", "nome", "telefone",
+                                           "consentimento_comunicacao")), ("full",)]
+    manager.session.expire_all()
+    assert manager.session.get(StructuredEntry, pending.id).telefone is None
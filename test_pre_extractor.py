@@ -0,0 +1,90 @@
+"""
+Testes do pré-extrator determinístico
+Alternativa Híbrida (LLM + Regex): regras antes do LLM
+"""
+from pre_extractor import RuleBasedPreExtractor
+from llm_extractor import LLMExtractor
+from config import CONFIDENCE_THRESHOLD
+
+CAPTURE = "2025-07-18T10:00:00"
+
+def test_extrai_campos_triviais():
+    """Telefone, data relativa, tipo e bairro saem das regras"""
+    extractor = RuleBasedPreExtractor()
+    result = extractor.extract(
+        "Ontem à noite falei com Paulo perto do campo do bairro Jardim Azul, "
+        "poste de luz apagado, telefone 21 99888 6677 prioridade média.",
+        CAPTURE
+    )
+    fields = result["fields"]
+    assert fields["telefone"] == "+5521998886677"
+    assert fields["data_contato"] == "2025-07-17"
+    assert fields["tipo_demanda"] == "ILUMINACAO"
+    assert fields["prioridade_percebida"] == "MEDIA"
+    assert fields["nome"] == "Paulo"
+    assert fields["bairro"] == "Jardim Azul"
+    assert extractor.is_complete(result)
+
+def test_datas_explicitas_e_hifen_unicode():
+    """Data dd/mm usa o ano da captura e telefone aceita hífen não-ASCII"""
+    extractor = RuleBasedPreExtractor()
+    result = extractor.extract("18/07 falei com Maria, bueiro, deu telefone 11 98765‑4321", CAPTURE)
+    assert result["fields"]["data_contato"] == "2025-07-18"
+    assert result["fields"]["telefone"] == "+5511987654321"
+
+def test_incompleto_sem_bairro():
+    """Sem bairro explícito a extração não é considerada completa"""
+    extractor = RuleBasedPreExtractor()
+    result = extractor.extract("hoje falei com joao da silva", CAPTURE)
+    assert result["fields"] == {"data_contato": "2025-07-18"}
+    assert not extractor.is_complete(result)
+
+def test_llm_dispensado_quando_completo():
+    """Quando as regras cobrem os campos obrigatórios o LLM não é chamado"""
+    extractor = LLMExtractor(api_key="sk-test")
+
+    def _fail(*args, **kwargs):
+        raise AssertionError("LLM não deveria ser chamado")
+
+    extractor._call_openai = _fail
+    data, metadata = extractor.extract_from_text(
+        "Falei hoje com o Sr João no bairro Centro, bueiro entupido, telefone 11988887777",
+        capture_timestamp=CAPTURE
+    )
+    assert metadata["llm_skipped"] is True
+    assert metadata["extraction_status"] == "success"
+    assert data["tipo_demanda"] == "BUEIRO"
+    assert data["nome"] == "João"
+
+def test_regras_nao_inventam_descricao_nem_prioridade():
+    """Sem LLM, descrição e prioridade ficam vazias e com confiança zero (vão para revisão)"""
+    extractor = LLMExtractor(api_key="sk-test")
+    extractor._call_openai = None
+    data, metadata = extractor.extract_from_text(
+        "Falei hoje com o Sr João no bairro Centro, bueiro entupido, telefone 11988887777",
+        capture_timestamp=CAPTURE
+    )
+    assert metadata["llm_skipped"] is True
+    assert data["descricao_curta"] is None and data["prioridade_percebida"] is None
+    assert data["confianca_campos"]["descricao_curta"] == 0.0
+    assert data["confianca_campos"]["prioridade_percebida"] == 0.0
+    assert metadata["validation"]["confianca_global"] < CONFIDENCE_THRESHOLD
+
+def test_prompt_reduzido_quando_incompleto():
+    """Campos confiáveis vão no prompt reduzido e prevalecem na resposta"""
+    extractor = LLMExtractor(api_key="sk-test")
+    prompts = []
+
+    def _fake_call(messages, temperature=0, model=None):
+        prompts.append(messages[-1]["content"])
+        return '{"nome": "Maria", "bairro": null, "telefone": "000", "confianca_campos": {"nome": 0.7}}'
+
+    extractor._call_openai = _fake_call
+    data, metadata = extractor.extract_from_text(
+        "falei com dona maria, bueiro entupido, telefone 11 99999-8888",
+        capture_timestamp=CAPTURE
+    )
+    assert metadata["extraction_mode"] == "rules+llm"
+    assert "EXEMPLO" not in prompts[0]
+    assert data["telefone"] == "+5511999998888"
+    assert data["confianca_campos"]["telefone"] == 0.95
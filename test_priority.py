@@ -0,0 +1,93 @@
+"""
+Testes da fila de extração por urgência
+"""
+import asyncio
+from datetime import datetime, timedelta
+
+from database import DatabaseManager, RawEntry, StructuredEntry
+from priority import pre_score, prioritize, urgency_level
+
+NOW = datetime(2025, 3, 10, 12, 0)
+
+def test_nivel_de_urgencia_pelo_texto():
+    assert urgency_level("Fio caído na rua, risco de choque") == "ALTA"
+    assert urgency_level("poste apagado URGENTE!!!") == "ALTA"
+    assert urgency_level("grama alta na praça") == "BAIXA"
+    assert urgency_level("bueiro entupido, pouco urgente") == "BAIXA"
+    assert urgency_level("conversei com a Dona Maria") == "MEDIA"
+
+def test_envelhecimento_evita_starvation():
+    urgent, _ = pre_score("fio caído, risco de choque", NOW, NOW)
+    fresh_grass, _ = pre_score("grama alta na praça", NOW, NOW)
+    old_grass, level = pre_score("grama alta na praça", NOW - timedelta(hours=12), NOW)
+
+    assert urgent > fresh_grass
+    assert old_grass > urgent
+    assert level == "BAIXA"
+
+def test_lote_prioriza_relato_urgente(tmp_path, bare_processor):
+    manager = DatabaseManager(f"sqlite:///{tmp_path / 'priority.db'}")
+    captured = datetime.utcnow() - timedelta(minutes=5)
+    texts = ["grama alta na praça"] * 4 + ["fio caído, risco de choque"]
+    for index, texto in enumerate(texts):
+        raw = RawEntry(agente_id="a1", texto_original=texto, timestamp_captura=captured,
+                       telegram_message_id=index + 1)
+        manager.session.add(raw)
+        manager.session.flush()
+        manager.session.add(StructuredEntry(raw_text_id=raw.id, extraction_status="pending"))
+    manager.session.commit()
+
+    processor = bare_processor(manager)
+    order = []
+
+    def fake_single_entry(raw_entry):
+        order.append(raw_entry.texto_original)
+        return {"success": True, "processing_time": 0.0}
+
+    processor.process_single_entry = fake_single_entry
+    results = asyncio.run(processor.process_batch_async(batch_size=2, max_concurrent=1))
+
+    assert order[0] == "fio caído, risco de choque"
+    assert len(order) == 2
+    assert set(results["queue_latency"]) == {"ALTA", "BAIXA"}
+    assert results["queue_latency"]["ALTA"]["avg_seconds"] >= 300
+    assert processor.get_processing_dashboard()["backlog_by_priority"]["BAIXA"]["pending"] == 4
+
+def test_concluidas_sem_contato_nao_tomam_o_lote(tmp_path, bare_processor):
+    """Concluídas antigas sem nome/telefone não voltam ao lote nem envelhecem"""
+    manager = DatabaseManager(f"sqlite:///{tmp_path / 'starvation.db'}")
+    old = datetime.utcnow() - timedelta(hours=24)
+    for index in range(10):
+        raw = RawEntry(agente_id="a1", texto_original="grama alta na praça", timestamp_captura=old,
+                       telegram_message_id=index + 1)
+        manager.session.add(raw)
+        manager.session.flush()
+        manager.session.add(StructuredEntry(raw_text_id=raw.id, extraction_status="completed"))
+    raw = RawEntry(agente_id="a2", texto_original="fio caido risco de choque",
+                   timestamp_captura=datetime.utcnow(), telegram_message_id=99)
+    manager.session.add(raw)
+    manager.session.flush()
+    manager.session.add(StructuredEntry(raw_text_id=raw.id, extraction_status="pending"))
+    manager.session.commit()
+
+    processor = bare_processor(manager)
+    order = []
+
+    def fake_single_entry(raw_entry):
+        order.append(raw_entry.texto_original)
+        return {"success": True, "processing_time": 0.0}
+
+    processor.process_single_entry = fake_single_entry
+    asyncio.run(processor.process_batch_async(batch_size=10, max_concurrent=1))
+
+    assert order == ["fio caido risco de choque"]
+
+def test_envelhecimento_so_para_pendentes():
+    class Row:
+        def __init__(self, raw_id, texto, captured, status):
+            self.raw_id, self.texto_original = raw_id, texto
+            self.timestamp_captura, self.extraction_status = captured, status
+
+    rows = [Row(1, "grama alta", NOW - timedelta(hours=24), "completed"),
+            Row(2, "fio caído, risco de choque", NOW, "pending")]
+    assert [row.raw_id for row, _ in prioritize(rows, 2, NOW)] == [2, 1]
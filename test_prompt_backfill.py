@@ -0,0 +1,102 @@
+"""
+Testes do backfill após mudança de PROMPT_VERSION
+"""
+from database import DatabaseManager, StructuredEntry
+from prompt_backfill import PromptBackfill, prompt_version_from_metadata
+from prompts import PROMPT_VERSION
+
+class FakeProcessor:
+    def __init__(self, manager):
+        self.manager = manager
+        self.raw_ids = []
+
+    def reprocess_entry(self, raw_entry):
+        self.raw_ids.append(raw_entry.id)
+        entry = self.manager.session.query(StructuredEntry).filter_by(raw_text_id=raw_entry.id).one()
+        entry.prompt_version = PROMPT_VERSION
+        self.manager.session.commit()
+        return {"success": True}
+
+def _setup(tmp_path):
+    manager = DatabaseManager(f"sqlite:///{tmp_path / 'backfill.db'}")
+    rows = [("v0.9", False), (PROMPT_VERSION, False), ("v0.9", True), (None, False), ("v0.8", False)]
+    for index, (version, revisado) in enumerate(rows):
+        raw_id = manager.save_raw_entry("a1", f"relato {index}", message_id=index + 1)
+        manager.session.add(StructuredEntry(raw_text_id=raw_id, extraction_status="completed",
+                                            prompt_version=version, revisado=revisado))
+        manager.session.commit()
+
+    processor = FakeProcessor(manager)
+    backfill = PromptBackfill(processor=processor, rate_per_minute=60000, max_live_pending=0)
+    backfill.db = manager
+    return manager, processor, backfill
+
+def test_versao_lida_do_llm_metadata():
+    assert prompt_version_from_metadata(str({"model_used": "x", "prompt_version": "v1.0"})) == "v1.0"
+    assert prompt_version_from_metadata('{"prompt_version": "v0.9"}') == "v0.9"
+    assert prompt_version_from_metadata({"extraction_mode": "near_duplicate"}) is None
+    assert prompt_version_from_metadata(None) is None
+
+def test_backfill_retomavel_e_ignora_revisados(tmp_path):
+    manager, processor, backfill = _setup(tmp_path)
+    assert backfill.progress()["remaining"] == 3
+
+    first = backfill.run(limit=1)
+    assert processor.raw_ids == [1]
+    assert first["processed"] == 1 and first["remaining"] == 2
+
+    # Nova instância retoma do checkpoint
+    resumed = PromptBackfill(processor=processor, rate_per_minute=60000, max_live_pending=0)
+    resumed.db = manager
+    final = resumed.run()
+    assert processor.raw_ids == [1, 4, 5]
+    assert final["remaining"] == 0 and final["percent"] == 100.0
+
+def test_backfill_cede_lugar_ao_trafego_ao_vivo(tmp_path):
+    manager, processor, backfill = _setup(tmp_path)
+    raw_id = manager.save_raw_entry("a2", "relato novo", message_id=99)
+    live = StructuredEntry(raw_text_id=raw_id, extraction_status="pending")
+    manager.session.add(live)
+    manager.session.commit()
+    sleeps = []
+
+    def fake_sleep(seconds):
+        sleeps.append(seconds)
+        # Tráfego ao vivo processado durante a pausa
+        entry = manager.session.get(StructuredEntry, live.id)
+        entry.extraction_status = "completed"
+        entry.prompt_version = PROMPT_VERSION
+        manager.session.commit()
+
+    backfill.run(limit=1, sleep=fake_sleep)
+    assert sleeps and sleeps[0] >= 1
+    assert processor.raw_ids == [1]
+
+class FailingExtractor:
+    def __init__(self, metadata):
+        self.metadata = metadata
+
+    def extract_from_text(self, raw_text, capture_timestamp=None):
+        return {}, dict(self.metadata)
+
+def test_reextracao_com_falha_mantem_extracao_anterior(tmp_path, bare_processor):
+    """Erro do LLM ou validação reprovada: registro intacto e contado como erro"""
+    manager, _, _ = _setup(tmp_path)
+    entry = manager.session.query(StructuredEntry).filter_by(raw_text_id=1).one()
+    entry.nome, entry.tipo_demanda, entry.confianca_global = "Maria", "BUEIRO", 0.9
+    manager.session.commit()
+
+    processor = bare_processor(manager)
+    backfill = PromptBackfill(processor=processor, rate_per_minute=60000, max_live_pending=0)
+    backfill.db = manager
+
+    processor.extractor = FailingExtractor({"extraction_status": "error", "error_message": "timeout"})
+    first = backfill.run(limit=1)
+    processor.extractor = FailingExtractor({"extraction_status": "success", "validation": {"valid": False}})
+    second = backfill.run(limit=1)
+
+    assert (first["errors"], second["errors"], second["processed"]) == (1, 2, 0)
+    manager.session.expire_all()
+    entry = manager.session.query(StructuredEntry).filter_by(raw_text_id=1).one()
+    assert (entry.nome, entry.tipo_demanda, entry.confianca_global) == ("Maria", "BUEIRO", 0.9)
+    assert (entry.extraction_status, entry.prompt_version) == ("completed", "v0.9")
@@ -0,0 +1,59 @@
+"""
+Testes da re-extração pontual de campos com baixa confiança
+"""
+import json
+
+import pytest
+
+from database import DatabaseManager, StructuredEntry
+from llm_extractor import LLMExtractor
+
+TEXT = "Falei com a Dona Maria perto do mercado, bairro Vila Nova, bueiro entupido"
+
+@pytest.fixture
+def fields_extractor(fake_openai):
+    def build(content):
+        extractor = LLMExtractor(api_key="sk-test", cascade_models=["gpt-4o-mini"])
+        return extractor, fake_openai(extractor, content)
+    return build
+
+def test_prompt_pede_so_os_campos_fracos(fields_extractor):
+    extractor, completions = fields_extractor(
+        '{"bairro": "Vila Nova", "nome": "Maria", "telefone": "1", "confianca_campos": {"bairro": 0.9}}'
+    )
+
+    data, metadata = extractor.extract_fields(TEXT, ["bairro"])
+
+    assert data == {"bairro": "Vila Nova", "confianca_campos": {"bairro": 0.9}}
+    assert metadata["extraction_mode"] == "fields"
+    assert '"bairro": ...' in completions.prompts[0]
+    assert '"telefone"' not in completions.prompts[0]
+    assert "EXEMPLO" not in completions.prompts[0]
+
+def test_aplica_campo_com_confianca_maior(tmp_path, fields_extractor, bare_processor):
+    manager = DatabaseManager(f"sqlite:///{tmp_path / 'reextract.db'}")
+    raw_id = manager.save_raw_entry("a1", TEXT, message_id=1)
+    entry = StructuredEntry(
+        raw_text_id=raw_id, nome="Maria", bairro="Mercado", tipo_demanda="BUEIRO",
+        extraction_status="completed", confianca_global=0.7,
+        confianca_campos={"nome": 0.9, "bairro": 0.3, "tipo_demanda": 0.9},
+    )
+    manager.session.add(entry)
+    manager.session.commit()
+
+    extractor, completions = fields_extractor(json.dumps({
+        "bairro": "Vila Nova", "nome": "Mariana", "confianca_campos": {"bairro": 0.92, "nome": 0.5},
+    }))
+    processor = bare_processor(manager, extractor)
+
+    assert processor.weak_fields(entry) == ["bairro"]
+    result = processor.reextract_fields(entry)
+    assert result["updated"] == ["bairro"]
+
+    manager.session.expire_all()
+    entry = manager.session.get(StructuredEntry, entry.id)
+    assert entry.bairro == "Vila Nova"
+    assert entry.nome == "Maria"  # Campo confiável não foi pedido nem alterado
+    assert entry.confianca_campos["bairro"] == 0.92
+    assert entry.confianca_global == round((0.9 + 0.92 + 0.9) / 3, 3)
+    assert processor.reextract_review_queue()["checked"] == 0
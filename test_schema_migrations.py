@@ -0,0 +1,72 @@
+"""
+Testes do registro versionado de migrações
+"""
+from sqlalchemy import create_engine, inspect, text
+
+from database import DatabaseManager
+from schema_migrations import LATEST_VERSION, apply_migrations, current_version
+
+LEGACY_SCHEMA = [
+    """CREATE TABLE raw_entries (
+        id INTEGER PRIMARY KEY, timestamp_captura DATETIME NOT NULL, agente_id VARCHAR(50) NOT NULL,
+        texto_original TEXT NOT NULL, latitude FLOAT, longitude FLOAT, processado BOOLEAN NOT NULL,
+        telegram_message_id INTEGER)""",
+    """CREATE TABLE structured_entries (
+        id INTEGER PRIMARY KEY, raw_text_id INTEGER NOT NULL, data_contato VARCHAR(10),
+        hora_contato VARCHAR(5), nome VARCHAR(100), telefone VARCHAR(20), bairro VARCHAR(100),
+        referencia_local VARCHAR(200), tipo_demanda VARCHAR(20), descricao_curta VARCHAR(500),
+        prioridade_percebida VARCHAR(10), fonte VARCHAR(20) NOT NULL, confianca_global FLOAT,
+        flags JSON, confianca_campos JSON, timestamp_processamento DATETIME NOT NULL,
+        revisado BOOLEAN NOT NULL)""",
+]
+
+def _legacy_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as connection:
+        for ddl in LEGACY_SCHEMA:
+            connection.execute(text(ddl))
+        connection.execute(text(
+            "INSERT INTO raw_entries VALUES (1, '2025-07-18', 'a1', 'poste', NULL, NULL, 1, 7)"
+        ))
+        connection.execute(text(
+            "INSERT INTO raw_entries VALUES (2, '2025-07-18', 'a1', 'poste', NULL, NULL, 1, 7)"
+        ))
+    return engine
+
+def test_migracoes_atualizam_banco_legado(tmp_path):
+    """Banco antigo recebe colunas, índice e versão; segunda execução não faz nada"""
+    engine = _legacy_engine(tmp_path)
+
+    applied = apply_migrations(engine)
+    assert applied == list(range(1, LATEST_VERSION + 1))
+
+    inspector = inspect(engine)
+    columns = {c['name'] for c in inspector.get_columns('structured_entries')}
+    assert {'extraction_status', 'llm_metadata', 'consentimento_comunicacao'} <= columns
+    assert 'telegram_message_ids' in {c['name'] for c in inspector.get_columns('raw_entries')}
+    with engine.connect() as connection:
+        assert current_version(connection) == LATEST_VERSION
+        # Duplicata de ingestão removida antes do índice único
+        assert connection.execute(text("SELECT COUNT(*) FROM raw_entries")).scalar() == 1
+        # Chave de ingestão criada para a mensagem restante
+        assert connection.execute(text("SELECT agente_id, message_id, raw_id FROM telegram_messages")).all() == [
+            ("a1", 7, 1)
+        ]
+
+    assert apply_migrations(engine) == []
+
+def test_runtime_nao_altera_banco_desatualizado(tmp_path):
+    """DatabaseManager só lê a versão: banco existente não recebe ALTER TABLE"""
+    _legacy_engine(tmp_path)
+
+    manager = DatabaseManager(f"sqlite:///{tmp_path / 'legacy.db'}")
+
+    assert manager.schema_version == 0
+    columns = {c['name'] for c in inspect(manager.engine).get_columns('structured_entries')}
+    assert 'extraction_status' not in columns
+
+def test_banco_vazio_recebe_todas_as_migracoes(tmp_path):
+    manager = DatabaseManager(f"sqlite:///{tmp_path / 'fresh.db'}")
+
+    assert manager.schema_version == LATEST_VERSION
+    assert manager.ingest_index_ready()
@@ -0,0 +1,83 @@
+"""
+Testes da busca textual (FTS5 no SQLite)
+"""
+from types import SimpleNamespace
+
+from sqlalchemy import text
+
+import database
+from database import DatabaseManager, RawEntry, StructuredEntry
+from search import PG_SEARCH_CONFIG, SearchIndex, _pg_config, build_fts5_query, rebuild_search_index
+
+def _index_with_entries(tmp_path):
+    manager = DatabaseManager(f"sqlite:///{tmp_path / 'search.db'}")
+    index = SearchIndex()
+    index.db = manager
+
+    entries = [
+        ("Poste apagado na Rua Conceição, perto da padaria", "João", "Centro"),
+        ("Bueiro entupido na Avenida Brasil", "Maria", "Jardim Azul"),
+    ]
+    for message_id, (texto, nome, bairro) in enumerate(entries, 1):
+        raw_id = manager.save_raw_entry("a1", texto, message_id=message_id)
+        structured_id = manager.save_structured_entry({
+            "raw_text_id": raw_id, "nome": nome, "bairro": bairro, "descricao_curta": texto[:30]
+        })
+        index.index_structured(structured_id)
+    return index
+
+def test_busca_ignora_acentos_e_aceita_prefixo(tmp_path):
+    index = _index_with_entries(tmp_path)
+
+    assert index.search_ids("conceicao") == [1]
+    assert index.search_ids("JOAO padar") == [1]
+    assert index.search_ids("jardim") == [2]
+    assert index.search_ids("viaduto") == []
+
+def test_documento_reindexado_apos_extracao(tmp_path):
+    index = _index_with_entries(tmp_path)
+    index.db.session.execute(text("UPDATE structured_entries SET nome = 'Sebastião' WHERE id = 2"))
+    index.db.session.commit()
+
+    index.index_structured(2)
+
+    assert index.search_ids("sebastiao") == [2]
+    assert index.search_ids("maria") == []
+
+def test_consulta_fts5_descarta_operadores():
+    assert build_fts5_query('rua "A" OR (b*') == '"rua"* "A"* "OR"* "b"*'
+
+def test_listagem_filtra_pela_busca_sem_limite(monkeypatch, tmp_path):
+    """/entradas?q= filtra no banco: mais de 200 resultados continuam contados"""
+    manager = DatabaseManager(f"sqlite:///{tmp_path / 'listagem.db'}")
+    monkeypatch.setattr(database, "db_manager", manager)
+    with manager.engine.begin() as connection:
+        connection.execute(RawEntry.__table__.insert(), [
+            {"id": i, "agente_id": "a1", "texto_original": f"Poste apagado número {i}" if i <= 250 else "Bueiro"}
+            for i in range(1, 261)
+        ])
+        connection.execute(StructuredEntry.__table__.insert(), [
+            {"id": i, "raw_text_id": i, "extraction_status": "completed"} for i in range(1, 261)
+        ])
+        rebuild_search_index(connection)
+
+    from web_app import app
+    client = app.test_client()
+
+    assert "Entradas (250 total)" in client.get("/entradas?q=poste").get_data(as_text=True)
+    assert "Entradas (10 total)" in client.get("/entradas?q=bueiro").get_data(as_text=True)
+    assert "Entradas (0 total)" in client.get("/entradas?q=%21%21").get_data(as_text=True)
+
+def test_configuracao_do_postgresql_consultada_uma_vez():
+    queries = []
+
+    class Session:
+        def get_bind(self):
+            return SimpleNamespace(url="postgresql://deploy/agenticlead")
+
+        def execute(self, statement, params):
+            queries.append(params)
+            return SimpleNamespace(scalar=lambda: 1)
+
+    assert [_pg_config(Session()) for _ in range(3)] == [PG_SEARCH_CONFIG] * 3
+    assert len(queries) == 1
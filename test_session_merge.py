@@ -0,0 +1,57 @@
+"""
+Testes da junção de localizações ao relato do agente
+"""
+from datetime import timedelta
+
+import pytest
+
+import database
+from database import DatabaseManager, RawEntry, StructuredEntry
+from processor import DataProcessor
+from session_merge import LocationMerger, build_location_text
+
+@pytest.fixture
+def manager(monkeypatch, tmp_path):
+    manager = DatabaseManager(f"sqlite:///{tmp_path / 'session.db'}")
+    monkeypatch.setattr(database, "db_manager", manager)
+    return manager
+
+def _save_location(manager, agente_id, lat=-22.9, lon=-43.2):
+    return manager.save_raw_entry(agente_id, build_location_text(lat, lon), lat=lat, lon=lon)
+
+def _raw(manager, raw_id):
+    return manager.session.get(RawEntry, raw_id)
+
+def test_localizacao_anexada_ao_relato_do_mesmo_agente(manager):
+    location_id = _save_location(manager, "a1")
+    report_id = manager.save_raw_entry("a1", "Falei com Maria, bueiro entupido")
+
+    assert LocationMerger(window_seconds=900).merge_into_report(_raw(manager, report_id)) == location_id
+    report = _raw(manager, report_id)
+    assert (report.latitude, report.longitude) == (-22.9, -43.2)
+
+def test_localizacao_de_outro_agente_nao_anexada(manager):
+    _save_location(manager, "a1")
+    report_id = manager.save_raw_entry("a2", "Falei com Maria, bueiro entupido")
+
+    assert LocationMerger(window_seconds=900).merge_into_report(_raw(manager, report_id)) is None
+    assert _raw(manager, report_id).latitude is None
+
+def test_localizacao_fora_da_janela_nao_anexada(manager):
+    location_id = _save_location(manager, "a1")
+    report_id = manager.save_raw_entry("a1", "Falei com Maria, bueiro entupido")
+    report = _raw(manager, report_id)
+    _raw(manager, location_id).timestamp_captura = report.timestamp_captura - timedelta(seconds=901)
+    manager.session.commit()
+
+    assert LocationMerger(window_seconds=900).merge_into_report(_raw(manager, report_id)) is None
+    assert _raw(manager, report_id).latitude is None
+
+def test_localizacao_pura_processada_sem_placeholder(manager):
+    location_id = _save_location(manager, "a1")
+
+    results = DataProcessor().process_unprocessed_entries()
+
+    assert results["location_only"] == 1 and results["created_ids"] == []
+    assert _raw(manager, location_id).processado is True
+    assert manager.session.query(StructuredEntry).filter_by(raw_text_id=location_id).count() == 0
@@ -0,0 +1,86 @@
+"""
+Testes do recebimento de updates por webhook
+"""
+import asyncio
+import threading
+
+import telegram_webhook
+from telegram_webhook import SECRET_HEADER, WebhookDispatcher
+
+UPDATE = {"update_id": 1001, "message": {
+    "message_id": 7, "date": 1700000000, "text": "bueiro entupido",
+    "chat": {"id": 42, "type": "private"}, "from": {"id": 42, "is_bot": False, "first_name": "Ana"},
+}}
+
+class FakeDispatcher:
+    def __init__(self):
+        self.payloads = []
+
+    def submit(self, payload):
+        self.payloads.append(payload)
+
+def _post(headers):
+    import web_app
+    return web_app.app.test_client().post(
+        telegram_webhook.TELEGRAM_WEBHOOK_PATH, json=UPDATE, headers=headers
+    )
+
+def test_webhook_valida_segredo_e_confirma(monkeypatch):
+    dispatcher = FakeDispatcher()
+    monkeypatch.setattr(telegram_webhook, "TELEGRAM_WEBHOOK_SECRET", "s3gredo")
+    monkeypatch.setattr(telegram_webhook, "get_dispatcher", lambda: dispatcher)
+
+    assert _post({SECRET_HEADER: "errado"}).status_code == 403
+    assert _post({}).status_code == 403
+    assert dispatcher.payloads == []
+
+    response = _post({SECRET_HEADER: "s3gredo"})
+    assert response.status_code == 200
+    assert dispatcher.payloads == [UPDATE]
+
+def test_webhook_desativado_sem_segredo(monkeypatch):
+    monkeypatch.setattr(telegram_webhook, "TELEGRAM_WEBHOOK_SECRET", "")
+    assert _post({SECRET_HEADER: ""}).status_code == 404
+
+class SlowApplication:
+    """Application mínima: consome a fila devagar, como um handler real"""
+
+    def __init__(self):
+        self.bot = None
+        self.update_queue = asyncio.Queue()
+        self.processed = []
+        self.done = threading.Event()
+        self.stopped = False
+
+    async def initialize(self):
+        pass
+
+    async def start(self):
+        self.consumer = asyncio.ensure_future(self._consume())
+
+    async def _consume(self):
+        while True:
+            update = await self.update_queue.get()
+            await asyncio.sleep(0.2)
+            self.processed.append(update.update_id)
+            self.done.set()
+
+    async def stop(self):
+        self.consumer.cancel()
+        self.stopped = True
+
+    async def shutdown(self):
+        pass
+
+def test_submit_nao_espera_o_processamento():
+    application = SlowApplication()
+    dispatcher = WebhookDispatcher(application)
+    dispatcher.start()
+    try:
+        dispatcher.submit(UPDATE)
+        assert application.processed == []  # Confirmado antes de processar
+        assert application.done.wait(timeout=5)
+        assert application.processed == [1001]
+    finally:
+        dispatcher.stop()
+    assert application.stopped
@@ -0,0 +1,93 @@
+"""
+Testes do rastreamento por relato (spans do bot ao export)
+"""
+import asyncio
+import json
+
+import pytest
+
+import auto_processor
+import tracing
+from database import db, init_db
+from export_worker import ExportWorker
+from llm_cascade import TierStats
+from llm_extractor import LLMExtractor
+from llm_processor import LLMProcessor
+
+VALID_JSON = json.dumps({
+    "nome": "Maria", "telefone": None, "bairro": "Centro", "referencia_local": None,
+    "tipo_demanda": "BUEIRO", "descricao_curta": "Bueiro entupido", "prioridade_percebida": "MEDIA",
+    "data_contato": None, "hora_contato": None, "consentimento_comunicacao": None,
+    "confianca_campos": {"nome": 0.9, "bairro": 0.9, "tipo_demanda": 0.9},
+})
+
+@pytest.fixture
+def spans_file(tmp_path):
+    path = tmp_path / "spans.jsonl"
+    tracing.configure(enabled=True, file_path=str(path), otlp_endpoint="", interval=60)
+    yield path
+    tracing.configure(enabled=False)
+
+def test_desligado_nao_gera_spans(tmp_path):
+    tracing.configure(enabled=False)
+    with tracing.span("handle_message") as span:
+        span.set_attribute("raw_id", 1)
+    assert span is tracing.NOOP_SPAN
+    assert not tracing.enabled()
+
+def test_relato_rastreado_do_bot_ao_export(spans_file, tmp_path, monkeypatch, fake_openai):
+    monkeypatch.chdir(tmp_path)
+    init_db(f"sqlite:///{tmp_path / 'tracing.db'}")
+
+    extractor = LLMExtractor(api_key="sk-test", cascade_models=["gpt-4o-mini"], stats=TierStats())
+    fake_openai(extractor, ["isto não é json", VALID_JSON], usage=(100, 40))
+    monkeypatch.setattr(auto_processor, "LLMProcessor", lambda: LLMProcessor(extractor=extractor))
+    monkeypatch.setattr(auto_processor, "get_export_worker", lambda: ExportWorker(use_process_pool=False))
+
+    # Dois fragmentos do agente agrupados num relato, como no bot
+    for message_id in (10, 11):
+        with tracing.span("handle_message", agente_id="a1", message_id=message_id):
+            pass
+    with tracing.span("process_report", new_trace=True, agente_id="a1") as report_span:
+        raw_id = db.save_raw_entry("a1", "Falei com Maria no Centro, bueiro entupido",
+                                   message_id=10, message_ids=[10, 11])
+        report_span.set_attribute("raw_id", raw_id)
+    with tracing.span("run_pipeline", new_trace=True, raw_ids=[raw_id]):
+        result = asyncio.run(auto_processor.AutoProcessor().process_new_entries())
+    assert result["success"]
+
+    tracing.flush()
+    spans = tracing.spans_for_report(tracing.load_spans(str(spans_file)), raw_id)
+    names = [span["name"] for span in spans]
+    for name in ("handle_message", "process_report", "save_raw_entry", "run_pipeline", "create_placeholder",
+                 "extract_from_text", "llm_call", "json_reformat", "write_back", "export"):
+        assert name in names
+    assert names.count("handle_message") == 2
+
+    # Extração em outra thread continua filha do pipeline que a disparou
+    by_name = {span["name"]: span for span in spans}
+    pipeline_trace = by_name["run_pipeline"]["trace_id"]
+    assert by_name["extract_from_text"]["trace_id"] == pipeline_trace
+    assert by_name["json_reformat"]["parent_span_id"] == by_name["extract_from_text"]["span_id"]
+    assert by_name["llm_call"]["attributes"]["prompt_tokens"] == 100
+
+    path = tracing.critical_path(spans)
+    stages = [step["name"] for step in path if step["name"] != "espera"]
+    assert stages[0] == "handle_message" and stages[-1] == "export"
+    assert stages.index("extract_from_text") < stages.index("write_back")
+
+def test_payload_otlp():
+    span = tracing.Span("export", "a" * 32, None, {"raw_ids": [1, 2], "rows": 3, "ok": True})
+    span.record_exception(RuntimeError("disco cheio"))
+    span.end_ns = span.start_ns + 1000
+
+    payload = tracing.to_otlp([span.to_dict()], service_name="agenticlead-test")
+
+    resource = payload["resourceSpans"][0]
+    assert resource["resource"]["attributes"][0]["value"] == {"stringValue": "agenticlead-test"}
+    otlp_span = resource["scopeSpans"][0]["spans"][0]
+    assert otlp_span["traceId"] == "a" * 32 and otlp_span["parentSpanId"] == ""
+    assert otlp_span["status"]["code"] == 2
+    attributes = {item["key"]: item["value"] for item in otlp_span["attributes"]}
+    assert attributes["rows"] == {"intValue": "3"}
+    assert attributes["raw_ids"]["arrayValue"]["values"][0] == {"intValue": "1"}
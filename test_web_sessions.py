@@ -0,0 +1,38 @@
+"""
+Testes das sessões por thread/requisição (modo gunicorn)
+"""
+import threading
+
+import database
+from database import DatabaseManager
+
+def test_cada_thread_tem_sua_sessao(tmp_path):
+    manager = DatabaseManager(f"sqlite:///{tmp_path / 'sessions.db'}")
+    main_session = manager.session()
+    other_sessions = []
+
+    thread = threading.Thread(target=lambda: other_sessions.append(manager.session()))
+    thread.start()
+    thread.join()
+
+    assert other_sessions[0] is not main_session
+    assert manager.session() is main_session
+
+def test_sessao_descartada_ao_fim_da_requisicao(monkeypatch, tmp_path):
+    import web_app
+
+    monkeypatch.setattr(database, "db_manager", DatabaseManager(f"sqlite:///{tmp_path / 'request.db'}"))
+    response = web_app.app.test_client().get('/api/stats')
+
+    assert response.status_code == 200
+    assert not database.get_db().session.registry.has()
+
+def test_dispose_after_fork_recomeca_pool(tmp_path):
+    manager = DatabaseManager(f"sqlite:///{tmp_path / 'fork.db'}")
+    manager.get_stats()
+    old_pool = manager.engine.pool
+
+    manager.dispose_after_fork()
+
+    assert manager.engine.pool is not old_pool
+    assert not manager.session.registry.has()
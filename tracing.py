@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+"""
+Rastreamento distribuído do relato: Telegram → banco → LLM → export
+Spans no modelo do OpenTelemetry (trace_id/span_id/pai, atributos, eventos,
+status) propagados por contextvars, inclusive para threads via bind().
+Exportados em lote por uma thread daemon para um arquivo JSONL e/ou para um
+coletor OTLP/HTTP (JSON, ex: http://localhost:4318). Cada etapa carrega o
+atributo raw_id (ou raw_ids no export), que liga os spans de um relato.
+Uso: python tracing.py <raw_id> [--file traces/spans.jsonl]
+"""
+import argparse
+import atexit
+import contextvars
+import functools
+import json
+import logging
+import os
+import queue
+import secrets
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+from config import TRACING_ENABLED, TRACING_FILE, TRACING_OTLP_ENDPOINT, TRACING_SERVICE_NAME
+
+logger = logging.getLogger(__name__)
+
+# Etapas do pipeline de um relato (caminho crítico)
+PIPELINE_STAGES = [
+    "handle_message", "save_raw_entry", "create_placeholder",
+    "extract_from_text", "write_back", "export",
+]
+FLUSH_INTERVAL_SECONDS = 2.0
+MAX_BATCH_SIZE = 512
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar("agenticlead_span", default=None)
+
+class Span:
+    """Um intervalo de trabalho; fechado pelo context manager span()"""
+
+    def __init__(self, name: str, trace_id: str, parent_span_id: Optional[str], attributes: Dict[str, Any]):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_span_id = parent_span_id
+        self.attributes = {key: value for key, value in attributes.items() if value is not None}
+        self.events: List[Dict[str, Any]] = []
+        self.status = "OK"
+        self.status_message = None
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+
+    def set_attribute(self, key: str, value: Any):
+        if value is not None:
+            self.attributes[key] = value
+
+    def add_event(self, name: str, **attributes):
+        self.events.append({"name": name, "time_unix_nano": time.time_ns(), "attributes": attributes})
+
+    def record_exception(self, exc: BaseException):
+        self.status = "ERROR"
+        self.status_message = f"{type(exc).__name__}: {exc}"
+        self.add_event("exception", type=type(exc).__name__, message=str(exc))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_span_id,
+            "name": self.name,
+            "service": TRACING_SERVICE_NAME,
+            "start_time_unix_nano": self.start_ns,
+            "end_time_unix_nano": self.end_ns,
+            "duration_ms": round((self.end_ns - self.start_ns) / 1e6, 3),
+            "status": self.status,
+            "status_message": self.status_message,
+            "attributes": self.attributes,
+            "events": self.events,
+        }
+
+class _NoopSpan:
+    """Span usado com o rastreamento desligado (custo zero nas chamadas)"""
+    trace_id = span_id = parent_span_id = None
+
+    def set_attribute(self, key, value):
+        pass
+
+    def add_event(self, name, **attributes):
+        pass
+
+    def record_exception(self, exc):
+        pass
+
+NOOP_SPAN = _NoopSpan()
+
+class FileSpanExporter:
+    """Um span por linha (JSON), em modo append"""
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def export(self, spans: List[Dict[str, Any]]):
+        with open(self.path, "a", encoding="utf-8") as target:
+            for span in spans:
+                target.write(json.dumps(span, ensure_ascii=False, default=str) + "\n")
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    if isinstance(value, (list, tuple)):
+        return {"arrayValue": {"values": [_otlp_value(item) for item in value]}}
+    return {"stringValue": str(value)}
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items()]
+
+def to_otlp(spans: List[Dict[str, Any]], service_name: str = TRACING_SERVICE_NAME) -> Dict[str, Any]:
+    """Payload OTLP/JSON (ExportTraceServiceRequest) para /v1/traces"""
+    return {"resourceSpans": [{
+        "resource": {"attributes": _otlp_attributes({"service.name": service_name})},
+        "scopeSpans": [{
+            "scope": {"name": "agenticlead"},
+            "spans": [{
+                "traceId": span["trace_id"],
+                "spanId": span["span_id"],
+                "parentSpanId": span["parent_span_id"] or "",
+                "name": span["name"],
+                "kind": 1,
+                "startTimeUnixNano": str(span["start_time_unix_nano"]),
+                "endTimeUnixNano": str(span["end_time_unix_nano"]),
+                "attributes": _otlp_attributes(span["attributes"]),
+                "events": [{"timeUnixNano": str(event["time_unix_nano"]), "name": event["name"],
+                            "attributes": _otlp_attributes(event["attributes"])}
+                           for event in span["events"]],
+                "status": {"code": 2 if span["status"] == "ERROR" else 1,
+                           "message": span["status_message"] or ""},
+            } for span in spans],
+        }],
+    }]}
+
+class OTLPHTTPExporter:
+    """Envia para um coletor OpenTelemetry (OTLP/HTTP com JSON)"""
+
+    def __init__(self, endpoint: str, service_name: str = TRACING_SERVICE_NAME, timeout: float = 5):
+        self.url = endpoint.rstrip("/")
+        if not self.url.endswith("/v1/traces"):
+            self.url += "/v1/traces"
+        self.service_name = service_name
+        self.timeout = timeout
+
+    def export(self, spans: List[Dict[str, Any]]):
+        request = urllib.request.Request(
+            self.url, data=json.dumps(to_otlp(spans, self.service_name)).encode("utf-8"),
+            headers={"Content-Type": "application/json"}, method="POST"
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout):
+            pass
+
+class BatchSpanProcessor:
+    """Fila de spans finalizados, exportada fora do caminho do relato"""
+
+    def __init__(self, exporters: List[Any], interval: float = FLUSH_INTERVAL_SECONDS):
+        self.exporters = exporters
+        self.interval = interval
+        self._queue: queue.Queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stopped = threading.Event()
+
+    def on_end(self, span: Span):
+        self._queue.put(span.to_dict())
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="tracing", daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self.flush()
+
+    def flush(self):
+        """Exporta o que estiver na fila (chamado pela thread, no atexit e nos testes)"""
+        with self._lock:
+            while True:
+                batch = []
+                while len(batch) < MAX_BATCH_SIZE:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                if not batch:
+                    return
+                for exporter in self.exporters:
+                    try:
+                        exporter.export(batch)
+                    except Exception as e:
+                        logger.warning(f"Falha ao exportar {len(batch)} spans ({type(exporter).__name__}): {e}")
+
+    def shutdown(self):
+        self._stopped.set()
+        self.flush()
+
+_processor: Optional[BatchSpanProcessor] = None
+
+def configure(enabled: bool = TRACING_ENABLED, file_path: str = TRACING_FILE,
+              otlp_endpoint: str = TRACING_OTLP_ENDPOINT,
+              interval: float = FLUSH_INTERVAL_SECONDS) -> Optional[BatchSpanProcessor]:
+    """(Re)configura os destinos dos spans; sem destino o rastreamento fica desligado"""
+    global _processor
+    if _processor is not None:
+        _processor.shutdown()
+    exporters = []
+    if enabled and file_path:
+        exporters.append(FileSpanExporter(file_path))
+    if enabled and otlp_endpoint:
+        exporters.append(OTLPHTTPExporter(otlp_endpoint))
+    _processor = BatchSpanProcessor(exporters, interval) if exporters else None
+    return _processor
+
+def flush():
+    if _processor is not None:
+        _processor.flush()
+
+configure()
+atexit.register(flush)
+
+def enabled() -> bool:
+    return _processor is not None
+
+@contextmanager
+def span(name: str, new_trace: bool = False, **attributes):
+    """
+    Abre um span filho do span atual (ou raiz de um novo trace)
+    new_trace=True inicia um trace próprio mesmo dentro de outro span
+    (ex: job do pipeline agendado a partir do handler de um relato)
+    """
+    if _processor is None:
+        yield NOOP_SPAN
+        return
+    parent = None if new_trace else _current_span.get()
+    current = Span(name, parent.trace_id if parent else secrets.token_hex(16),
+                   parent.span_id if parent else None, attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.record_exception(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        current.end_ns = time.time_ns()
+        _processor.on_end(current)
+
+def current_span():
+    return _current_span.get() or NOOP_SPAN
+
+def bind(function: Callable) -> Callable:
+    """Leva o span atual para outra thread (run_in_executor não copia o contexto)"""
+    return functools.partial(contextvars.copy_context().run, function)
+
+# --- Leitura dos spans de um relato ----------------------------------------
+
+def load_spans(path: str = TRACING_FILE) -> List[Dict[str, Any]]:
+    spans = []
+    with open(path, encoding="utf-8") as source:
+        for line in source:
+            if line.strip():
+                spans.append(json.loads(line))
+    return spans
+
+def _mentions(span: Dict[str, Any], raw_id: int) -> bool:
+    attributes = span.get("attributes", {})
+    return attributes.get("raw_id") == raw_id or raw_id in (attributes.get("raw_ids") or [])
+
+def spans_for_report(spans: List[Dict[str, Any]], raw_id: int) -> List[Dict[str, Any]]:
+    """
+    Spans de um relato: os que citam o raw_id, seus ancestrais e descendentes,
+    e os handle_message das mensagens do Telegram agrupadas nele
+    """
+    by_id = {span["span_id"]: span for span in spans}
+    children: Dict[str, List[Dict[str, Any]]] = {}
+    for span in spans:
+        children.setdefault(span.get("parent_span_id"), []).append(span)
+
+    selected = {span["span_id"]: span for span in spans if _mentions(span, raw_id)}
+    messages = set()
+    for span in selected.values():
+        attributes = span["attributes"]
+        if span["name"] == "save_raw_entry":
+            for message_id in attributes.get("message_ids") or [attributes.get("message_id")]:
+                messages.add((attributes.get("agente_id"), message_id))
+    for span in spans:
+        attributes = span["attributes"]
+        if span["name"] == "handle_message" and (attributes.get("agente_id"), attributes.get("message_id")) in messages:
+            selected[span["span_id"]] = span
+
+    for span in list(selected.values()):
+        parent = by_id.get(span.get("parent_span_id"))
+        while parent is not None and parent["span_id"] not in selected:
+            selected[parent["span_id"]] = parent
+            parent = by_id.get(parent.get("parent_span_id"))
+        pending = list(children.get(span["span_id"], []))
+        while pending:
+            child = pending.pop()
+            if child["span_id"] not in selected:
+                selected[child["span_id"]] = child
+                pending.extend(children.get(child["span_id"], []))
+    return sorted(selected.values(), key=lambda span: span["start_time_unix_nano"])
+
+def critical_path(spans: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Etapas do relato em ordem, com as esperas entre elas (fila, silêncio do agente)"""
+    stages = sorted((span for span in spans if span["name"] in PIPELINE_STAGES),
+                    key=lambda span: span["start_time_unix_nano"])
+    path = []
+    cursor = None
+    for span in stages:
+        start, end = span["start_time_unix_nano"], span["end_time_unix_nano"]
+        if cursor is not None and start > cursor:
+            path.append({"name": "espera", "seconds": (start - cursor) / 1e9})
+        path.append({"name": span["name"], "seconds": (end - start) / 1e9, "status": span["status"]})
+        cursor = end if cursor is None else max(cursor, end)
+    return path
+
+def main():
+    parser = argparse.ArgumentParser(description="Linha do tempo e caminho crítico de um relato")
+    parser.add_argument("raw_id", type=int, help="ID do relato (raw entry)")
+    parser.add_argument("--file", default=TRACING_FILE, help="Arquivo JSONL de spans")
+    args = parser.parse_args()
+
+    print("AgenticLead - Rastreamento do relato")
+    print("=" * 40)
+    if not os.path.exists(args.file):
+        print(f"❌ Arquivo de spans não encontrado: {args.file} (TRACING_ENABLED=true?)")
+        return
+
+    spans = spans_for_report(load_spans(args.file), args.raw_id)
+    if not spans:
+        print(f"Nenhum span para o relato #{args.raw_id}")
+        return
+
+    origin = spans[0]["start_time_unix_nano"]
+    total = (max(span["end_time_unix_nano"] for span in spans) - origin) / 1e9
+    print(f"Relato #{args.raw_id}: {len(spans)} spans em {total:.3f}s\n")
+
+    by_id = {span["span_id"]: span for span in spans}
+    def depth(span):
+        level = 0
+        while span.get("parent_span_id") in by_id:
+            span = by_id[span["parent_span_id"]]
+            level += 1
+        return level
+
+    print(f"{'início':>10} {'duração':>10}  span")
+    for span in spans:
+        offset = (span["start_time_unix_nano"] - origin) / 1e9
+        marker = " ❌" if span["status"] == "ERROR" else ""
+        print(f"{offset:>9.3f}s {span['duration_ms'] / 1000:>9.3f}s  {'  ' * depth(span)}{span['name']}{marker}")
+
+    print("\nCaminho crítico:")
+    for step in critical_path(spans):
+        share = f"{step['seconds'] / total:>6.1%}" if total else ""
+        print(f"  {step['name']:<20} {step['seconds']:>9.3f}s {share}")
+
+if __name__ == "__main__":
+    main()
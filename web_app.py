@@ -2,17 +2,30 @@
 Interface Web para AgenticLead - Versão PostgreSQL
 Dashboard otimizado para PostgreSQL
 """
-from flask import Flask, render_template, jsonify, request
-from database import get_db, RawEntry, StructuredEntry
+from flask import Flask, Response, render_template, jsonify, request
+from database import db, init_db, remove_session, RawEntry, StructuredEntry
+from geo import GeoIndex, DEFAULT_RADIUS_METERS
+from search import SearchIndex
+from telegram_webhook import webhook_blueprint
+import metrics
 from sqlalchemy import func, desc
 from datetime import datetime
 import json
 import os
 
 app = Flask(__name__)
+# Updates do Telegram (modo webhook) recebidos pelo mesmo servidor
+app.register_blueprint(webhook_blueprint)
 
-# Inicializar banco de dados
-db = get_db()
+geo_index = GeoIndex()
+search_index = SearchIndex()
+
+@app.teardown_appcontext
+def close_request_session(exception=None):
+    """Cada requisição usa sua própria sessão; devolve a conexão ao pool no fim"""
+    remove_session()
+
+# Banco de dados inicializado no primeiro uso (ou via init_db no entry point)
 
 @app.route('/')
 def dashboard():
@@ -81,6 +94,13 @@ def dashboard():
             print(f"Erro ao buscar últimas entradas: {e}")
             latest_entries = []
         
+        # Mapa de calor (agregado pré-calculado por célula)
+        try:
+            heatmap = geo_index.heatmap(limit=10)
+        except Exception as e:
+            print(f"Erro ao buscar mapa de calor: {e}")
+            heatmap = []
+        
         # Consolidar estatísticas
         dashboard_stats = {
             'total_raw': stats['total_raw'],
@@ -90,7 +110,8 @@ def dashboard():
             'status_counts': status_counts,
             'tipos_demanda': tipos_demanda,
             'avg_confidence': round(avg_confidence, 3),
-            'latest_entries': latest_entries
+            'latest_entries': latest_entries,
+            'heatmap': heatmap
         }
         
         return render_template('dashboard.html', stats=dashboard_stats)
@@ -120,6 +141,10 @@ def entradas():
         # Aplicar filtros
         status_filter = request.args.get('status')
         tipo_filter = request.args.get('tipo')
+        search_query = (request.args.get('q') or '').strip()
+        
+        if search_query:
+            query = query.filter(StructuredEntry.id.in_(search_index.match_subquery(search_query)))
         
         if status_filter and status_filter != 'all':
             query = query.filter(StructuredEntry.extraction_status == status_filter)
@@ -172,7 +197,8 @@ def entradas():
                              status_options=[s[0] for s in status_options if s[0]],
                              tipos_options=[t[0] for t in tipos_options if t[0]],
                              current_status=status_filter,
-                             current_tipo=tipo_filter)
+                             current_tipo=tipo_filter,
+                             current_q=search_query)
         
     except Exception as e:
         # Garantir rollback em caso de erro
@@ -255,6 +281,43 @@ def api_stats():
         db.ensure_clean_transaction()
         return jsonify({'error': str(e)}), 500
 
+@app.route('/search')
+def search():
+    """Busca textual nos relatos (nome, bairro, referência, descrição, texto original)"""
+    search_query = (request.args.get('q') or '').strip()
+    limit = min(request.args.get('limit', 50, type=int), 200)
+    
+    if not search_query:
+        return jsonify({'error': 'Parâmetro q é obrigatório'}), 400
+    
+    try:
+        db.ensure_clean_transaction()
+        results = search_index.search(search_query, limit=limit)
+        return jsonify({'query': search_query, 'count': len(results), 'results': results})
+    except Exception as e:
+        db.ensure_clean_transaction()
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/nearby')
+def api_nearby():
+    """Demandas num raio (metros) em torno de lat/lon"""
+    latitude = request.args.get('lat', type=float)
+    longitude = request.args.get('lon', type=float)
+    radius = request.args.get('radius', DEFAULT_RADIUS_METERS, type=float)
+    
+    if latitude is None or longitude is None:
+        return jsonify({'error': 'Parâmetros lat e lon são obrigatórios'}), 400
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180) or radius <= 0:
+        return jsonify({'error': 'Coordenadas ou raio inválidos'}), 400
+    
+    try:
+        db.ensure_clean_transaction()
+        results = geo_index.nearby(latitude, longitude, radius)
+        return jsonify({'count': len(results), 'radius': radius, 'results': results})
+    except Exception as e:
+        db.ensure_clean_transaction()
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/process', methods=['POST'])
 def api_process():
     """API endpoint para processar entradas pendentes"""
@@ -265,6 +328,13 @@ def api_process():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/metrics')
+def metrics_endpoint():
+    """Métricas do pipeline no formato do Prometheus"""
+    if not metrics.METRICS_ENABLED:
+        return Response("Métricas desabilitadas (METRICS_ENABLED=false)\n", status=404, mimetype="text/plain")
+    return Response(metrics.render(), mimetype=metrics.CONTENT_TYPE)
+
 @app.route('/health')
 def health_check():
     """Endpoint de health check para Railway"""
@@ -286,8 +356,11 @@ if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
     debug = os.environ.get('ENVIRONMENT', 'production') == 'development'
     
+    # Servidor de desenvolvimento; em produção: gunicorn -c gunicorn.conf.py web_app:app
     print(f"🚀 Iniciando AgenticLead Web App (PostgreSQL)")
     print(f"   Porta: {port}")
     print(f"   Debug: {debug}")
     
+    init_db()
+    
     app.run(debug=debug, host='0.0.0.0', port=port)
\ No newline at end of file